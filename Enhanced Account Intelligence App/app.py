@@ -5,11 +5,19 @@ import os
 import pandas as pd
 import io
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlunparse
+from urllib.robotparser import RobotFileParser
 import time
-from typing import List, Dict, Optional
+import threading
+import hashlib
+from collections import Counter, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Callable, List, Dict, Optional, Tuple
 import json
+from html_parsing import get_parser, parse_html
+from content_extraction import (
+    REPORT_CONTENT_TOKENS, chunk_blocks, chunk_text, extract_main_content, query_weights, rank_pages, select_chunks
+)
 
 # Load environment variables
 load_dotenv()
@@ -20,49 +28,346 @@ AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_API_BASE")
 AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
 
+# Research pipeline concurrency
+RESEARCH_MAX_WORKERS = int(os.getenv("RESEARCH_MAX_WORKERS", "8"))
+RESEARCH_PER_HOST_LIMIT = int(os.getenv("RESEARCH_PER_HOST_LIMIT", "2"))
+RESEARCH_LLM_CONCURRENCY = int(os.getenv("RESEARCH_LLM_CONCURRENCY", "4"))
+
+# Upper bound on main-content characters kept per page
+MAX_PAGE_CHARS = int(os.getenv("MAX_PAGE_CHARS", "20000"))
+
+# Local relevance gate: only the top K pages scoring at least the minimum BM25 score reach the LLM
+RELEVANCE_TOP_K = int(os.getenv("RELEVANCE_TOP_K", "8"))
+RELEVANCE_MIN_SCORE = float(os.getenv("RELEVANCE_MIN_SCORE", "0.5"))
+
+# Link keywords that mark pages worth researching (news, careers, investors...)
+RELEVANT_KEYWORDS = ['news', 'blog', 'press', 'careers', 'about', 'investor', 'media', 'announcement']
+
+# Optional breadth-first crawl of discovered links
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "1"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "10"))
+CRAWL_DELAY = float(os.getenv("CRAWL_DELAY", "1.0"))
+
+# Discovered URLs kept per category (News, Careers, ...)
+URL_REGISTRY_PER_CATEGORY = int(os.getenv("URL_REGISTRY_PER_CATEGORY", "25"))
+
+# Query parameters that only track campaigns/clicks and never change page content
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'dclid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'igshid', 'ref_src'}
+
+# On-disk HTTP cache for scraped pages (set HTTP_CACHE_DIR to an empty value to disable)
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", "3600"))
+HTTP_CACHE_MAX_MB = int(os.getenv("HTTP_CACHE_MAX_MB", "200"))
+
 openai_client = openai.AzureOpenAI(
     api_key=AZURE_OPENAI_API_KEY,
     api_version=AZURE_OPENAI_API_VERSION,
     azure_endpoint=AZURE_OPENAI_ENDPOINT,
 )
 
+def normalize_url(url: str) -> str:
+    """Canonicalize a URL: lowercase scheme and host, no fragment, tracking parameters or trailing slash.
+    
+    Raises ValueError for URLs with an invalid port or IPv6 host."""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    # Built from netloc rather than hostname, which drops the brackets around IPv6 addresses
+    host = parsed.netloc.rpartition('@')[2].lower()
+    port = parsed.port
+    if port is not None or host.endswith(':'):
+        host = host[:host.rindex(':')]
+    if port and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{port}"
+    
+    path = parsed.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+    
+    # Filter the raw query so the remaining parameters keep their original encoding
+    params = []
+    for param in parsed.query.split('&'):
+        name = param.split('=', 1)[0].lower()
+        if param and not name.startswith('utm_') and name not in TRACKING_PARAMS:
+            params.append(param)
+    return urlunparse((scheme, host, path, parsed.params, '&'.join(params), ''))
+
+class UrlRegistry:
+    """Discovered URLs de-duplicated by canonical form and bounded per category"""
+    def __init__(self, per_category: int = URL_REGISTRY_PER_CATEGORY):
+        self.per_category = per_category
+        self._urls = {}  # canonical URL -> {'url', 'text', 'category'}, in discovery order
+        self._category_counts = Counter()
+    
+    def add(self, url: str, text: str, category: str) -> bool:
+        """Register a URL unless it is already known or its category is full"""
+        canonical = normalize_url(url)
+        if canonical in self._urls or self._category_counts[category] >= self.per_category:
+            return False
+        self._urls[canonical] = {'url': canonical, 'text': text, 'category': category}
+        self._category_counts[category] += 1
+        return True
+    
+    def __contains__(self, url: str) -> bool:
+        return normalize_url(url) in self._urls
+    
+    def __iter__(self):
+        return iter(list(self._urls.values()))
+    
+    def __len__(self) -> int:
+        return len(self._urls)
+    
+    def __getitem__(self, index):
+        return list(self._urls.values())[index]
+
+def header_charset(response: requests.Response) -> Optional[str]:
+    """The charset declared in the Content-Type header, if any (requests assumes ISO-8859-1 for text/* without one)"""
+    if 'charset=' not in response.headers.get('Content-Type', '').lower():
+        return None
+    return response.encoding
+
+class HttpCache:
+    """Size-bounded LRU cache of HTTP responses on disk, revalidated with ETag/Last-Modified"""
+    def __init__(self, directory: str, ttl: int = HTTP_CACHE_TTL, max_bytes: int = HTTP_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> bytes on disk, least recently used first
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+    
+    def _load_index(self):
+        """Rebuild the LRU order from file modification times, which are bumped on every hit"""
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                key = entry.name[:-5]
+                body_path = self._path(key, '.body')
+                if not os.path.exists(body_path):
+                    continue
+                found.append((entry.stat().st_mtime, key, entry.stat().st_size + os.path.getsize(body_path)))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+    
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
+    
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+    
+    def record(self, outcome: str):
+        """Count a cache hit, revalidation or miss"""
+        with self._lock:
+            self.stats[outcome] += 1
+    
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached entry for a URL as metadata plus body, or None"""
+        key = self._key(url)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key, '.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(self._path(key, '.body'), 'rb') as f:
+                meta['body'] = f.read()
+            os.utime(self._path(key, '.json'))
+        except (OSError, ValueError):
+            self._remove(key)
+            return None
+        meta['fresh'] = time.time() - meta.get('stored_at', 0) < self.ttl
+        return meta
+    
+    def put(self, url: str, response: requests.Response):
+        """Store a successful response unless the server forbids it"""
+        if 'no-store' in response.headers.get('Cache-Control', '').lower():
+            return
+        key = self._key(url)
+        meta = {
+            'url': normalize_url(url),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'encoding': header_charset(response),
+            'stored_at': time.time()
+        }
+        self._write(key, meta, response.content)
+    
+    def refresh(self, url: str, entry: Dict, response: requests.Response):
+        """Restart the TTL of an entry the server confirmed with 304 Not Modified"""
+        meta = {k: v for k, v in entry.items() if k not in ('body', 'fresh')}
+        meta['etag'] = response.headers.get('ETag') or meta.get('etag')
+        meta['last_modified'] = response.headers.get('Last-Modified') or meta.get('last_modified')
+        meta['stored_at'] = time.time()
+        self._write(self._key(url), meta, entry['body'])
+    
+    def _write(self, key: str, meta: Dict, body: bytes):
+        try:
+            # Write to temporary files first so readers never see a partial entry
+            for suffix, data in (('.body', body), ('.json', json.dumps(meta).encode('utf-8'))):
+                tmp_path = self._path(key, suffix + f'.{threading.get_ident()}.tmp')
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key, suffix))
+        except OSError:
+            return
+        size = len(body) + len(json.dumps(meta))
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            evicted = []
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, old_size = self._entries.popitem(last=False)
+                self._total_bytes -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._delete_files(old_key)
+    
+    def _remove(self, key: str):
+        with self._lock:
+            self._total_bytes -= self._entries.pop(key, 0)
+        self._delete_files(key)
+    
+    def _delete_files(self, key: str):
+        for suffix in ('.json', '.body'):
+            try:
+                os.remove(self._path(key, suffix))
+            except OSError:
+                pass
+
 class WebResearcher:
-    def __init__(self):
+    def __init__(self, http_cache: Optional[HttpCache] = None):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
-        self.discovered_urls = []  # Track all discovered URLs
+        # Keep enough pooled connections for every worker thread
+        adapter = requests.adapters.HTTPAdapter(pool_connections=RESEARCH_MAX_WORKERS, pool_maxsize=RESEARCH_MAX_WORKERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.http_cache = http_cache
+        self.parse = get_parser()  # fastest installed HTML parser backend
+        self.discovered_urls = UrlRegistry()  # Track all discovered URLs
+        self._lock = threading.Lock()
+        self._host_slots = {}  # host -> semaphore limiting concurrent requests to that host
+        self._robots = {}  # host -> parsed robots.txt
+        self._robots_fetch_locks = {}  # host -> lock held while that host's robots.txt is fetched
+        self._robots_lock = threading.Lock()  # guards the two dicts above, never held over the network
+        self._next_fetch = {}  # host -> earliest time the crawler may fetch from it again
+    
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Get the semaphore that limits concurrent requests to the URL's host"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(max(1, RESEARCH_PER_HOST_LIMIT))
+            return self._host_slots[host]
+    
+    def _robots_for(self, url: str) -> RobotFileParser:
+        """Fetch and parse robots.txt once per host"""
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+        with self._robots_lock:
+            if host in self._robots:
+                return self._robots[host]
+            fetch_lock = self._robots_fetch_locks.setdefault(host, threading.Lock())
+        
+        # Only callers for the same host wait for this fetch; other hosts fetch their robots.txt in parallel
+        with fetch_lock:
+            with self._robots_lock:
+                if host in self._robots:
+                    return self._robots[host]
+            
+            robots = RobotFileParser(f"{parsed.scheme}://{parsed.netloc}/robots.txt")
+            try:
+                response = self.session.get(robots.url, timeout=10)
+                if response.status_code in (401, 403):
+                    robots.disallow_all = True
+                elif response.status_code >= 400:
+                    robots.allow_all = True
+                else:
+                    robots.parse(response.text.splitlines())
+            except requests.RequestException:
+                robots.allow_all = True
+            with self._robots_lock:
+                self._robots[host] = robots
+            return robots
+    
+    def _wait_for_turn(self, url: str):
+        """Space out crawler requests to the same host by the politeness delay"""
+        host = urlparse(url).netloc.lower()
+        delay = max(CRAWL_DELAY, self._robots_for(url).crawl_delay(self.session.headers['User-Agent']) or 0)
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_fetch.get(host, now))
+            self._next_fetch[host] = start + delay
+        if start > now:
+            time.sleep(start - now)
+    
+    def crawl_page(self, url: str, max_length: int = MAX_PAGE_CHARS) -> Dict[str, str]:
+        """Scrape a crawled link if robots.txt allows it, pacing requests per host"""
+        if not self._robots_for(url).can_fetch(self.session.headers['User-Agent'], url):
+            return {"url": url, "content": "", "title": "", "links": [], "chunks": [], "status": "skipped: disallowed by robots.txt"}
+        return self.scrape_website(url, max_length, polite=True)
     
-    def scrape_website(self, url: str, max_length: int = 5000) -> Dict[str, str]:
+    def _fetch(self, url: str, polite: bool = False) -> Tuple[bytes, Optional[str]]:
+        """Fetch a page body and its HTTP charset, serving fresh cached copies without touching the network"""
+        cached = self.http_cache.get(url) if self.http_cache else None
+        if cached and cached['fresh']:
+            self.http_cache.record('hits')
+            return cached['body'], cached.get('encoding')
+        if polite:
+            self._wait_for_turn(url)
+        
+        # Revalidate stale entries with a conditional GET
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        with self._host_slot(url):
+            response = self.session.get(url, timeout=10, headers=headers)
+        if cached and response.status_code == 304:
+            self.http_cache.record('revalidated')
+            self.http_cache.refresh(url, cached, response)
+            return cached['body'], cached.get('encoding')
+        response.raise_for_status()
+        
+        if self.http_cache:
+            self.http_cache.record('misses')
+            self.http_cache.put(url, response)
+        return response.content, header_charset(response)
+    
+    def scrape_website(self, url: str, max_length: int = MAX_PAGE_CHARS, polite: bool = False) -> Dict[str, str]:
         """Scrape content from a website and discover relevant URLs"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Title, text and links come out of a single parse without script/style content
+            body, encoding = self._fetch(url, polite)
+            page = parse_html(body, self.parse, encoding)
             
             # Discover relevant URLs (news, about, careers, etc.)
-            self._discover_relevant_urls(soup, url)
+            with self._lock:
+                links = self._discover_relevant_urls(page['links'], url)
             
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Get text content
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            # Truncate if too long
-            if len(text) > max_length:
-                text = text[:max_length] + "..."
+            # Keep the main content, without navigation, footer and cookie text, up to max_length
+            blocks, length = [], 0
+            for block in extract_main_content(page['blocks']):
+                if length >= max_length:
+                    break
+                blocks.append(block)
+                length += len(block['text']) + 1
             
             return {
                 "url": url,
-                "content": text,
-                "title": soup.title.string if soup.title else "No title",
+                "content": ' '.join(block['text'] for block in blocks),
+                "title": page['title'] or "No title",
+                "links": links,
+                "chunks": chunk_blocks(blocks),
                 "status": "success"
             }
         except Exception as e:
@@ -70,27 +375,33 @@ class WebResearcher:
                 "url": url,
                 "content": "",
                 "title": "",
+                "links": [],
+                "chunks": [],
                 "status": f"error: {str(e)}"
             }
     
-    def _discover_relevant_urls(self, soup, base_url):
-        """Discover relevant URLs from the webpage"""
-        relevant_keywords = ['news', 'blog', 'press', 'careers', 'about', 'investor', 'media', 'announcement']
+    def _discover_relevant_urls(self, links, base_url) -> List[str]:
+        """Discover relevant URLs among a page's (href, text) links, returning the ones linked from this page"""
+        page_links = {}  # canonical URL -> URL as linked, so each page lists a link once
         
-        for link in soup.find_all('a', href=True):
-            href = link.get('href')
+        for href, text in links:
             if href:
-                full_url = urljoin(base_url, href)
-                link_text = link.get_text().lower()
+                try:
+                    full_url = urljoin(base_url, href)
+                    if not full_url.startswith(('http://', 'https://')):
+                        continue  # mailto:, javascript:, tel: ...
+                    canonical = normalize_url(full_url)
+                except ValueError:
+                    continue  # malformed link such as a non-numeric port or unclosed IPv6 bracket
+                url_lower = full_url.lower()
+                link_text = text.lower()
                 
                 # Check if URL or link text contains relevant keywords
-                if any(keyword in full_url.lower() or keyword in link_text for keyword in relevant_keywords):
-                    if full_url not in self.discovered_urls:
-                        self.discovered_urls.append({
-                            'url': full_url,
-                            'text': link.get_text().strip(),
-                            'category': self._categorize_url(full_url, link_text)
-                        })
+                if any(keyword in url_lower or keyword in link_text for keyword in RELEVANT_KEYWORDS):
+                    page_links.setdefault(canonical, full_url)
+                    self.discovered_urls.add(full_url, text, self._categorize_url(full_url, link_text))
+        
+        return list(page_links.values())
     
     def _categorize_url(self, url, link_text):
         """Categorize URLs based on content"""
@@ -133,16 +444,161 @@ class IntelligenceAgent:
         self.openai_client = openai_client
         self.web_researcher = web_researcher
         self.source_links = {}  # Track links for each insight type
+        self._llm_slots = threading.BoundedSemaphore(max(1, RESEARCH_LLM_CONCURRENCY))
+        self.tokens_used = 0  # Azure OpenAI tokens spent on this report
+        self.skipped_pages = []  # pages the local relevance gate kept away from the LLM
+        self._usage_lock = threading.Lock()
+    
+    def _record_usage(self, response):
+        """Add a chat completion's token usage to the report total"""
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            with self._usage_lock:
+                self.tokens_used += usage.total_tokens or 0
+    
+    def research_urls(self, urls: List[str], user_requirements: str,
+                      on_progress: Optional[Callable[[str, int, int, str], None]] = None) -> List[Dict]:
+        """Scrape URLs concurrently, then analyze the locally relevant ones, returning results in input order"""
+        if not urls:
+            return []
+        
+        pages = [None] * len(urls)
+        with ThreadPoolExecutor(max_workers=max(1, min(RESEARCH_MAX_WORKERS, len(urls)))) as executor:
+            futures = {executor.submit(self.web_researcher.scrape_website, url): i for i, url in enumerate(urls)}
+            # Progress callbacks run on the calling thread, so they may update the Streamlit UI
+            for completed, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                pages[index] = future.result()
+                if on_progress:
+                    on_progress('scrape', completed, len(urls), urls[index])
+        
+        return self._analyze_pages([page for page in pages if page['status'] == 'success'], user_requirements, on_progress)
+    
+    def crawl_and_research(self, urls: List[str], user_requirements: str,
+                           on_progress: Optional[Callable[[str, int, int, str], None]] = None,
+                           max_depth: int = CRAWL_MAX_DEPTH, max_pages: int = CRAWL_MAX_PAGES) -> List[Dict]:
+        """Research URLs and crawl their discovered links breadth-first on the same sites"""
+        if not urls:
+            return []
+        
+        sites = {self._site(url) for url in urls}
+        seen = set()
+        for url in urls:
+            try:
+                seen.add(normalize_url(url))
+            except ValueError:
+                pass  # scrape_website reports the malformed seed as a failed page
+        order = list(urls)  # seeds first, then crawled pages level by level
+        pages = {}
+        next_level = []
+        
+        with ThreadPoolExecutor(max_workers=max(1, RESEARCH_MAX_WORKERS)) as executor:
+            pending = {executor.submit(self.web_researcher.scrape_website, url): (url, 0) for url in urls}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = pending.pop(future)
+                    page = future.result()
+                    if page['status'] == 'success':
+                        pages[url] = page
+                        if depth < max_depth:
+                            next_level.extend((order.index(url), link, depth + 1) for link in page['links'])
+                    if on_progress:
+                        on_progress('scrape', len(order) - len(pending), len(order), url)
+                
+                # Expand the next level only once the current one is fetched, so the crawl stays breadth-first
+                if not pending and next_level:
+                    # Queue links in the order their parent pages were queued, not the order they finished
+                    level, next_level = sorted(next_level, key=lambda item: item[0]), []
+                    for _, link, depth in level:
+                        if len(order) >= len(urls) + max_pages:
+                            break
+                        key = normalize_url(link)
+                        if key in seen or self._site(link) not in sites:
+                            continue
+                        seen.add(key)
+                        order.append(link)
+                        pending[executor.submit(self.web_researcher.crawl_page, link)] = (link, depth)
+        
+        return self._analyze_pages([pages[url] for url in order if url in pages], user_requirements, on_progress)
+    
+    @staticmethod
+    def _site(url: str) -> str:
+        """Host name without a leading www., used to keep the crawl on the researched sites"""
+        host = (urlparse(url).hostname or '').lower()
+        return host[4:] if host.startswith('www.') else host
+    
+    def _select_pages(self, pages: List[Dict], user_requirements: str) -> List[Dict]:
+        """Keep the top RELEVANCE_TOP_K pages by local BM25 score, recording the rest in skipped_pages"""
+        scores = rank_pages([page['chunks'] for page in pages], user_requirements, RELEVANT_KEYWORDS)
+        ranked = sorted(range(len(pages)), key=lambda i: -scores[i])
+        # Without requirement terms there is nothing to score against, so keep pages in order
+        has_query = bool(query_weights(user_requirements))
+        chosen = set(ranked[:RELEVANCE_TOP_K] if has_query else range(min(RELEVANCE_TOP_K, len(pages))))
+        
+        selected = []
+        for i, page in enumerate(pages):
+            page['local_score'] = round(scores[i], 2)
+            if has_query and scores[i] < RELEVANCE_MIN_SCORE:
+                reason = f"below the minimum local score of {RELEVANCE_MIN_SCORE}"
+            elif i not in chosen:
+                reason = f"outside the top {RELEVANCE_TOP_K} pages"
+            else:
+                selected.append(page)
+                continue
+            self.skipped_pages.append({
+                "url": page['url'],
+                "title": page['title'],
+                "local_score": page['local_score'],
+                "reason": reason
+            })
+        return selected
+    
+    def _analyze_pages(self, pages: List[Dict], user_requirements: str,
+                       on_progress: Optional[Callable[[str, int, int, str], None]] = None) -> List[Dict]:
+        """Analyze the locally relevant pages concurrently with the LLM, keeping page order"""
+        selected = self._select_pages(pages, user_requirements)
+        if not selected:
+            return []
+        
+        results = [None] * len(selected)
+        with ThreadPoolExecutor(max_workers=max(1, min(RESEARCH_MAX_WORKERS, len(selected)))) as executor:
+            futures = {
+                executor.submit(self.analyze_relevance, page['content'], user_requirements, page['url'], page['chunks']): i
+                for i, page in enumerate(selected)
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                results[index] = self._research_result(selected[index], future.result())
+                if on_progress:
+                    on_progress('analyze', completed, len(selected), selected[index]['url'])
+        return results
+    
+    def _research_result(self, website_data: Dict, relevance_analysis: Dict) -> Dict:
+        url = website_data['url']
+        return {
+            "source": f"Company Website ({urlparse(url).netloc})",
+            "content": relevance_analysis.get('excerpt') or website_data['content'],
+            "chunks": website_data['chunks'],
+            "relevance_score": relevance_analysis.get('relevance_score', 0),
+            "relevant_insights": relevance_analysis.get('relevant_insights', []),
+            "local_score": website_data['local_score'],
+            "url": url
+        }
     
-    def analyze_relevance(self, content: str, user_requirements: str, url: str) -> Dict[str, any]:
+    def analyze_relevance(self, content: str, user_requirements: str, url: str,
+                          chunks: Optional[List[str]] = None) -> Dict[str, any]:
         """Use LLM to analyze if content is relevant to user requirements"""
+        # Send the chunks that best match the requirements rather than the start of the page
+        excerpt = select_chunks(chunks if chunks is not None else chunk_text(content), user_requirements,
+                                keywords=RELEVANT_KEYWORDS)
         prompt = f"""
         Analyze the following content and determine its relevance to the user requirements.
         
         User Requirements: {user_requirements}
         Source URL: {url}
         
-        Content: {content[:2000]}...
+        Content: {excerpt}
         
         Provide a JSON response with:
         - "relevance_score": 0-10 (10 being highly relevant)
@@ -153,17 +609,20 @@ class IntelligenceAgent:
         """
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                messages=[
-                    {"role": "system", "content": "You are an expert content analyst. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500
-            )
+            with self._llm_slots:
+                response = self.openai_client.chat.completions.create(
+                    model=AZURE_OPENAI_DEPLOYMENT_NAME,
+                    messages=[
+                        {"role": "system", "content": "You are an expert content analyst. Respond only with valid JSON."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=500
+                )
+            self._record_usage(response)
             
             result = json.loads(response.choices[0].message.content)
             result['source_url'] = url
+            result['excerpt'] = excerpt
             return result
         except Exception as e:
             return {
@@ -172,7 +631,8 @@ class IntelligenceAgent:
                 "missing_info": ["Analysis failed"],
                 "recommendation": "search_elsewhere",
                 "best_for": [],
-                "source_url": url
+                "source_url": url,
+                "excerpt": excerpt
             }
     
     def generate_insights_table_with_links(self, company_info: Dict, research_results: List[Dict]) -> str:
@@ -217,7 +677,9 @@ class IntelligenceAgent:
         
         for result in research_results:
             all_content += f"\nSource: {result['source']}\n"
-            all_content += f"Content: {result['content'][:800]}...\n"
+            chunks = result.get('chunks') or chunk_text(result['content'])
+            excerpt = select_chunks(chunks, company_info['prompt'], REPORT_CONTENT_TOKENS, RELEVANT_KEYWORDS)
+            all_content += f"Content: {excerpt}\n"
         
         system_prompt = """You are an enterprise research assistant. Create a comprehensive insights table with these columns:
         - Insight Type
@@ -238,6 +700,7 @@ class IntelligenceAgent:
                 ],
                 max_tokens=1000
             )
+            self._record_usage(response)
             
             return response.choices[0].message.content
         except Exception as e:
@@ -306,12 +769,17 @@ def display_enhanced_table(df):
     else:
         st.dataframe(df, use_container_width=True)
 
+@st.cache_resource
+def get_http_cache() -> Optional[HttpCache]:
+    """Share one HTTP cache across Streamlit reruns and sessions"""
+    return HttpCache(HTTP_CACHE_DIR) if HTTP_CACHE_DIR else None
+
 def main():
     st.title("🔍 Enhanced Account Intelligence App")
     st.markdown("*Powered by AI-driven web research with clickable source links*")
     
     # Initialize components
-    web_researcher = WebResearcher()
+    web_researcher = WebResearcher(get_http_cache())
     intelligence_agent = IntelligenceAgent(openai_client, web_researcher)
     
     with st.form(key="enhanced_input_form"):
@@ -328,6 +796,8 @@ def main():
                                       placeholder="https://www.company.com, https://company.com/news")
             prompt = st.text_area("Intelligence Requirements", 
                                 placeholder="Account Insights, Buyer Intent, Growth Insights, Recent Hires, Funding")
+            crawl_links = st.checkbox("Crawl discovered links (news, careers, investors...)",
+                                      help=f"Follows links on the same sites up to depth {CRAWL_MAX_DEPTH}, at most {CRAWL_MAX_PAGES} extra pages")
         
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
@@ -347,27 +817,22 @@ def main():
             
             if support_urls.strip():
                 urls = [url.strip() for url in support_urls.split(',') if url.strip()]
+                urls = [url if url.startswith(('http://', 'https://')) else 'https://' + url for url in urls]
+                user_requirements = f"{research_topic} {search_queries} {prompt}"
                 
-                for i, url in enumerate(urls):
-                    if not url.startswith(('http://', 'https://')):
-                        url = 'https://' + url
-                    
-                    status_text.text(f"🌐 Scraping {urlparse(url).netloc}...")
-                    website_data = web_researcher.scrape_website(url)
-                    
-                    if website_data['status'] == 'success':
-                        user_requirements = f"{research_topic} {search_queries} {prompt}"
-                        relevance_analysis = intelligence_agent.analyze_relevance(
-                            website_data['content'], user_requirements, url
-                        )
-                        
-                        research_results.append({
-                            "source": f"Company Website ({urlparse(url).netloc})",
-                            "content": website_data['content'],
-                            "relevance_score": relevance_analysis.get('relevance_score', 0),
-                            "relevant_insights": relevance_analysis.get('relevant_insights', []),
-                            "url": url
-                        })
+                def show_progress(stage, completed, total, url):
+                    if stage == 'scrape':
+                        status_text.text(f"🌐 Scraped {urlparse(url).netloc} ({completed}/{total})...")
+                        progress_bar.progress(20 + int(30 * completed / total))
+                    else:
+                        status_text.text(f"🧠 Analyzed {urlparse(url).netloc} ({completed}/{total})...")
+                        progress_bar.progress(50 + int(30 * completed / total))
+                
+                status_text.text(f"🌐 Scraping {len(urls)} URL(s)...")
+                if crawl_links:
+                    research_results = intelligence_agent.crawl_and_research(urls, user_requirements, show_progress)
+                else:
+                    research_results = intelligence_agent.research_urls(urls, user_requirements, show_progress)
             
             progress_bar.progress(80)
             
@@ -394,6 +859,14 @@ def main():
             
             # Display results
             st.success("🎯 Intelligence Report Generated Successfully!")
+            if intelligence_agent.tokens_used:
+                st.caption(f"Azure OpenAI tokens used: {intelligence_agent.tokens_used:,}")
+            
+            # Show pages the local relevance filter did not send to the LLM
+            if intelligence_agent.skipped_pages:
+                with st.expander(f"⏭️ Skipped {len(intelligence_agent.skipped_pages)} page(s) with low local relevance"):
+                    for page in intelligence_agent.skipped_pages:
+                        st.write(f"[{page['title'] or page['url']}]({page['url']}): local score {page['local_score']} ({page['reason']})")
             
             # Show discovered URLs
             if web_researcher.discovered_urls:
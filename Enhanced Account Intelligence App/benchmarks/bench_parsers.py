@@ -0,0 +1,97 @@
+"""Benchmark the HTML parser backends on saved pages.
+
+Parses every fixture in benchmarks/fixtures (add your own saved .html pages there) with each
+installed backend, plus the original multi-pass BeautifulSoup extraction as a baseline, and
+reports median time per page, throughput and how many links and characters of text each found.
+
+    python benchmarks/bench_parsers.py --runs 20
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+from urllib.parse import urljoin
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+from html_parsing import BACKENDS, available_backends  # noqa: E402
+
+
+def parse_legacy(html: bytes) -> Dict:
+    """The extraction scrape_website used before the parser backends: three passes over the tree."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    links = [(link.get('href'), link.get_text()) for link in soup.find_all('a', href=True)]
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    return {"title": soup.title.string if soup.title else "", "text": text, "links": links}
+
+
+def measure(parse: Callable[[bytes], Dict], pages: List[bytes], runs: int) -> Dict:
+    parse(pages[0])  # import the backend outside the timed loop
+    per_page = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for html in pages:
+            parse(html)
+        per_page.append((time.perf_counter() - started) / len(pages))
+    results = [parse(html) for html in pages]
+    median = statistics.median(per_page)
+    return {
+        "page_ms": median * 1000,
+        "mb_per_sec": sum(len(html) for html in pages) / len(pages) / median / (1024 * 1024),
+        "links": sum(len(r["links"]) for r in results),
+        "text_chars": sum(len(r["text"]) for r in results),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--fixtures", default=os.path.join(HERE, "fixtures"))
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not paths:
+        print(f"No .html fixtures in {args.fixtures}", file=sys.stderr)
+        return 1
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / 1024:.0f} KiB total")
+
+    candidates = {"bs4 (legacy)": parse_legacy}
+    candidates.update((name, BACKENDS[name][1]) for name in available_backends())
+    baseline = None
+    print(f"{'backend':<14} {'ms/page':>9} {'MB/s':>8} {'speedup':>8} {'links':>7} {'text chars':>11}")
+    for name, parse in candidates.items():
+        r = measure(parse, pages, args.runs)
+        baseline = baseline or r["page_ms"]
+        print(
+            f"{name:<14} {r['page_ms']:>9.2f} {r['mb_per_sec']:>8.1f} {baseline / r['page_ms']:>7.1f}x "
+            f"{r['links']:>7} {r['text_chars']:>11,}"
+        )
+
+    # Backends should agree on what they extract, not just be fast
+    reference = [BACKENDS["bs4"][1](html) for html in pages]
+    for name in available_backends():
+        for path, html, ref in zip(paths, pages, reference):
+            got = BACKENDS[name][1](html)
+            if [urljoin("https://x/", h) for h, _ in got["links"]] != [urljoin("https://x/", h) for h, _ in ref["links"]]:
+                print(f"WARNING {name}: links differ from bs4 on {os.path.basename(path)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
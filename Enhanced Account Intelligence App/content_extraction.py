@@ -0,0 +1,173 @@
+"""Readability-style main-content extraction and token-budgeted chunking of parsed pages.
+
+Works on the text blocks produced by html_parsing: navigation, footers, cookie banners and
+link lists are dropped, the rest is grouped into chunks of at most CHUNK_TOKENS tokens, and
+a local BM25 scorer decides which pages and chunks are worth sending to the LLM.
+"""
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Sequence
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "250"))
+LLM_CONTENT_TOKENS = int(os.getenv("LLM_CONTENT_TOKENS", "600"))
+REPORT_CONTENT_TOKENS = int(os.getenv("REPORT_CONTENT_TOKENS", "200"))
+
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+# Outside <main>/<article>, blocks that are mostly link text or only a few words are menus and buttons
+MAX_LINK_DENSITY = 0.5
+MIN_BLOCK_WORDS = 5
+
+# Prefer <main>/<article> blocks when they hold at least this much text
+MIN_MAIN_CHARS = 200
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'in', 'is', 'it', 'its',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'will', 'with', 'e', 'g'
+}
+
+# Okapi BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Weight of the generic page keywords (news, careers...) relative to the user's requirement terms
+KEYWORD_WEIGHT = 0.5
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_WORD = re.compile(r'[a-z0-9]+')
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)"""
+    return max(1, (len(text) + 3) // 4)
+
+def _stem(word: str) -> str:
+    """Strip common English suffixes so hire, hires, hired and hiring match"""
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    return word[:-1] if word.endswith('e') and len(word) >= 4 else word
+
+def terms(text: str) -> List[str]:
+    """Lowercase, stemmed word terms without stopwords"""
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+def query_weights(query: str, keywords: Sequence[str] = ()) -> Dict[str, float]:
+    """Query terms with their weights: requirement terms count fully, generic keywords less"""
+    weights = {term: 1.0 for term in terms(query)}
+    for term in terms(' '.join(keywords)):
+        weights.setdefault(term, KEYWORD_WEIGHT)
+    return weights
+
+class BM25:
+    """Okapi BM25 over a small corpus of chunks"""
+    def __init__(self, documents: List[str], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.doc_terms = [Counter(terms(document)) for document in documents]
+        self.doc_lengths = [sum(counts.values()) for counts in self.doc_terms]
+        self.avg_length = sum(self.doc_lengths) / len(documents) if documents else 0
+        document_frequency = Counter()
+        for counts in self.doc_terms:
+            document_frequency.update(counts.keys())
+        n = len(documents)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()}
+    
+    def scores(self, weights: Dict[str, float]) -> List[float]:
+        """Score every document against weighted query terms"""
+        results = []
+        for counts, length in zip(self.doc_terms, self.doc_lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            score = 0.0
+            for term, weight in weights.items():
+                frequency = counts.get(term)
+                if frequency:
+                    score += weight * self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            results.append(score)
+        return results
+
+def rank_pages(pages_chunks: List[List[str]], query: str, keywords: Sequence[str] = ()) -> List[float]:
+    """Local relevance of each page: its best chunk's BM25 score, with IDF taken over every page's chunks"""
+    corpus = [chunk for chunks in pages_chunks for chunk in chunks]
+    scores = BM25(corpus).scores(query_weights(query, keywords))
+    page_scores, start = [], 0
+    for chunks in pages_chunks:
+        page_scores.append(max(scores[start:start + len(chunks)], default=0.0))
+        start += len(chunks)
+    return page_scores
+
+def extract_main_content(blocks: List[Dict]) -> List[Dict]:
+    """Keep the blocks that make up a page's main content"""
+    content = []
+    for block in blocks:
+        if block['boilerplate']:
+            continue
+        if not block['main'] and block['tag'] not in HEADING_TAGS:
+            if block['link_chars'] > MAX_LINK_DENSITY * len(block['text']):
+                continue
+            if len(block['text'].split()) < MIN_BLOCK_WORDS:
+                continue
+        content.append(block)
+
+    main = [block for block in content if block['main']]
+    if sum(len(block['text']) for block in main) >= MIN_MAIN_CHARS:
+        content = main
+    # Pages made only of short or linked text fall back to everything that is not page chrome
+    return content or [block for block in blocks if not block['boilerplate']] or blocks
+
+def _split_block(text: str, max_tokens: int) -> List[str]:
+    """Split an oversized block at sentence boundaries, and oversized sentences at words"""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    pieces, current = [], ''
+    for sentence in _SENTENCE_END.split(text):
+        while estimate_tokens(sentence) > max_tokens:
+            cut = sentence.rfind(' ', 0, max_tokens * 4)
+            cut = cut if cut > 0 else max_tokens * 4
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if current and estimate_tokens(current) + estimate_tokens(sentence) > max_tokens:
+            pieces.append(current)
+            current = ''
+        current = f"{current} {sentence}".strip()
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_blocks(blocks: List[Dict], max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Group consecutive blocks into chunks of at most max_tokens, starting a new chunk at each heading"""
+    chunks, current, size = [], [], 0
+    for block in blocks:
+        for piece in _split_block(block['text'], max_tokens):
+            tokens = estimate_tokens(piece)
+            if current and (size + tokens > max_tokens or block['tag'] in HEADING_TAGS):
+                chunks.append(' '.join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += tokens
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """Chunk plain text that has no block structure"""
+    return chunk_blocks([{'text': text, 'tag': 'p'}], max_tokens) if text else []
+
+def rank_chunks(chunks: List[str], query: str, keywords: Sequence[str] = ()) -> List[int]:
+    """Chunk indexes ordered by BM25 score against the query, best first (page order breaks ties)"""
+    scores = BM25(chunks).scores(query_weights(query, keywords))
+    return sorted(range(len(chunks)), key=lambda index: (-scores[index], index))
+
+def select_chunks(chunks: List[str], query: str, max_tokens: int = LLM_CONTENT_TOKENS,
+                  keywords: Sequence[str] = ()) -> str:
+    """Join the best-matching chunks that fit in max_tokens, in page order"""
+    selected, used = [], 0
+    for index in rank_chunks(chunks, query, keywords):
+        tokens = estimate_tokens(chunks[index])
+        if used + tokens > max_tokens:
+            continue
+        selected.append(index)
+        used += tokens
+    return '\n\n'.join(chunks[index] for index in sorted(selected))
@@ -0,0 +1,252 @@
+"""HTML parser backends that extract a page's title, text and links in a single pass.
+
+selectolax and lxml are used when installed, otherwise BeautifulSoup's html.parser.
+Pick one explicitly with the HTML_PARSER environment variable (auto, selectolax, lxml, bs4).
+"""
+import importlib.util
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+HTML_PARSER = os.getenv("HTML_PARSER", "auto")
+
+# Elements whose contents are never page text
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'template'}
+
+# Elements that start a new block of text
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'body', 'br', 'dd', 'details', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'td', 'th', 'tr', 'ul'
+}
+
+# Readability-style hints: page chrome that is never the main content
+BOILERPLATE_TAGS = {'nav', 'aside', 'form'}
+BOILERPLATE_ROLES = {'navigation', 'banner', 'contentinfo', 'complementary', 'dialog', 'alertdialog', 'search'}
+UNLIKELY_HINTS = re.compile(
+    r'nav|menu|footer|header|cookie|consent|gdpr|banner|sidebar|breadcrumb|social|share|'
+    r'newsletter|subscribe|popup|modal|promo|related|comment|masthead', re.I
+)
+LIKELY_HINTS = re.compile(r'article|content|main|post|story|entry|body', re.I)
+
+class _PageBuilder:
+    """Collects the title, links and text blocks from any backend's start/data/end events"""
+    def __init__(self):
+        self.title_parts = []
+        self.links = []
+        self.blocks = []
+        self._parts = []  # text of the block being built
+        self._link_chars = 0
+        self._stack = []  # (tag, boilerplate, main) for each open element
+        self._block_tags = ['body']
+        self._open_links = []  # [href, text parts] for each open <a>
+        self._skipping = 0
+        self._boilerplate = 0
+        self._main = 0
+        self._in_title = 0
+        self._hint_cache = {}  # class/id string -> boilerplate verdict; pages repeat the same classes
+    
+    def _is_boilerplate(self, tag: str, attrs) -> bool:
+        if tag in ('header', 'footer'):
+            return not self._main  # an article's own header/footer is content
+        if not attrs:
+            return tag in BOILERPLATE_TAGS
+        if tag in BOILERPLATE_TAGS or attrs.get('role') in BOILERPLATE_ROLES:
+            return True
+        classes = attrs.get('class') or ''
+        if isinstance(classes, list):  # BeautifulSoup splits class attributes
+            classes = ' '.join(classes)
+        hints = f"{classes} {attrs.get('id') or ''}"
+        verdict = self._hint_cache.get(hints)
+        if verdict is None:
+            verdict = self._hint_cache[hints] = bool(UNLIKELY_HINTS.search(hints)) and not LIKELY_HINTS.search(hints)
+        return verdict
+    
+    def start(self, tag: str, attrs):
+        if tag in SKIPPED_TAGS or self._skipping:
+            self._skipping += 1
+            self._stack.append((tag, False, False))
+            return
+        boilerplate = self._is_boilerplate(tag, attrs)
+        main = tag in ('main', 'article') or (bool(attrs) and attrs.get('role') == 'main')
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._block_tags.append(tag)
+        elif boilerplate or main:
+            self._flush()
+        self._boilerplate += boilerplate
+        self._main += main
+        if tag == 'a':
+            self._open_links.append([attrs.get('href'), []])
+        elif tag == 'title':
+            self._in_title += 1
+        self._stack.append((tag, boilerplate, main))
+    
+    def data(self, text: str):
+        if self._skipping or not text:
+            return
+        if self._in_title:
+            self.title_parts.append(text)
+            return
+        self._parts.append(text)
+        if self._open_links:
+            self._link_chars += len(text.strip())
+            for link in self._open_links:
+                link[1].append(text)
+    
+    def end(self):
+        tag, boilerplate, main = self._stack.pop()
+        if self._skipping:
+            self._skipping -= 1
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._block_tags.pop()
+        elif boilerplate or main:
+            self._flush()
+        self._boilerplate -= boilerplate
+        self._main -= main
+        if tag == 'a':
+            href, parts = self._open_links.pop()
+            if href:
+                self.links.append((href, ''.join(parts)))
+        elif tag == 'title':
+            self._in_title -= 1
+    
+    def _flush(self):
+        if not self._parts:
+            return
+        # Whitespace-only runs between tags do not make a block
+        text = ' '.join(''.join(self._parts).split())
+        if text:
+            self.blocks.append({
+                "text": text,
+                "tag": self._block_tags[-1],
+                "link_chars": min(self._link_chars, len(text)),
+                "boilerplate": self._boilerplate > 0,
+                "main": self._main > 0
+            })
+        self._parts = []
+        self._link_chars = 0
+    
+    def page(self) -> Dict:
+        self._flush()
+        return {
+            "title": ' '.join(''.join(self.title_parts).split()),
+            "text": ' '.join(block['text'] for block in self.blocks),
+            "links": [(href, ' '.join(text.split())) for href, text in self.links],  # (href, link text) in document order
+            "blocks": self.blocks  # text blocks with the hints content extraction needs
+        }
+
+def _decode(html: bytes, encoding: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """Decode a page as browsers do: the HTTP charset, then a BOM or <meta> charset, then UTF-8 or windows-1252"""
+    from bs4 import UnicodeDammit
+
+    if not encoding:
+        # Most pages are UTF-8; trying it first skips UnicodeDammit's slower charset sniffing
+        try:
+            return html.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            pass
+    dammit = UnicodeDammit(html, known_definite_encodings=[encoding] if encoding else [], is_html=True)
+    if dammit.unicode_markup is None:
+        return html.decode('utf-8', 'replace'), None
+    return dammit.unicode_markup, dammit.original_encoding
+
+def parse_with_selectolax(html: bytes, encoding: Optional[str] = None) -> Dict:
+    """Parse with selectolax's lexbor engine, dropping script/style in C before one walk over the tree"""
+    from selectolax.lexbor import LexborHTMLParser
+
+    # lexbor assumes UTF-8 for bytes, so other charsets are decoded first
+    tree = LexborHTMLParser(_decode(html, encoding)[0])
+    tree.strip_tags(list(SKIPPED_TAGS))
+    builder = _PageBuilder()
+    if tree.root is None:
+        return builder.page()
+    stack = [tree.root.iter(include_text=True)]
+    builder.start(tree.root.tag, tree.root.attributes)
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            builder.end()
+            continue
+        tag = node.tag
+        if tag == '-text':
+            builder.data(node.text_content)
+        elif tag != '-comment':
+            builder.start(tag, node.attributes)
+            stack.append(node.iter(include_text=True))
+    return builder.page()
+
+def parse_with_lxml(html: bytes, encoding: Optional[str] = None) -> Dict:
+    """Parse with lxml and collect text, title and links in one walk over the tree"""
+    from lxml import etree, html as lxml_html
+
+    # lxml rejects str input that carries an <?xml encoding?> declaration, so it gets the bytes and the charset
+    parser = lxml_html.HTMLParser(encoding=_decode(html, encoding)[1])
+    root = lxml_html.document_fromstring(html, parser=parser)
+    builder = _PageBuilder()
+    for event, element in etree.iterwalk(root, events=('start', 'end')):
+        if not isinstance(element.tag, str):  # comments and processing instructions
+            if event == 'end' and element.tail:
+                builder.data(element.tail)
+            continue
+        if event == 'start':
+            builder.start(element.tag, element.attrib)
+            if element.text:
+                builder.data(element.text)
+        else:
+            builder.end()
+            if element.tail:
+                builder.data(element.tail)
+    return builder.page()
+
+def parse_with_bs4(html: bytes, encoding: Optional[str] = None) -> Dict:
+    """Parse with BeautifulSoup's pure-Python html.parser in one walk over the tree"""
+    from bs4 import BeautifulSoup, NavigableString, CData
+
+    soup = BeautifulSoup(html, 'html.parser', from_encoding=encoding)
+    builder = _PageBuilder()
+    stack = [iter(soup.children)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            if stack:
+                builder.end()
+        elif isinstance(node, NavigableString):
+            # Comments, doctypes and script/style contents are NavigableString subclasses
+            if type(node) in (NavigableString, CData):
+                builder.data(str(node))
+        else:
+            builder.start(node.name, node.attrs)
+            stack.append(iter(node.children))
+    return builder.page()
+
+BACKENDS = {
+    "selectolax": ("selectolax", parse_with_selectolax),
+    "lxml": ("lxml", parse_with_lxml),
+    "bs4": ("bs4", parse_with_bs4)
+}
+
+def available_backends() -> List[str]:
+    """Installed backends, fastest first"""
+    return [name for name, (module, _) in BACKENDS.items() if importlib.util.find_spec(module)]
+
+def get_parser(name: str = HTML_PARSER) -> Callable[..., Dict]:
+    """Return the named backend, or the fastest installed one for 'auto'"""
+    if name == "auto":
+        installed = available_backends()
+        if not installed:
+            raise ImportError("No HTML parser installed; install selectolax, lxml or beautifulsoup4")
+        name = installed[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser '{name}'; choose from auto, {', '.join(BACKENDS)}")
+    return BACKENDS[name][1]
+
+def parse_html(html: bytes, parser: Callable[..., Dict] = None, encoding: Optional[str] = None) -> Dict:
+    """Extract {title, text, links} from an HTML document, given the charset from the HTTP headers if any"""
+    if not html or not html.strip():
+        return _PageBuilder().page()
+    return (parser or get_parser())(html, encoding)
@@ -0,0 +1,12 @@
+"""Make the app's modules importable without real Azure OpenAI credentials."""
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+# app.py builds its OpenAI client at import time; the tests never call it
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "test")
+os.environ.setdefault("AZURE_OPENAI_API_BASE", "http://localhost")
+os.environ.setdefault("OPENAI_API_VERSION", "2024-01-01")
@@ -0,0 +1,42 @@
+"""Local BM25 relevance scoring."""
+
+import pytest
+
+from content_extraction import BM25, KEYWORD_WEIGHT, query_weights, rank_chunks, rank_pages, terms
+
+
+def test_terms_are_stemmed_and_stopwords_dropped():
+    assert terms("The company is Hiring; it hires and hired") == ["company", "hir", "hir", "hir"]
+    assert terms("Announcements of new releases") == ["announcement", "new", "releas"]
+
+
+def test_requirement_terms_outweigh_generic_keywords():
+    assert query_weights("hiring engineers", ["careers", "hiring"]) == {
+        "hir": 1.0, "engineer": 1.0, "career": KEYWORD_WEIGHT
+    }
+
+
+def test_rare_terms_and_shorter_documents_score_higher():
+    bm25 = BM25(["acme hires engineers", "acme news", "acme acme acme news about engineers and other things"])
+    scores = bm25.scores({"engineer": 1.0})
+    assert scores[1] == 0.0
+    assert scores[0] > scores[2] > 0
+    assert bm25.idf["engineer"] > bm25.idf["acm"]  # in two documents versus all three
+    assert bm25.scores({"acm": 1.0, "engineer": 1.0})[0] > scores[0]
+
+
+def test_empty_corpus_scores_nothing():
+    assert BM25([]).scores({"acm": 1.0}) == []
+
+
+def test_chunks_rank_best_first_with_page_order_breaking_ties():
+    chunks = ["About us", "Funding round closed", "About the team", "Series B funding and funding plans"]
+    assert rank_chunks(chunks, "funding") == [3, 1, 0, 2]
+
+
+def test_pages_score_by_their_best_chunk():
+    pages = [["Company history", "Office locations"], ["Press", "Acme raises Series B funding"], []]
+    scores = rank_pages(pages, "funding round")
+    assert scores[0] == 0.0 and scores[2] == 0.0
+    assert scores[1] == pytest.approx(BM25(["Company history", "Office locations", "Press",
+                                            "Acme raises Series B funding"]).scores({"fund": 1.0, "round": 1.0})[3])
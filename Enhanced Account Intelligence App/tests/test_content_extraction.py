@@ -0,0 +1,55 @@
+"""Main-content extraction and token-budgeted chunking."""
+
+from content_extraction import chunk_blocks, chunk_text, estimate_tokens, extract_main_content, select_chunks
+from html_parsing import parse_html
+
+ARTICLE = " ".join(["Acme opened a new plant in Austin and plans to hire two hundred engineers this year."] * 3)
+
+
+def _blocks(body):
+    return parse_html(f"<html><body>{body}</body></html>".encode(), None)["blocks"]
+
+
+def test_page_chrome_and_link_lists_are_dropped():
+    blocks = _blocks(
+        "<nav><a href='/'>Home</a> <a href='/about'>About us and our history</a></nav>"
+        "<div class='cookie-banner'>We use cookies to improve your experience on this site.</div>"
+        "<div><a href='/a'>First related story link</a> <a href='/b'>Second related story</a></div>"
+        "<div>Short</div>"
+        f"<div><h2>Expansion</h2><p>{ARTICLE}</p></div>"
+        "<footer>Copyright Acme Corporation, all rights reserved worldwide.</footer>"
+    )
+    assert [block['text'] for block in extract_main_content(blocks)] == ["Expansion", ARTICLE]
+
+
+def test_main_element_wins_when_it_has_enough_text():
+    blocks = _blocks(f"<div><p>{ARTICLE} Sidebar style paragraph.</p></div><main><p>{ARTICLE}</p></main>")
+    assert [block['main'] for block in extract_main_content(blocks)] == [True]
+
+
+def test_pages_without_content_fall_back_to_everything_but_chrome():
+    blocks = _blocks("<nav>Menu</nav><div>Only a few words</div>")
+    assert [block['text'] for block in extract_main_content(blocks)] == ["Only a few words"]
+
+
+def test_chunks_respect_the_token_budget_and_start_at_headings():
+    blocks = [{'text': "Intro sentence here.", 'tag': 'p'}, {'text': "Careers", 'tag': 'h2'},
+              {'text': ARTICLE, 'tag': 'p'}]
+    chunks = chunk_blocks(blocks, max_tokens=30)
+    assert chunks[0] == "Intro sentence here."
+    assert chunks[1].startswith("Careers Acme opened")
+    assert all(estimate_tokens(chunk) <= 30 for chunk in chunks)
+    assert " ".join(chunks).split() == " ".join(block['text'] for block in blocks).split()
+
+
+def test_oversized_sentences_are_split_at_words():
+    chunks = chunk_text("word " * 200, max_tokens=20)
+    assert len(chunks) > 1 and all(estimate_tokens(chunk) <= 20 for chunk in chunks)
+    assert chunk_text("") == []
+
+
+def test_selected_chunks_fit_the_budget_in_page_order():
+    chunks = ["Company history since 1950.", "We are hiring engineers in Austin.", "Hiring events for engineers."]
+    assert select_chunks(chunks, "hiring engineers", max_tokens=20) == (
+        "We are hiring engineers in Austin.\n\nHiring events for engineers."
+    )
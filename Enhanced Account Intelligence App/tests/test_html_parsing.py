@@ -0,0 +1,35 @@
+"""Every installed parser backend decodes and extracts pages the same way."""
+
+import pytest
+
+from html_parsing import available_backends, BACKENDS, parse_html
+
+PAGES = {
+    "utf-8 without a charset": ("<p>Café — 日本</p>".encode("utf-8"), None, "Café — 日本"),
+    "windows-1252 from HTTP": ("<p>Café crème</p>".encode("cp1252"), "windows-1252", "Café crème"),
+    "meta charset": ('<meta charset="iso-8859-1"><p>Café</p>'.encode("latin-1"), None, "Café"),
+    "xhtml declaration": (
+        '<?xml version="1.0" encoding="utf-8"?>\n<html xmlns="http://www.w3.org/1999/xhtml"><body><p>Café</p>'
+        "</body></html>".encode("utf-8"), None, "Café"
+    ),
+}
+
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("page", PAGES)
+def test_backends_decode_declared_charsets(backend, page):
+    html, encoding, text = PAGES[page]
+    assert parse_html(html, BACKENDS[backend][1], encoding)["text"] == text
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backends_extract_title_links_and_blocks(backend):
+    html = (b"<html><head><title> Acme </title><script>var x = 1;</script></head><body>"
+            b"<nav><a href='/about'>About</a></nav><main><h1>News</h1><p>We are <a href='/jobs'>hiring</a>.</p></main>"
+            b"</body></html>")
+    page = parse_html(html, BACKENDS[backend][1])
+    assert page["title"] == "Acme"
+    assert page["links"] == [("/about", "About"), ("/jobs", "hiring")]
+    assert [(block["text"], block["boilerplate"], block["main"]) for block in page["blocks"]] == [
+        ("About", True, False), ("News", False, True), ("We are hiring.", False, True)
+    ]
@@ -0,0 +1,75 @@
+"""Conditional revalidation through the on-disk HTTP cache."""
+
+import pytest
+import requests
+
+import app
+
+
+def _response(status=200, body=b"", **headers):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers)
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+class FakeSession:
+    """Answers each GET from a queue of responses and records the request headers."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        self.headers = {'User-Agent': 'test'}
+
+    def get(self, url, timeout=None, headers=None):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def researcher(tmp_path):
+    def make(*responses, ttl=0):
+        researcher = app.WebResearcher(app.HttpCache(str(tmp_path), ttl=ttl))
+        researcher.session = FakeSession(*responses)
+        return researcher
+    return make
+
+
+def test_fresh_entries_are_served_without_a_request(researcher):
+    web = researcher(_response(body=b"<p>hello</p>", ETag='"v1"'), ttl=3600)
+    assert web._fetch("https://example.com/") == (b"<p>hello</p>", None)
+    assert web._fetch("https://example.com/?utm_source=x") == (b"<p>hello</p>", None)
+    assert len(web.session.requests) == 1
+    assert web.http_cache.stats == {'hits': 1, 'revalidated': 0, 'misses': 1}
+
+
+def test_stale_entries_are_revalidated_with_validators(researcher):
+    web = researcher(
+        _response(body=b"<p>caf\xe9</p>", ETag='"v1"', **{'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT',
+                                                        'Content-Type': 'text/html; charset=windows-1252'}),
+        _response(304, ETag='"v2"')
+    )
+    web._fetch("https://example.com/")
+    assert web._fetch("https://example.com/") == (b"<p>caf\xe9</p>", "windows-1252")
+    assert web.session.requests[1][1] == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    assert web.http_cache.get("https://example.com/")['etag'] == '"v2"'
+    assert web.http_cache.stats == {'hits': 0, 'revalidated': 1, 'misses': 1}
+
+
+def test_changed_pages_replace_the_cached_body(researcher):
+    web = researcher(_response(body=b"old", ETag='"v1"'), _response(body=b"new", ETag='"v2"'))
+    web._fetch("https://example.com/")
+    assert web._fetch("https://example.com/") == (b"new", None)
+    assert web.http_cache.get("https://example.com/")['body'] == b"new"
+
+
+def test_no_store_responses_are_not_cached(researcher):
+    no_store = {'Cache-Control': 'private, no-store'}
+    web = researcher(_response(body=b"secret", **no_store), _response(body=b"secret", **no_store))
+    web._fetch("https://example.com/")
+    web._fetch("https://example.com/")
+    assert web.session.requests[1][1] == {}
+    assert web.http_cache.get("https://example.com/") is None
+
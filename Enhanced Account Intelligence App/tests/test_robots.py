@@ -0,0 +1,35 @@
+"""robots.txt handling for the polite crawler."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import app
+
+
+def _robots_response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    return response
+
+
+def test_robots_txt_is_fetched_once_per_host_and_hosts_fetch_in_parallel():
+    web = app.WebResearcher()
+    calls = []
+
+    def get(url, timeout=None, headers=None):
+        calls.append(url)
+        time.sleep(0.2)
+        return _robots_response(b"User-agent: *\nDisallow: /private\n")
+
+    web.session.get = get
+    urls = [f"https://site{n % 4}.example/page{n}" for n in range(12)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        robots = list(executor.map(web._robots_for, urls))
+    assert time.perf_counter() - started < 0.6
+    assert sorted(calls) == [f"https://site{n}.example/robots.txt" for n in range(4)]
+    assert not robots[0].can_fetch('test', "https://site0.example/private/x")
+    assert robots[0] is robots[4]
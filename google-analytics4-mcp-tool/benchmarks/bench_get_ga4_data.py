@@ -0,0 +1,187 @@
+"""Benchmark get_ga4_data end to end against an in-process fake Data API.
+
+Measures request building, filter parsing, row conversion and JSON serialization for reports of
+1k, 100k and 1M rows and for dimension filters of increasing depth. Each scenario reports
+throughput, p50/p99 latency and peak traced memory.
+
+    python benchmarks/bench_get_ga4_data.py
+    python benchmarks/bench_get_ga4_data.py --quick --save baseline.json
+    python benchmarks/bench_get_ga4_data.py --compare baseline.json --threshold 0.25
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.join(HERE, "..", "src")]
+
+# Keep the server's quota scheduler and caches out of the measurements
+os.environ.setdefault("GA4_PROPERTY_ID", "123456789")
+os.environ.setdefault("GA4_QUOTA_TOKENS_PER_HOUR", "1000000000")
+os.environ.pop("GA4_CACHE_PATH", None)
+
+import index  # noqa: E402
+from fake_data_api import FakeDataClient, install  # noqa: E402
+
+DIMENSIONS = ["date", "country", "deviceCategory", "sessionSource"]
+METRICS = ["sessions", "screenPageViews", "eventCount", "conversions"]
+
+
+def _tool(fn: Any) -> Callable[..., Any]:
+    # FastMCP versions differ on whether @mcp.tool() returns the function or a wrapper around it
+    return getattr(fn, "fn", fn)
+
+
+def filter_tree(depth: int, fanout: int = 2) -> Dict[str, Any]:
+    """A balanced and/or tree of `depth` levels over string and in-list leaf filters."""
+    if depth <= 0:
+        return {"filter": {"fieldName": "country", "inListFilter": {"values": ["United States", "Germany", "India"]}}}
+    group = "andGroup" if depth % 2 else "orGroup"
+    children = [filter_tree(depth - 1, fanout) for _ in range(fanout - 1)]
+    children.append({"filter": {"fieldName": "sessionSource", "stringFilter": {"matchType": "CONTAINS", "value": "goog"}}})
+    return {group: {"expressions": children}}
+
+
+def _run(call: Callable[[], Any]) -> int:
+    result = call()
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(result["error"])
+    return len(json.dumps(result))
+
+
+def measure(name: str, call: Callable[[], Any], rows: int, iterations: int, warmup: int = 1) -> Dict[str, Any]:
+    for _ in range(warmup):
+        _run(call)
+
+    latencies: List[float] = []
+    payload_bytes = 0
+    for _ in range(iterations):
+        gc.collect()
+        started = time.perf_counter()
+        payload_bytes = _run(call)
+        latencies.append(time.perf_counter() - started)
+
+    # Memory is traced in a separate pass because tracemalloc slows allocation-heavy code
+    gc.collect()
+    tracemalloc.start()
+    _run(call)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "name": name,
+        "iterations": iterations,
+        "rows": rows,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(round(0.99 * (len(latencies) - 1))))] * 1000,
+        "calls_per_sec": iterations / total,
+        "rows_per_sec": rows * iterations / total,
+        "peak_mb": peak / (1024 * 1024),
+        "payload_mb": payload_bytes / (1024 * 1024),
+    }
+
+
+def report_scenarios(sizes: List[int], iterations: int, latency: float) -> List[Dict[str, Any]]:
+    get_ga4_data = _tool(index.get_ga4_data)
+    results = []
+    for rows in sizes:
+        install(index, FakeDataClient(rows, latency=latency))
+        for output_format in ("rows", "columnar"):
+            call = lambda: get_ga4_data(  # noqa: E731
+                DIMENSIONS, METRICS, "2024-01-01", "2024-12-31",
+                limit=rows, proceed_with_large_dataset=True, enable_aggregation=False,
+                use_cache=False, incremental=False, format=output_format,
+            )
+            runs = max(3, iterations // max(1, rows // 10000))
+            results.append(measure(f"report {rows:>9,} rows {output_format}", call, rows, runs))
+    return results
+
+
+def filter_scenarios(depths: List[int], iterations: int, latency: float) -> List[Dict[str, Any]]:
+    get_ga4_data = _tool(index.get_ga4_data)
+    rows = 1000
+    install(index, FakeDataClient(rows, latency=latency))
+    results = []
+    for depth in depths:
+        tree = filter_tree(depth)
+        call = lambda: get_ga4_data(  # noqa: E731
+            DIMENSIONS, METRICS, "2024-01-01", "2024-12-31", dimension_filter=json.dumps(tree),
+            limit=rows, use_cache=False, incremental=False,
+        )
+        results.append(measure(f"filter depth {depth:>2} ({rows} rows)", call, rows, iterations * 5))
+    return results
+
+
+def print_table(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+    header = f"{'scenario':<34} {'p50 ms':>10} {'p99 ms':>10} {'rows/s':>12} {'calls/s':>9} {'peak MB':>9}"
+    if baseline:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = (
+            f"{r['name']:<34} {r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f} {r['rows_per_sec']:>12,.0f} "
+            f"{r['calls_per_sec']:>9.1f} {r['peak_mb']:>9.1f}"
+        )
+        if baseline and r["name"] in baseline:
+            line += f" {r['p50_ms'] / baseline[r['name']]['p50_ms'] - 1:>+11.1%}"
+        print(line)
+
+
+def regressions(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    found = []
+    for r in results:
+        base = baseline.get(r["name"])
+        if base is None:
+            continue
+        for field in ("p50_ms", "peak_mb"):
+            if base[field] and r[field] > base[field] * (1 + threshold):
+                found.append(f"{r['name']}: {field} {base[field]:.2f} -> {r[field]:.2f}")
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--depths", type=int, nargs="+", default=[0, 2, 4, 8, 12])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated API latency in seconds")
+    parser.add_argument("--quick", action="store_true", help="skip the 1M-row report")
+    parser.add_argument("--save", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON written by --save")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing")
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes if not (args.quick and s >= 1000000)]
+    results = report_scenarios(sizes, args.iterations, args.latency)
+    results += filter_scenarios(args.depths, args.iterations, args.latency)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {r["name"]: r for r in json.load(f)["results"]}
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+
+    if baseline:
+        found = regressions(results, baseline, args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
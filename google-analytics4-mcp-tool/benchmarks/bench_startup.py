@@ -0,0 +1,110 @@
+"""Benchmark cold start of the stdio MCP server.
+
+Spawns `src/index.py` repeatedly and measures time to the `initialize` response (the MCP handshake)
+and to the first catalog tool result, with the GA4 SDK loaded lazily (the default), imported eagerly
+before the server starts (the old behaviour), and with GA4_PREWARM=true.
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(HERE, "..", "src", "index.py")
+
+MODES = {
+    "lazy": ([SERVER], {}),
+    "eager": (
+        ["-c", "import google.analytics.data_v1beta, runpy, sys; sys.argv = [sys.argv[1]]; "
+               "runpy.run_path(sys.argv[0], run_name='__main__')", SERVER],
+        {},
+    ),
+    "prewarm": ([SERVER], {"GA4_PREWARM": "true"}),
+}
+
+INITIALIZE = {
+    "jsonrpc": "2.0", "id": 1, "method": "initialize",
+    "params": {"protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "bench", "version": "0"}},
+}
+INITIALIZED = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+CATALOG_CALL = {
+    "jsonrpc": "2.0", "id": 2, "method": "tools/call",
+    "params": {"name": "list_dimension_categories", "arguments": {}},
+}
+
+
+def _send(proc: subprocess.Popen, message: Dict) -> None:
+    proc.stdin.write(json.dumps(message) + "\n")
+    proc.stdin.flush()
+
+
+def _read_response(proc: subprocess.Popen, request_id: int) -> Dict:
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"server exited before answering request {request_id}: {proc.stderr.read()[-2000:]}")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def run_once(mode: str) -> Dict[str, float]:
+    args, extra_env = MODES[mode]
+    env = {**os.environ, "GA4_PROPERTY_ID": os.environ.get("GA4_PROPERTY_ID", "123456789"), **extra_env}
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, *args], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, env=env,
+    )
+    try:
+        _send(proc, INITIALIZE)
+        _read_response(proc, 1)
+        handshake = time.perf_counter() - started
+        _send(proc, INITIALIZED)
+        _send(proc, CATALOG_CALL)
+        _read_response(proc, 2)
+        first_tool = time.perf_counter() - started
+    finally:
+        proc.kill()
+        proc.wait()
+    return {"handshake_ms": handshake * 1000, "first_tool_ms": first_tool * 1000}
+
+
+def sdk_loaded_at_import() -> bool:
+    probe = (
+        f"import sys; sys.path.insert(0, {os.path.dirname(SERVER)!r}); import index; "
+        "index.list_dimension_categories(); print('google.analytics.data_v1beta' in sys.modules)"
+    )
+    env = {**os.environ, "GA4_PROPERTY_ID": "123456789"}
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, env=env, check=True)
+    return out.stdout.strip().endswith("True")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    print(f"GA4 SDK loaded by import + catalog tool: {sdk_loaded_at_import()}")
+    print(f"{'mode':<10} {'handshake p50 ms':>17} {'min ms':>9} {'first tool p50 ms':>18}")
+    for mode in args.modes:
+        run_once(mode)  # warm the OS file cache so every mode starts from the same state
+        runs: List[Dict[str, float]] = [run_once(mode) for _ in range(args.runs)]
+        handshakes = [r["handshake_ms"] for r in runs]
+        print(
+            f"{mode:<10} {statistics.median(handshakes):>17.1f} {min(handshakes):>9.1f} "
+            f"{statistics.median(r['first_tool_ms'] for r in runs):>18.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
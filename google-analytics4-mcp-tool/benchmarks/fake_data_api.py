@@ -0,0 +1,100 @@
+"""In-process stand-in for BetaAnalyticsDataClient that serves synthetic reports."""
+
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from google.analytics.data_v1beta.types import (
+    BatchRunReportsResponse,
+    MetricType,
+    RunReportResponse,
+)
+
+# The Data API returns 10,000 rows when a request sets no limit
+_DEFAULT_API_LIMIT = 10000
+
+
+class FakeDataClient:
+    """Serves RunReport/BatchRunReports with `total_rows` synthetic rows after `latency` seconds.
+
+    Responses are built once per (dimensions, metrics, offset, limit) and kept as serialized bytes,
+    so every call pays the same protobuf decode cost as a real gRPC response but not the generation.
+    """
+
+    def __init__(self, total_rows: int, latency: float = 0.0, cardinality: int = 1000):
+        self.total_rows = total_rows
+        self.latency = latency
+        self.cardinality = max(1, cardinality)
+        self.calls = 0
+        self._payloads: Dict[Tuple[Any, ...], bytes] = {}
+        self._lock = threading.Lock()
+
+    def _payload(self, dimensions: Tuple[str, ...], metrics: Tuple[str, ...], offset: int, limit: int) -> bytes:
+        key = (dimensions, metrics, offset, limit)
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is None:
+                payload = self._build(dimensions, metrics, offset, limit)
+                self._payloads[key] = payload
+            return payload
+
+    def _build(self, dimensions: Tuple[str, ...], metrics: Tuple[str, ...], offset: int, limit: int) -> bytes:
+        pb = RunReportResponse.pb()()
+        for name in dimensions:
+            pb.dimension_headers.add(name=name)
+        for name in metrics:
+            pb.metric_headers.add(name=name, type_=MetricType.TYPE_INTEGER)
+        pb.row_count = self.total_rows
+        for i in range(offset, min(self.total_rows, offset + limit)):
+            row = pb.rows.add()
+            for d, name in enumerate(dimensions):
+                if name == "date":
+                    row.dimension_values.add(value=f"2024{(i % 12) + 1:02d}{(i % 28) + 1:02d}")
+                else:
+                    row.dimension_values.add(value=f"{name}-{(i + d) % self.cardinality}")
+            for m in range(len(metrics)):
+                row.metric_values.add(value=str((i * (m + 7)) % 100000))
+        return pb.SerializeToString()
+
+    def _respond(self, request: Any) -> Any:
+        payload = self._payload(
+            tuple(d.name for d in request.dimensions),
+            tuple(m.name for m in request.metrics),
+            int(request.offset),
+            int(request.limit) or _DEFAULT_API_LIMIT,
+        )
+        return RunReportResponse.deserialize(payload)
+
+    def run_report(self, request: Any = None, **kwargs: Any) -> Any:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(request)
+
+    def batch_run_reports(self, request: Any = None, **kwargs: Any) -> Any:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return BatchRunReportsResponse(reports=[self._respond(r) for r in request.requests])
+
+
+class FakeChannel:
+    """Enough of grpc.Channel for the server's client pool: always healthy, nothing to close."""
+
+    def subscribe(self, callback: Any, try_to_connect: bool = False) -> None:
+        pass
+
+    def unsubscribe(self, callback: Any) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def install(index: Any, client: FakeDataClient) -> None:
+    """Point every pooled Data API client the server creates at `client`, dropping existing pools."""
+    index._GA4ClientManager._connect = lambda self: index._PooledClient(client, FakeChannel())
+    with index._property_contexts_lock:
+        index._property_contexts.clear()
@@ -2,18 +2,192 @@ from __future__ import annotations
 
 import os
 import json
-from typing import Any, Dict
+import asyncio
+import base64
+import contextvars
+import difflib
+import hashlib
+import importlib
+import itertools
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple
 
 from fastmcp import FastMCP
-from google.analytics.data_v1beta import BetaAnalyticsDataClient
-from google.analytics.data_v1beta.types import (
-    DateRange, Dimension, Metric, RunReportRequest, Filter, FilterExpression, FilterExpressionList,
-    OrderBy, MetricAggregation
-)
+
+if TYPE_CHECKING:
+    import grpc
+    from google.api_core import exceptions as gapi_exceptions
+    from google.analytics.data_v1beta import BetaAnalyticsDataAsyncClient, BetaAnalyticsDataClient
+    from google.analytics.data_v1beta.services.beta_analytics_data.transports import (
+        BetaAnalyticsDataGrpcAsyncIOTransport, BetaAnalyticsDataGrpcTransport
+    )
+    from google.analytics.data_v1beta.types import (
+        DateRange, Dimension, Metric, RunReportRequest, Filter, FilterExpression, FilterExpressionList,
+        OrderBy, MetricAggregation, RunReportResponse, BatchRunReportsRequest, MetricType, NumericValue,
+        RunRealtimeReportRequest, Cohort, CohortSpec, CohortsRange, CohortReportSettings
+    )
+    from google.analytics.data_v1alpha import AlphaAnalyticsDataClient
+    from google.analytics.data_v1alpha.services.alpha_analytics_data.transports import AlphaAnalyticsDataGrpcTransport
+    from google.analytics.data_v1alpha.types import (
+        DateRange as FunnelDateRange, Dimension as FunnelDimension, Funnel, FunnelBreakdown, FunnelEventFilter, FunnelFilterExpression,
+        FunnelStep, RunFunnelReportRequest, RunFunnelReportResponse
+    )
+
+
+# The GA4 SDK, grpc and google-api-core take a few hundred milliseconds to import, so they are bound
+# to these module names on first use instead of before the MCP handshake
+_SDK_IMPORTS: Dict[str, Tuple[str, Optional[str]]] = {
+    "grpc": ("grpc", None),
+    "gapi_exceptions": ("google.api_core.exceptions", None),
+    "BetaAnalyticsDataClient": ("google.analytics.data_v1beta", "BetaAnalyticsDataClient"),
+    "BetaAnalyticsDataAsyncClient": ("google.analytics.data_v1beta", "BetaAnalyticsDataAsyncClient"),
+    **{
+        name: ("google.analytics.data_v1beta.services.beta_analytics_data.transports", name)
+        for name in ("BetaAnalyticsDataGrpcTransport", "BetaAnalyticsDataGrpcAsyncIOTransport")
+    },
+    **{
+        name: ("google.analytics.data_v1beta.types", name)
+        for name in (
+            "DateRange", "Dimension", "Metric", "RunReportRequest", "Filter", "FilterExpression",
+            "FilterExpressionList", "OrderBy", "MetricAggregation", "RunReportResponse",
+            "BatchRunReportsRequest", "MetricType", "NumericValue", "RunRealtimeReportRequest", "Cohort",
+            "CohortSpec", "CohortsRange", "CohortReportSettings"
+        )
+    },
+}
+# Funnel reports only exist in the v1alpha API, which is loaded separately on the first funnel request
+_ALPHA_SDK_IMPORTS: Dict[str, Tuple[str, Optional[str]]] = {
+    "AlphaAnalyticsDataClient": ("google.analytics.data_v1alpha", "AlphaAnalyticsDataClient"),
+    "AlphaAnalyticsDataGrpcTransport": (
+        "google.analytics.data_v1alpha.services.alpha_analytics_data.transports", "AlphaAnalyticsDataGrpcTransport"
+    ),
+    "FunnelDateRange": ("google.analytics.data_v1alpha.types", "DateRange"),
+    "FunnelDimension": ("google.analytics.data_v1alpha.types", "Dimension"),
+    **{
+        name: ("google.analytics.data_v1alpha.types", name)
+        for name in (
+            "Funnel", "FunnelBreakdown", "FunnelEventFilter", "FunnelFilterExpression", "FunnelStep",
+            "RunFunnelReportRequest", "RunFunnelReportResponse"
+        )
+    },
+}
+_sdk_hooks: List[Callable[[], None]] = []
+_sdk_lock = threading.Lock()
+_sdk_loaded = False
+_alpha_sdk_loaded = False
+
+
+def _import_names(imports: Dict[str, Tuple[str, Optional[str]]]) -> None:
+    resolved: Dict[str, Any] = {}
+    for alias, (module_name, attr) in imports.items():
+        module = importlib.import_module(module_name)
+        resolved[alias] = getattr(module, attr) if attr else module
+    globals().update(resolved)
+
+
+def _load_sdk() -> None:
+    """Import the GA4 SDK once, rebind the placeholder names to the real objects and run the hooks
+    that build SDK-derived tables."""
+    global _sdk_loaded
+    if _sdk_loaded:
+        return
+    with _sdk_lock:
+        if _sdk_loaded:
+            return
+        _import_names(_SDK_IMPORTS)
+        for hook in _sdk_hooks:
+            hook()
+        _sdk_loaded = True
+
+
+def _load_alpha_sdk() -> None:
+    global _alpha_sdk_loaded
+    if _alpha_sdk_loaded:
+        return
+    _load_sdk()
+    with _sdk_lock:
+        if not _alpha_sdk_loaded:
+            _import_names(_ALPHA_SDK_IMPORTS)
+            _alpha_sdk_loaded = True
+
+
+def _on_sdk_load(hook: Callable[[], None]) -> Callable[[], None]:
+    _sdk_hooks.append(hook)
+    return hook
+
+
+class _LazySdkName:
+    """Placeholder for an SDK name: the first attribute access or call loads the SDK, after which the
+    module global holds the real object and the placeholder is no longer reached."""
+
+    def __init__(self, name: str, load: Callable[[], None]):
+        self._name = name
+        self._load = load
+
+    def _target(self) -> Any:
+        self._load()
+        return globals()[self._name]
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._target(), attr)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._target()(*args, **kwargs)
+
+
+if not TYPE_CHECKING:
+    globals().update({alias: _LazySdkName(alias, _load_sdk) for alias in _SDK_IMPORTS})
+    globals().update({alias: _LazySdkName(alias, _load_alpha_sdk) for alias in _ALPHA_SDK_IMPORTS})
+
 
 # Configuration from environment variables
 CREDENTIALS_PATH = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 GA4_PROPERTY_ID = os.getenv("GA4_PROPERTY_ID") or os.getenv("GA_PROPERTY_ID")
+GA4_CLIENT_POOL_SIZE = int(os.getenv("GA4_CLIENT_POOL_SIZE", "4"))
+GA4_KEEPALIVE_MS = int(os.getenv("GA4_KEEPALIVE_MS", "30000"))
+GA4_PROPERTY_CONCURRENCY = int(os.getenv("GA4_PROPERTY_CONCURRENCY", "10"))
+GA4_QUOTA_TOKENS_PER_HOUR = int(os.getenv("GA4_QUOTA_TOKENS_PER_HOUR", "40000"))
+GA4_QUOTA_MAX_WAIT = float(os.getenv("GA4_QUOTA_MAX_WAIT", "30"))
+GA4_MAX_RETRIES = int(os.getenv("GA4_MAX_RETRIES", "4"))
+GA4_RETRY_BASE_DELAY = float(os.getenv("GA4_RETRY_BASE_DELAY", "0.5"))
+GA4_RETRY_MAX_DELAY = float(os.getenv("GA4_RETRY_MAX_DELAY", "30"))
+GA4_RESTRICT_PROPERTIES = os.getenv("GA4_RESTRICT_PROPERTIES", "false").lower() in ("1", "true", "yes")
+GA4_VALIDATE_NAMES = os.getenv("GA4_VALIDATE_NAMES", "true").lower() not in ("0", "false", "no")
+GA4_CACHE_MAX_ENTRIES = int(os.getenv("GA4_CACHE_MAX_ENTRIES", "512"))
+GA4_CACHE_MAX_BYTES = int(os.getenv("GA4_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+GA4_CACHE_PATH = os.getenv("GA4_CACHE_PATH")
+GA4_CACHE_DISK_MAX_ENTRIES = int(os.getenv("GA4_CACHE_DISK_MAX_ENTRIES", "4096"))
+GA4_CACHE_TTL_TODAY = int(os.getenv("GA4_CACHE_TTL_TODAY", "300"))
+GA4_CACHE_TTL_RECENT = int(os.getenv("GA4_CACHE_TTL_RECENT", "3600"))
+GA4_CACHE_TTL_HISTORICAL = int(os.getenv("GA4_CACHE_TTL_HISTORICAL", str(7 * 24 * 3600)))
+GA4_SETTLING_DAYS = int(os.getenv("GA4_SETTLING_DAYS", "3"))
+GA4_LARGE_DATASET_ROWS = int(os.getenv("GA4_LARGE_DATASET_ROWS", "2500"))
+GA4_INCREMENTAL_MAX_SLICES = int(os.getenv("GA4_INCREMENTAL_MAX_SLICES", "4096"))
+GA4_LOCAL_MAX_ROWS = int(os.getenv("GA4_LOCAL_MAX_ROWS", "1000"))
+GA4_FILTER_CACHE_ENTRIES = int(os.getenv("GA4_FILTER_CACHE_ENTRIES", "256"))
+GA4_PAGE_SIZE = int(os.getenv("GA4_PAGE_SIZE", "10000"))
+GA4_PAGE_CONCURRENCY = int(os.getenv("GA4_PAGE_CONCURRENCY", "4"))
+GA4_PAGE_PREFETCH = os.getenv("GA4_PAGE_PREFETCH", "false").lower() in ("1", "true", "yes")
+GA4_EXPORT_DIR = os.path.abspath(os.getenv("GA4_EXPORT_DIR", "ga4_exports"))
+GA4_BATCH_MAX_REPORTS = int(os.getenv("GA4_BATCH_MAX_REPORTS", "20"))
+GA4_TRACE_PATH = os.getenv("GA4_TRACE_PATH")
+GA4_TRACE_PAYLOAD = os.getenv("GA4_TRACE_PAYLOAD", "false").lower() in ("1", "true", "yes")
+GA4_STATS_WINDOW = float(os.getenv("GA4_STATS_WINDOW", "900"))
+GA4_PREWARM = os.getenv("GA4_PREWARM", "false").lower() in ("1", "true", "yes")
+GA4_REALTIME_INTERVAL = float(os.getenv("GA4_REALTIME_INTERVAL", "15"))
+GA4_REALTIME_IDLE_TIMEOUT = float(os.getenv("GA4_REALTIME_IDLE_TIMEOUT", "300"))
+GA4_REALTIME_HISTORY = int(os.getenv("GA4_REALTIME_HISTORY", "20"))
+GA4_REALTIME_MAX_SUBSCRIPTIONS = int(os.getenv("GA4_REALTIME_MAX_SUBSCRIPTIONS", "20"))
+GA4_REALTIME_FIRST_WAIT = float(os.getenv("GA4_REALTIME_FIRST_WAIT", "10"))
+GA4_REALTIME_MAX_WAIT = float(os.getenv("GA4_REALTIME_MAX_WAIT", "60"))
 
 # Initialize FastMCP
 mcp = FastMCP("Google Analytics 4")
@@ -318,6 +492,1103 @@ GA4_METRICS: Dict[str, Dict[str, str]] = {
 }
 
 
+# Catalog index built once at import: name -> category lookups, fuzzy matching and keyword search
+_DIMENSION_INDEX: Dict[str, str] = {name: cat for cat, dims in GA4_DIMENSIONS.items() for name in dims}
+_METRIC_INDEX: Dict[str, str] = {name: cat for cat, mets in GA4_METRICS.items() for name in mets}
+_LOWERCASE_NAMES: Dict[str, Dict[str, str]] = {
+    "dimension": {name.lower(): name for name in _DIMENSION_INDEX},
+    "metric": {name.lower(): name for name in _METRIC_INDEX}
+}
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z]+|\d+", re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text).lower())
+
+
+_CATALOG_ENTRIES: List[Dict[str, Any]] = [
+    {"kind": kind, "name": name, "category": cat, "description": desc,
+     "name_tokens": frozenset(_tokenize(name)), "description_tokens": frozenset(_tokenize(desc))}
+    for kind, catalog in (("dimension", GA4_DIMENSIONS), ("metric", GA4_METRICS))
+    for cat, entries in catalog.items()
+    for name, desc in entries.items()
+]
+_CATALOG_TOKENS: Dict[str, List[int]] = {}
+for _i, _entry in enumerate(_CATALOG_ENTRIES):
+    for _token in _entry["name_tokens"] | _entry["description_tokens"]:
+        _CATALOG_TOKENS.setdefault(_token, []).append(_i)
+
+
+def _is_custom_name(name: str) -> bool:
+    # Custom definitions ("customEvent:param") and per-event metrics ("keyEvents:purchase") are property-specific
+    return ":" in name
+
+
+def _is_known_dimension(name: str) -> bool:
+    return name in _DIMENSION_INDEX or _is_custom_name(name)
+
+
+def _is_known_metric(name: str) -> bool:
+    return name in _METRIC_INDEX or _is_custom_name(name)
+
+
+def _suggest_names(name: str, kind: str) -> List[str]:
+    lowercase = _LOWERCASE_NAMES[kind]
+    if name.lower() in lowercase:
+        return [lowercase[name.lower()]]
+    matches = difflib.get_close_matches(name.lower(), list(lowercase), n=3, cutoff=0.6)
+    return [lowercase[m] for m in matches]
+
+
+def _validate_names(dimensions: List[str], metrics: List[str]) -> Optional[Dict[str, Any]]:
+    unknown = [("dimension", d) for d in dimensions if not _is_known_dimension(d)]
+    unknown += [("metric", m) for m in metrics if not _is_known_metric(m)]
+    if not unknown:
+        return None
+    return {
+        "error": "Unknown " + ", ".join(f"{kind} '{name}'" for kind, name in unknown) + ".",
+        "did_you_mean": {name: _suggest_names(name, kind) for kind, name in unknown}
+    }
+
+
+# Latency histogram bucket upper bounds in milliseconds; the last bucket catches everything slower
+_HISTOGRAM_BOUNDS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf"))
+_HISTOGRAM_SLOTS = 15
+
+
+class _Span:
+    def __init__(self, name: str, parent: Optional[_Span], attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.root: _Span = parent.root if parent else self
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        # Finished spans of the whole trace, written out together when the root span ends
+        self.finished: List[_Span] = [] if parent is None else self.root.finished
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent:
+            span["parentSpanId"] = self.parent.span_id
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _RollingHistogram:
+    """Latency histogram over the last `window` seconds, kept as a ring of time slots."""
+
+    def __init__(self, window: float):
+        self.slot_seconds = max(1.0, window / _HISTOGRAM_SLOTS)
+        self._slots: deque = deque()
+
+    def _slot(self, now: float) -> Dict[str, Any]:
+        start = now - now % self.slot_seconds
+        if not self._slots or self._slots[-1]["start"] != start:
+            self._slots.append({"start": start, "counts": [0] * len(_HISTOGRAM_BOUNDS_MS), "sum": 0.0, "max": 0.0})
+            while len(self._slots) > _HISTOGRAM_SLOTS:
+                self._slots.popleft()
+        return self._slots[-1]
+
+    def record(self, duration_ms: float, now: float) -> None:
+        slot = self._slot(now)
+        for i, bound in enumerate(_HISTOGRAM_BOUNDS_MS):
+            if duration_ms <= bound:
+                slot["counts"][i] += 1
+                break
+        slot["sum"] += duration_ms
+        slot["max"] = max(slot["max"], duration_ms)
+
+    def summary(self, now: float) -> Optional[Dict[str, Any]]:
+        horizon = now - self.slot_seconds * _HISTOGRAM_SLOTS
+        slots = [s for s in self._slots if s["start"] > horizon]
+        counts = [sum(column) for column in zip(*(s["counts"] for s in slots))]
+        total = sum(counts)
+        if not total:
+            return None
+        peak = max(s["max"] for s in slots)
+
+        def percentile(q: float) -> float:
+            # Upper bound of the bucket holding the q-th sample, capped at the slowest call seen
+            rank, seen = q * total, 0
+            for count, bound in zip(counts, _HISTOGRAM_BOUNDS_MS):
+                seen += count
+                if seen >= rank:
+                    return round(min(bound, peak), 3)
+            return round(peak, 3)
+
+        return {
+            "count": total,
+            "mean_ms": round(sum(s["sum"] for s in slots) / total, 3),
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(peak, 3),
+            "buckets": {
+                (f"le_{bound:g}ms" if bound != float("inf") else "gt_30000ms"): count
+                for bound, count in zip(_HISTOGRAM_BOUNDS_MS, counts) if count
+            }
+        }
+
+
+class _Tracer:
+    """Structured spans around each phase of a tool call, with rolling per-phase latency histograms
+    and optional OpenTelemetry-style JSON export (one OTLP resourceSpans document per trace per line)."""
+
+    def __init__(self, export_path: Optional[str], window: float):
+        self.export_path = export_path
+        self.window = window
+        self.started = time.time()
+        self._current: contextvars.ContextVar[Optional[_Span]] = contextvars.ContextVar("ga4_span", default=None)
+        self._histograms: Dict[str, _RollingHistogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[_Span]:
+        parent = self._current.get()
+        span = _Span(name, parent, attributes)
+        self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            # set() rather than reset(): a generator's span may be closed from another context
+            self._current.set(parent)
+            self._finish(span)
+
+    def count(self, counter: str, n: int = 1) -> None:
+        """Add to a process-wide counter and to the same attribute on the current trace's root span."""
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + n
+        span = self._current.get()
+        if span is not None:
+            root = span.root
+            root.attributes[counter] = root.attributes.get(counter, 0) + n
+
+    def _finish(self, span: _Span) -> None:
+        now = time.time()
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = _RollingHistogram(self.window)
+            histogram.record((span.end_ns - span.start_ns) / 1e6, now)
+        if not self.export_path:
+            return
+        span.finished.append(span)
+        if span.parent is None:
+            self._export(span.finished)
+
+    def _export(self, spans: List[_Span]) -> None:
+        document = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "ga4-mcp"}}]},
+                "scopeSpans": [{"scope": {"name": "ga4-mcp"}, "spans": [s.to_otlp() for s in spans]}]
+            }]
+        }
+        line = json.dumps(document, separators=(",", ":"))
+        try:
+            with self._export_lock, open(self.export_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            phases = {name: h.summary(now) for name, h in sorted(self._histograms.items())}
+            counters = dict(self._counters)
+        return {
+            "uptime_seconds": round(now - self.started, 1),
+            "window_seconds": self.window,
+            "phases": {name: summary for name, summary in phases.items() if summary},
+            "counters": counters,
+            "trace_export_path": self.export_path
+        }
+
+
+_tracer = _Tracer(GA4_TRACE_PATH, GA4_STATS_WINDOW)
+
+
+# gRPC channel options: keep idle channels alive so pooled clients skip the TLS handshake
+_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", GA4_KEEPALIVE_MS),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+# Errors that mean the channel itself is broken and the client should be rebuilt. Nothing can raise
+# them before the SDK loads, so the tables start empty and are filled in by the load hook.
+_RECONNECT_ERRORS: Tuple[type, ...] = ()
+_UNHEALTHY_STATES: Tuple[Any, ...] = ()
+
+
+@_on_sdk_load
+def _init_client_tables() -> None:
+    global _RECONNECT_ERRORS, _UNHEALTHY_STATES
+    _RECONNECT_ERRORS = (gapi_exceptions.ServiceUnavailable,)
+    _UNHEALTHY_STATES = (grpc.ChannelConnectivity.TRANSIENT_FAILURE, grpc.ChannelConnectivity.SHUTDOWN)
+
+
+class _PooledClient:
+    def __init__(self, client: BetaAnalyticsDataClient, channel: grpc.Channel):
+        self.client = client
+        self.channel = channel
+        self.healthy = True
+        self.channel.subscribe(self._on_state_change, try_to_connect=False)
+
+    def _on_state_change(self, state: grpc.ChannelConnectivity) -> None:
+        self.healthy = state not in _UNHEALTHY_STATES
+
+    def close(self) -> None:
+        try:
+            self.channel.unsubscribe(self._on_state_change)
+            self.channel.close()
+        except Exception:
+            pass
+
+
+class _GA4ClientManager:
+    """Process-wide pool of Data API clients, created lazily and reused across tool calls."""
+
+    def __init__(self, pool_size: int):
+        self.pool_size = max(1, pool_size)
+        self._idle: List[_PooledClient] = []
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {"pool_hits": 0, "pool_misses": 0, "pool_waits": 0, "reconnects": 0, "health_check_failures": 0}
+
+    def _connect(self) -> _PooledClient:
+        channel = BetaAnalyticsDataGrpcTransport.create_channel(options=_CHANNEL_OPTIONS)
+        transport = BetaAnalyticsDataGrpcTransport(channel=channel)
+        return _PooledClient(BetaAnalyticsDataClient(transport=transport), channel)
+
+    def _checkout(self) -> _PooledClient:
+        stale = None
+        with self._cond:
+            while not self._idle and self._open >= self.pool_size:
+                self._stats["pool_waits"] += 1
+                self._cond.wait()
+            if self._idle:
+                pooled = self._idle.pop()
+                if pooled.healthy:
+                    self._stats["pool_hits"] += 1
+                    return pooled
+                self._stats["health_check_failures"] += 1
+                self._stats["reconnects"] += 1
+                stale = pooled
+            else:
+                self._open += 1
+                self._stats["pool_misses"] += 1
+        if stale is not None:
+            stale.close()
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def _checkin(self, pooled: _PooledClient, broken: bool = False) -> None:
+        with self._cond:
+            if broken:
+                self._open -= 1
+            else:
+                self._idle.append(pooled)
+            self._cond.notify()
+        if broken:
+            pooled.close()
+
+    def prewarm(self) -> None:
+        """Open one client (credentials, channel) ahead of the first call if the pool is empty."""
+        if not self._open:
+            self._checkin(self._checkout())
+
+    def call(self, method: str, request: Any) -> Any:
+        for attempt in range(2):
+            with _tracer.span("client_checkout"):
+                pooled = self._checkout()
+            try:
+                with _tracer.span(method):
+                    response = getattr(pooled.client, method)(request)
+            except _RECONNECT_ERRORS:
+                self._checkin(pooled, broken=True)
+                with self._cond:
+                    self._stats["reconnects"] += 1
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                self._checkin(pooled)
+                raise
+            self._checkin(pooled)
+            return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "pool_size": self.pool_size,
+                "open_clients": self._open,
+                "idle_clients": len(self._idle),
+                **self._stats
+            }
+
+
+class _FunnelClientManager(_GA4ClientManager):
+    """Pool of v1alpha clients, used only for funnel reports."""
+
+    def _connect(self) -> _PooledClient:
+        channel = AlphaAnalyticsDataGrpcTransport.create_channel(options=_CHANNEL_OPTIONS)
+        transport = AlphaAnalyticsDataGrpcTransport(channel=channel)
+        return _PooledClient(AlphaAnalyticsDataClient(transport=transport), channel)
+
+
+_funnel_clients = _FunnelClientManager(2)
+
+
+class _AsyncGA4ClientManager:
+    """Async Data API client bound to the running event loop, with a concurrency limit per property."""
+
+    def __init__(self, property_concurrency: int):
+        self.property_concurrency = max(1, property_concurrency)
+        self._client: Optional[BetaAnalyticsDataAsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._stats = {"calls": 0, "reconnects": 0, "throttled": 0}
+
+    def _bind(self) -> None:
+        # grpc.aio channels and asyncio semaphores belong to one loop; rebuild them if the loop changes
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = None
+            self._semaphores = {}
+
+    def _get_client(self) -> BetaAnalyticsDataAsyncClient:
+        if self._client is None:
+            channel = BetaAnalyticsDataGrpcAsyncIOTransport.create_channel(options=_CHANNEL_OPTIONS)
+            self._client = BetaAnalyticsDataAsyncClient(transport=BetaAnalyticsDataGrpcAsyncIOTransport(channel=channel))
+        return self._client
+
+    async def call(self, method: str, request: Any) -> Any:
+        self._bind()
+        prop = request.property
+        semaphore = self._semaphores.setdefault(prop, asyncio.Semaphore(self.property_concurrency))
+        if semaphore.locked():
+            self._stats["throttled"] += 1
+        async with semaphore:
+            self._in_flight[prop] = self._in_flight.get(prop, 0) + 1
+            try:
+                for attempt in range(2):
+                    with _tracer.span("client_checkout"):
+                        client = self._get_client()
+                    try:
+                        self._stats["calls"] += 1
+                        with _tracer.span(method):
+                            return await getattr(client, method)(request)
+                    except _RECONNECT_ERRORS:
+                        if self._client is client:
+                            self._client = None
+                        self._stats["reconnects"] += 1
+                        if attempt:
+                            raise
+            finally:
+                self._in_flight[prop] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "property_concurrency": self.property_concurrency,
+            "in_flight": {prop: n for prop, n in self._in_flight.items() if n},
+            **self._stats
+        }
+
+
+_async_client_manager = _AsyncGA4ClientManager(GA4_PROPERTY_CONCURRENCY)
+
+# Errors worth retrying after a backoff; anything else (bad request, permissions) fails immediately
+_RETRYABLE_ERRORS: Tuple[type, ...] = ()
+
+
+@_on_sdk_load
+def _init_retry_table() -> None:
+    global _RETRYABLE_ERRORS
+    _RETRYABLE_ERRORS = (
+        gapi_exceptions.ResourceExhausted,
+        gapi_exceptions.ServiceUnavailable,
+        gapi_exceptions.InternalServerError,
+        gapi_exceptions.DeadlineExceeded,
+    )
+
+
+_QUOTA_FIELDS = (
+    "tokens_per_day", "tokens_per_hour", "tokens_per_project_per_hour", "concurrent_requests",
+    "server_errors_per_project_per_hour", "potentially_thresholded_requests_per_hour"
+)
+
+
+class _PropertyQuota:
+    def __init__(self, tokens_per_hour: int):
+        self.capacity = float(tokens_per_hour)
+        self.level: Optional[float] = None
+        self.updated = time.monotonic()
+        self.cost = 10.0
+        self.reported: Dict[str, Dict[str, int]] = {}
+        self.stats = {
+            "requests": 0, "delayed": 0, "retries": 0, "resource_exhausted": 0, "rejected": 0, "refunded": 0
+        }
+
+    def refill(self, now: float) -> None:
+        if self.level is not None:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 3600)
+        self.updated = now
+
+
+class _QuotaScheduler:
+    """Token bucket per property, synced from returnPropertyQuota, plus jittered exponential backoff."""
+
+    def __init__(self, tokens_per_hour: int):
+        self.tokens_per_hour = tokens_per_hour
+        self._quotas: Dict[str, _PropertyQuota] = {}
+        self._lock = threading.Lock()
+
+    def _quota(self, prop: str) -> _PropertyQuota:
+        quota = self._quotas.get(prop)
+        if quota is None:
+            quota = self._quotas[prop] = _PropertyQuota(self.tokens_per_hour)
+        return quota
+
+    def reserve(self, prop: str) -> Tuple[float, float]:
+        # Returns how long to wait before sending and the tokens taken from the bucket; raises when the
+        # quota cannot recover in time
+        with self._lock:
+            quota = self._quota(prop)
+            quota.stats["requests"] += 1
+            now = time.monotonic()
+            quota.refill(now)
+            daily = quota.reported.get("tokens_per_day")
+            if daily and daily["remaining"] < quota.cost:
+                quota.stats["rejected"] += 1
+                raise gapi_exceptions.ResourceExhausted(f"Daily GA4 token quota for {prop} is exhausted.")
+            if quota.level is None:
+                return 0.0, 0.0
+            cost = quota.cost
+            quota.level -= cost
+            if quota.level >= 0:
+                return 0.0, cost
+            wait = -quota.level * 3600 / quota.capacity
+            if wait > GA4_QUOTA_MAX_WAIT:
+                quota.level += cost
+                quota.stats["rejected"] += 1
+                raise gapi_exceptions.ResourceExhausted(
+                    f"Hourly GA4 token quota for {prop} is nearly exhausted; retry in about {wait:.0f}s."
+                )
+            quota.stats["delayed"] += 1
+            return wait, cost
+
+    def refund(self, prop: str, tokens: float) -> None:
+        # Failed calls do not consume GA4 tokens, so give back what reserve() took for them
+        if not tokens:
+            return
+        with self._lock:
+            quota = self._quota(prop)
+            quota.stats["refunded"] += 1
+            if quota.level is not None:
+                quota.refill(time.monotonic())
+                quota.level = min(quota.capacity, quota.level + tokens)
+
+    def record(self, prop: str, response: Any) -> None:
+        reports = getattr(response, "reports", None)
+        for report in (reports if reports is not None else [response]):
+            quota_pb = report.property_quota
+            if not quota_pb:
+                continue
+            with self._lock:
+                quota = self._quota(prop)
+                for field in _QUOTA_FIELDS:
+                    if field in quota_pb:
+                        status = getattr(quota_pb, field)
+                        quota.reported[field] = {"consumed": status.consumed, "remaining": status.remaining}
+                hourly = quota.reported.get("tokens_per_hour")
+                if hourly:
+                    quota.cost = 0.8 * quota.cost + 0.2 * max(1, hourly["consumed"])
+                    quota.level = float(hourly["remaining"])
+                    quota.updated = time.monotonic()
+
+    def retry_delay(self, prop: str, error: Exception, attempt: int) -> float:
+        with self._lock:
+            quota = self._quota(prop)
+            quota.stats["retries"] += 1
+            if isinstance(error, gapi_exceptions.ResourceExhausted):
+                quota.stats["resource_exhausted"] += 1
+                # Hold back every queued caller, not just this one
+                quota.level = min(quota.level or 0.0, 0.0)
+                quota.updated = time.monotonic()
+        return random.uniform(0, min(GA4_RETRY_MAX_DELAY, GA4_RETRY_BASE_DELAY * 2 ** attempt))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            result = {}
+            for prop, quota in self._quotas.items():
+                quota.refill(now)
+                result[prop] = {
+                    "bucket_tokens": round(quota.level, 1) if quota.level is not None else None,
+                    "bucket_capacity": quota.capacity,
+                    "estimated_tokens_per_request": round(quota.cost, 1),
+                    "reported": quota.reported,
+                    **quota.stats
+                }
+            return result
+
+
+_quota_scheduler = _QuotaScheduler(GA4_QUOTA_TOKENS_PER_HOUR)
+
+
+def _call_api(
+    method: str,
+    request: Any,
+    quota_key: Optional[str] = None,
+    clients: Optional[_GA4ClientManager] = None
+) -> Any:
+    prop = request.property
+    quota_key = quota_key or prop
+    with _tracer.span("api_call", method=method, property=prop) as span:
+        for attempt in range(GA4_MAX_RETRIES + 1):
+            delay, reserved = _quota_scheduler.reserve(quota_key)
+            if delay:
+                span.set(quota_wait_ms=span.attributes.get("quota_wait_ms", 0) + round(delay * 1000))
+                time.sleep(delay)
+            context = _property_context(prop)
+            _tracer.count("api_calls")
+            try:
+                with context.slots:
+                    response = (clients or context.clients).call(method, request)
+            except Exception as e:
+                _quota_scheduler.refund(quota_key, reserved)
+                if not isinstance(e, _RETRYABLE_ERRORS) or attempt == GA4_MAX_RETRIES:
+                    raise
+                span.set(retries=attempt + 1)
+                time.sleep(_quota_scheduler.retry_delay(quota_key, e, attempt))
+                continue
+            _quota_scheduler.record(quota_key, response)
+            return response
+
+
+async def _call_api_async(method: str, request: Any) -> Any:
+    prop = request.property
+    with _tracer.span("api_call", method=method, property=prop) as span:
+        for attempt in range(GA4_MAX_RETRIES + 1):
+            delay, reserved = _quota_scheduler.reserve(prop)
+            if delay:
+                span.set(quota_wait_ms=span.attributes.get("quota_wait_ms", 0) + round(delay * 1000))
+                await asyncio.sleep(delay)
+            _tracer.count("api_calls")
+            try:
+                response = await _async_client_manager.call(method, request)
+            except Exception as e:
+                _quota_scheduler.refund(prop, reserved)
+                if not isinstance(e, _RETRYABLE_ERRORS) or attempt == GA4_MAX_RETRIES:
+                    raise
+                span.set(retries=attempt + 1)
+                await asyncio.sleep(_quota_scheduler.retry_delay(prop, e, attempt))
+                continue
+            _quota_scheduler.record(prop, response)
+            return response
+
+
+_RELATIVE_DATE = re.compile(r"^(\d+)daysAgo$")
+
+
+def _resolve_date(value: str, today: Optional[date] = None) -> Optional[date]:
+    today = today or date.today()
+    if value == "today":
+        return today
+    if value == "yesterday":
+        return today - timedelta(days=1)
+    match = _RELATIVE_DATE.match(value)
+    if match:
+        return today - timedelta(days=int(match.group(1)))
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _is_relative_date(value: str) -> bool:
+    return value in ("today", "yesterday") or bool(_RELATIVE_DATE.match(value))
+
+
+def _cache_key(request: Any) -> str:
+    canonical = json.dumps(type(request).to_dict(request), sort_keys=True, separators=(",", ":"))
+    # Relative ranges ("7daysAgo".."yesterday") cover different days once the date rolls over
+    if any(_is_relative_date(r.start_date) or _is_relative_date(r.end_date) for r in request.date_ranges):
+        canonical += "|" + date.today().isoformat()
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _cache_ttl(request: Any) -> int:
+    today = date.today()
+    ends = [_resolve_date(r.end_date, today) for r in getattr(request, "date_ranges", [])]
+    cohort_spec = getattr(request, "cohort_spec", None)
+    if cohort_spec and cohort_spec.cohorts:
+        ends.append(_cohort_last_day(cohort_spec, today))
+    if not ends or any(end is None for end in ends):
+        return GA4_CACHE_TTL_TODAY
+    latest = max(ends)
+    if latest >= today:
+        return GA4_CACHE_TTL_TODAY
+    if (today - latest).days <= GA4_SETTLING_DAYS:
+        return GA4_CACHE_TTL_RECENT
+    return GA4_CACHE_TTL_HISTORICAL
+
+
+def _open_cache_db(path: Optional[str]) -> Optional[sqlite3.Connection]:
+    if not path:
+        return None
+    db = sqlite3.connect(path, check_same_thread=False)
+    columns = [row[1] for row in db.execute("PRAGMA table_info(report_cache)")]
+    if columns and "partition" not in columns:
+        # Cache files from before per-property partitioning are simply discarded
+        db.execute("DROP TABLE report_cache")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS report_cache ("
+        "key TEXT PRIMARY KEY, partition TEXT, expires REAL, accessed REAL, payload BLOB)"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS report_cache_partition ON report_cache (partition, accessed)")
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS day_slices ("
+        "signature TEXT, day TEXT, partition TEXT, accessed REAL, payload BLOB, PRIMARY KEY (signature, day))"
+    )
+    db.execute("DELETE FROM report_cache WHERE expires < ?", (time.time(),))
+    db.commit()
+    return db
+
+
+_cache_db = _open_cache_db(GA4_CACHE_PATH)
+_cache_db_lock = threading.Lock()
+
+
+class _ReportCache:
+    """LRU cache of serialized report responses with per-entry expiry and an optional SQLite tier.
+    One instance per property; all instances share the SQLite file, partitioned by property."""
+
+    def __init__(self, partition: str, max_entries: int, max_bytes: int, db: Optional[sqlite3.Connection] = None):
+        self.partition = partition
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self._db = db
+
+    def _store(self, key: str, expires: float, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key)[1])
+        self._entries[key] = (expires, payload)
+        self._bytes += len(payload)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                self._bytes -= len(self._entries.pop(key)[1])
+                self._stats["expired"] += 1
+            if self._db is not None:
+                with _cache_db_lock:
+                    row = self._db.execute(
+                        "SELECT expires, payload FROM report_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and row[0] > now:
+                        self._db.execute("UPDATE report_cache SET accessed = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                if row and row[0] > now:
+                    self._store(key, row[0], row[1])
+                    self._stats["disk_hits"] += 1
+                    return row[1]
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, payload: bytes, ttl: int) -> None:
+        if ttl <= 0:
+            return
+        expires = time.time() + ttl
+        with self._lock:
+            self._store(key, expires, payload)
+            if self._db is not None:
+                with _cache_db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO report_cache (key, partition, expires, accessed, payload) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, self.partition, expires, time.time(), payload)
+                    )
+                    self._db.execute(
+                        "DELETE FROM report_cache WHERE partition = ? AND key NOT IN "
+                        "(SELECT key FROM report_cache WHERE partition = ? ORDER BY accessed DESC LIMIT ?)",
+                        (self.partition, self.partition, GA4_CACHE_DISK_MAX_ENTRIES)
+                    )
+                    self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                with _cache_db_lock:
+                    self._db.execute("DELETE FROM report_cache WHERE partition = ?", (self.partition,))
+                    self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "disk_path": GA4_CACHE_PATH if self._db is not None else None,
+                **self._stats
+            }
+
+
+class _RowCountEstimator:
+    """Remembers row_count per query shape so the size check rarely needs its own API call."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._estimates: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"estimate_cache_hits": 0, "estimation_calls": 0, "estimation_calls_saved": 0}
+
+    def lookup(self, shape_key: str) -> Optional[int]:
+        with self._lock:
+            entry = self._estimates.get(shape_key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._estimates[shape_key]
+                return None
+            self._estimates.move_to_end(shape_key)
+            self._stats["estimate_cache_hits"] += 1
+            return entry[1]
+
+    def record(self, shape_key: str, row_count: int, ttl: int) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._estimates[shape_key] = (time.time() + ttl, row_count)
+            self._estimates.move_to_end(shape_key)
+            while len(self._estimates) > self.max_entries:
+                self._estimates.popitem(last=False)
+
+    def count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._estimates.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"shapes": len(self._estimates), **self._stats}
+
+
+class _DaySliceStore:
+    """Settled per-date report slices, keyed by query signature, so rolling windows only fetch new days."""
+
+    def __init__(self, partition: str, max_slices: int, db: Optional[sqlite3.Connection] = None):
+        self.partition = partition
+        self.max_slices = max(1, max_slices)
+        self._slices: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = db
+        self._stats = {"days_from_store": 0, "days_fetched": 0, "unsplittable_reports": 0}
+
+    def get(self, signature: str, day: date) -> Optional[bytes]:
+        key = (signature, day.isoformat())
+        with self._lock:
+            payload = self._slices.get(key)
+            if payload is not None:
+                self._slices.move_to_end(key)
+                return payload
+        if self._db is None:
+            return None
+        with _cache_db_lock:
+            row = self._db.execute(
+                "SELECT payload FROM day_slices WHERE signature = ? AND day = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE day_slices SET accessed = ? WHERE signature = ? AND day = ?", (time.time(), *key)
+            )
+            self._db.commit()
+        self._remember(key, row[0])
+        return row[0]
+
+    def _remember(self, key: Tuple[str, str], payload: bytes) -> None:
+        with self._lock:
+            self._slices[key] = payload
+            self._slices.move_to_end(key)
+            while len(self._slices) > self.max_slices:
+                self._slices.popitem(last=False)
+
+    def set(self, signature: str, day: date, payload: bytes) -> None:
+        key = (signature, day.isoformat())
+        self._remember(key, payload)
+        if self._db is None:
+            return
+        with _cache_db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO day_slices (signature, day, partition, accessed, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (*key, self.partition, time.time(), payload)
+            )
+            self._db.execute(
+                "DELETE FROM day_slices WHERE partition = ? AND rowid NOT IN "
+                "(SELECT rowid FROM day_slices WHERE partition = ? ORDER BY accessed DESC LIMIT ?)",
+                (self.partition, self.partition, GA4_CACHE_DISK_MAX_ENTRIES)
+            )
+            self._db.commit()
+
+    def count(self, stat: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[stat] += n
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slices.clear()
+        if self._db is not None:
+            with _cache_db_lock:
+                self._db.execute("DELETE FROM day_slices WHERE partition = ?", (self.partition,))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"slices": len(self._slices), **self._stats}
+
+
+class _ResultCatalog:
+    """Shape of every complete report held in the response cache, so the local engine can find a source."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, key: str, shape: Dict[str, Any]) -> None:
+        with self._lock:
+            self._results[key] = shape
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._results.pop(key, None)
+
+    def newest_first(self) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            return list(reversed(self._results.items()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+
+
+def _parse_property_registry(spec: Optional[str]) -> Dict[str, str]:
+    # "shop_us=123456,shop_eu=234567,345678" -> alias/id -> numeric property id
+    registry: Dict[str, str] = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        alias, _, prop = item.partition("=")
+        prop = (prop or alias).strip().replace("properties/", "")
+        registry[alias.strip()] = prop
+        registry[prop] = prop
+    return registry
+
+
+_PROPERTY_REGISTRY = _parse_property_registry(os.getenv("GA4_PROPERTY_IDS"))
+if GA4_PROPERTY_ID:
+    _PROPERTY_REGISTRY.setdefault(GA4_PROPERTY_ID, GA4_PROPERTY_ID)
+
+
+def _resolve_property(property_id: Any = None) -> str:
+    if property_id in (None, ""):
+        if GA4_PROPERTY_ID:
+            return f"properties/{GA4_PROPERTY_ID}"
+        registered = set(_PROPERTY_REGISTRY.values())
+        if len(registered) == 1:
+            return f"properties/{registered.pop()}"
+        raise ValueError("No property_id given and no default GA4_PROPERTY_ID configured.")
+    key = str(property_id).strip().replace("properties/", "")
+    if key in _PROPERTY_REGISTRY:
+        return f"properties/{_PROPERTY_REGISTRY[key]}"
+    if GA4_RESTRICT_PROPERTIES or not key.isdigit():
+        raise ValueError(f"Unknown property '{property_id}'. Registered properties: {sorted(_PROPERTY_REGISTRY)}")
+    return f"properties/{key}"
+
+
+class _PropertyContext:
+    """Per-property client pool, concurrency limit, response cache, row-count estimates, day slices
+    and the catalog of cached results, created on first use."""
+
+    def __init__(self, prop: str):
+        self.property = prop
+        self.clients = _GA4ClientManager(GA4_CLIENT_POOL_SIZE)
+        self.slots = threading.BoundedSemaphore(max(1, GA4_PROPERTY_CONCURRENCY))
+        self.cache = _ReportCache(prop, GA4_CACHE_MAX_ENTRIES, GA4_CACHE_MAX_BYTES, _cache_db)
+        self.estimates = _RowCountEstimator(GA4_CACHE_MAX_ENTRIES * 4)
+        self.days = _DaySliceStore(prop, GA4_INCREMENTAL_MAX_SLICES, _cache_db)
+        self.results = _ResultCatalog(GA4_CACHE_MAX_ENTRIES)
+
+
+_property_contexts: Dict[str, _PropertyContext] = {}
+_property_contexts_lock = threading.Lock()
+
+
+def _property_context(prop: str) -> _PropertyContext:
+    context = _property_contexts.get(prop)
+    if context is None:
+        with _property_contexts_lock:
+            context = _property_contexts.setdefault(prop, _PropertyContext(prop))
+    return context
+
+
+def _selected_contexts(property_id: Any = None) -> List[_PropertyContext]:
+    if property_id in (None, ""):
+        with _property_contexts_lock:
+            return list(_property_contexts.values())
+    return [_property_context(_resolve_property(property_id))]
+
+
+def _copy_request(request: RunReportRequest, **changes: Any) -> RunReportRequest:
+    # Constructor kwargs are merged (repeated fields append), so assign changes on a copy instead
+    copied = RunReportRequest(request)
+    for field, value in changes.items():
+        setattr(copied, field, value)
+    return copied
+
+
+def _shape_request(request: RunReportRequest) -> RunReportRequest:
+    # Paging, ordering and aggregation options never change row_count
+    return RunReportRequest(
+        property=request.property,
+        dimensions=request.dimensions,
+        metrics=request.metrics,
+        date_ranges=request.date_ranges,
+        dimension_filter=request.dimension_filter if request.dimension_filter else None,
+        return_property_quota=True
+    )
+
+
+def _cache_lookup(request: RunReportRequest) -> Optional[Any]:
+    with _tracer.span("cache_lookup") as span:
+        payload = _property_context(request.property).cache.get(_cache_key(request))
+        span.set(cache_hit=payload is not None)
+        _tracer.count("cache_hits" if payload is not None else "cache_misses")
+        return RunReportResponse.deserialize(payload) if payload is not None else None
+
+
+def _result_shape(request: RunReportRequest) -> Optional[Dict[str, Any]]:
+    if len(request.date_ranges) != 1 or request.offset:
+        return None
+    today = date.today()
+    start = _resolve_date(request.date_ranges[0].start_date, today)
+    end = _resolve_date(request.date_ranges[0].end_date, today)
+    if start is None or end is None:
+        return None
+    return {
+        "dimensions": [d.name for d in request.dimensions],
+        "metrics": [m.name for m in request.metrics],
+        "start": start,
+        "end": end,
+        "filter": _canonical_filter(request.dimension_filter)
+    }
+
+
+def _canonical_filter(filter_expression: Any) -> Optional[str]:
+    if not filter_expression:
+        return None
+    return json.dumps(FilterExpression.to_dict(filter_expression), sort_keys=True)
+
+
+def _cache_store(request: RunReportRequest, response: Any) -> None:
+    context = _property_context(request.property)
+    key = _cache_key(request)
+    with _tracer.span("cache_store"):
+        context.cache.set(key, RunReportResponse.serialize(response), _cache_ttl(request))
+    # Only complete reports can be re-aggregated locally
+    shape = _result_shape(request) if len(response.rows) == response.row_count else None
+    if shape is not None:
+        context.results.record(key, shape)
+
+
+def _run_report(request: RunReportRequest, use_cache: bool = True) -> Tuple[Any, bool]:
+    if not use_cache:
+        return _call_api("run_report", request), False
+    cached = _cache_lookup(request)
+    if cached is not None:
+        return cached, True
+    response = _call_api("run_report", request)
+    _cache_store(request, response)
+    return response, False
+
+
+async def _run_report_async(request: RunReportRequest, use_cache: bool = True) -> Tuple[Any, bool]:
+    if not use_cache:
+        return await _call_api_async("run_report", request), False
+    cached = _cache_lookup(request)
+    if cached is not None:
+        return cached, True
+    response = await _call_api_async("run_report", request)
+    _cache_store(request, response)
+    return response, False
+
+
 @mcp.tool()
 def list_dimension_categories() -> Dict[str, Any]:
     result = {}
@@ -348,225 +1619,1803 @@ def get_metrics_by_category(category: str) -> Dict[str, Any]:
     return {"error": f"Category '{category}' not found.", "available_categories": list(GA4_METRICS.keys())}
 
 
-def _get_smart_sorting(dimensions, metrics):
-    order_bys = []
-    if "date" in dimensions:
-        order_bys.append(OrderBy(dimension=OrderBy.DimensionOrderBy(dimension_name="date"), desc=True))
-    if metrics:
-        order_bys.append(OrderBy(metric=OrderBy.MetricOrderBy(metric_name=metrics[0]), desc=True))
-    return order_bys
+@mcp.tool()
+def search_catalog(query: str, kind: str = "all", limit: int = 10) -> Dict[str, Any]:
+    """Rank GA4 dimensions and metrics by keyword match on their names and descriptions.
+    kind is "dimension", "metric" or "all"."""
+    if kind not in ("all", "dimension", "metric"):
+        return {"error": "kind must be 'all', 'dimension' or 'metric'."}
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        return {"error": "limit must be a positive integer."}
+    query_tokens = set(_tokenize(query))
+    if not query_tokens:
+        return {"error": "query must contain at least one word."}
 
+    scores: Dict[int, float] = {}
+    for token in query_tokens:
+        for vocab_token, entry_ids in _CATALOG_TOKENS.items():
+            if vocab_token == token:
+                weight = 1.0
+            elif vocab_token.startswith(token) and len(token) >= 3:
+                weight = 0.5
+            else:
+                continue
+            for i in entry_ids:
+                entry = _CATALOG_ENTRIES[i]
+                in_name = vocab_token in entry["name_tokens"]
+                scores[i] = scores.get(i, 0.0) + weight * (3 if in_name else 1)
 
-def _should_aggregate(dimensions, metrics):
-    return len(dimensions) == 0 or "date" not in dimensions
+    results = []
+    for i, score in sorted(scores.items(), key=lambda item: (-item[1], _CATALOG_ENTRIES[item[0]]["name"])):
+        entry = _CATALOG_ENTRIES[i]
+        if kind != "all" and entry["kind"] != kind:
+            continue
+        results.append({
+            "name": entry["name"],
+            "kind": entry["kind"],
+            "category": entry["category"],
+            "description": entry["description"],
+            "score": round(score, 2)
+        })
+        if len(results) >= limit:
+            break
+    return {"query": query, "results": results}
 
 
 @mcp.tool()
-def get_ga4_data(
-    dimensions=["date"],
-    metrics=["totalUsers", "newUsers", "bounceRate", "screenPageViewsPerSession", "averageSessionDuration"],
-    date_range_start="7daysAgo",
-    date_range_end="yesterday",
-    dimension_filter=None,
-    estimate_only=False,
-    proceed_with_large_dataset=False,
-    limit=None,
-    enable_aggregation=True
-):
-    try:
-        parsed_dimensions = dimensions
-        if isinstance(dimensions, str):
-            try:
-                parsed_dimensions = json.loads(dimensions)
-                if not isinstance(parsed_dimensions, list):
-                    parsed_dimensions = [str(parsed_dimensions)]
-            except json.JSONDecodeError:
-                parsed_dimensions = [d.strip() for d in dimensions.split(',')]
-        parsed_dimensions = [str(d).strip() for d in parsed_dimensions if str(d).strip()]
-
-        parsed_metrics = metrics
-        if isinstance(metrics, str):
-            try:
-                parsed_metrics = json.loads(metrics)
-                if not isinstance(parsed_metrics, list):
-                    parsed_metrics = [str(parsed_metrics)]
-            except json.JSONDecodeError:
-                parsed_metrics = [m.strip() for m in metrics.split(',')]
-        parsed_metrics = [str(m).strip() for m in parsed_metrics if str(m).strip()]
-
-        if not parsed_dimensions:
-            return {"error": "Dimensions list cannot be empty after parsing."}
-        if not parsed_metrics:
-            return {"error": "Metrics list cannot be empty after parsing."}
+def get_quota_status() -> Dict[str, Any]:
+    """Report per-property GA4 token quota as last returned by the API, plus local throttling and retry counts."""
+    return _quota_scheduler.status()
 
-        filter_expression = None
-        if dimension_filter:
-            valid_dimensions = set()
-            for cat in GA4_DIMENSIONS.values():
-                valid_dimensions.update(cat.keys())
-
-            if isinstance(dimension_filter, str):
-                try:
-                    filter_dict = json.loads(dimension_filter)
-                except Exception as e:
-                    return {"error": f"Failed to parse dimension_filter JSON: {e}"}
-            elif isinstance(dimension_filter, dict):
-                filter_dict = dimension_filter
-            else:
-                return {"error": "dimension_filter must be a JSON string or dict."}
-
-            def build_filter_expr(expr):
-                try:
-                    if 'andGroup' in expr:
-                        expressions = []
-                        for e in expr['andGroup']['expressions']:
-                            built_expr = build_filter_expr(e)
-                            if built_expr is None:
-                                return None
-                            expressions.append(built_expr)
-                        return FilterExpression(and_group=FilterExpressionList(expressions=expressions))
-
-                    if 'orGroup' in expr:
-                        expressions = []
-                        for e in expr['orGroup']['expressions']:
-                            built_expr = build_filter_expr(e)
-                            if built_expr is None:
-                                return None
-                            expressions.append(built_expr)
-                        return FilterExpression(or_group=FilterExpressionList(expressions=expressions))
-
-                    if 'notExpression' in expr:
-                        built_expr = build_filter_expr(expr['notExpression'])
-                        if built_expr is None:
-                            return None
-                        return FilterExpression(not_expression=built_expr)
-
-                    if 'filter' in expr:
-                        f = expr['filter']
-                        field = f.get('fieldName')
-                        if not field or field not in valid_dimensions:
-                            return None
-
-                        if 'stringFilter' in f:
-                            sf = f['stringFilter']
-                            match_type_map = {
-                                'EXACT': Filter.StringFilter.MatchType.EXACT,
-                                'BEGINS_WITH': Filter.StringFilter.MatchType.BEGINS_WITH,
-                                'ENDS_WITH': Filter.StringFilter.MatchType.ENDS_WITH,
-                                'CONTAINS': Filter.StringFilter.MatchType.CONTAINS,
-                                'FULL_REGEXP': Filter.StringFilter.MatchType.FULL_REGEXP,
-                                'PARTIAL_REGEXP': Filter.StringFilter.MatchType.PARTIAL_REGEXP
-                            }
-                            match_type = match_type_map.get(sf.get('matchType', 'EXACT'), Filter.StringFilter.MatchType.EXACT)
-
-                            return FilterExpression(filter=Filter(
-                                field_name=field,
-                                string_filter=Filter.StringFilter(
-                                    value=sf.get('value', ''),
-                                    match_type=match_type,
-                                    case_sensitive=sf.get('caseSensitive', False)
-                                )
-                            ))
-
-                        if 'inListFilter' in f:
-                            ilf = f['inListFilter']
-                            return FilterExpression(filter=Filter(
-                                field_name=field,
-                                in_list_filter=Filter.InListFilter(
-                                    values=ilf.get('values', []),
-                                    case_sensitive=ilf.get('caseSensitive', False)
-                                )
-                            ))
 
-                    return None
+@mcp.tool()
+def get_server_stats() -> Dict[str, Any]:
+    """Rolling latency histograms per traced phase (tool call, request build, cache lookup, API call,
+    client checkout, row conversion, serialization) plus totals for API calls, cache hits and rows."""
+    return _tracer.stats()
+
+
+@mcp.tool()
+def list_properties() -> Dict[str, Any]:
+    """List the configured GA4 properties (aliases from GA4_PROPERTY_IDS), the default, and those in use."""
+    with _property_contexts_lock:
+        active = sorted(_property_contexts)
+    return {
+        "default": GA4_PROPERTY_ID,
+        "registered": _PROPERTY_REGISTRY,
+        "active": active,
+        "restricted": GA4_RESTRICT_PROPERTIES
+    }
+
+
+@mcp.tool()
+def get_client_pool_stats(property_id: Optional[str] = None) -> Dict[str, Any]:
+    """Report Data API client pool usage per property: hits, misses, waits and reconnects."""
+    try:
+        contexts = _selected_contexts(property_id)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {
+        "properties": {c.property: c.clients.stats() for c in contexts},
+        "async": _async_client_manager.stats(),
+        "funnel": _funnel_clients.stats()
+    }
+
+
+@mcp.tool()
+def get_cache_stats(property_id: Optional[str] = None) -> Dict[str, Any]:
+    """Report response cache size, hit/miss counts, evictions and row-count estimation savings per property,
+    plus reuse of compiled dimension filters."""
+    try:
+        contexts = _selected_contexts(property_id)
+    except ValueError as e:
+        return {"error": str(e)}
+    return {
+        "properties": {
+            c.property: {
+                **c.cache.stats(),
+                "row_count_estimates": c.estimates.stats(),
+                "incremental_days": c.days.stats()
+            }
+            for c in contexts
+        },
+        "compiled_filters": _filter_compiler.stats()
+    }
+
+
+@mcp.tool()
+def clear_cache(property_id: Optional[str] = None) -> Dict[str, Any]:
+    """Drop cached report responses, in memory and on disk, for one property or all of them."""
+    try:
+        contexts = _selected_contexts(property_id)
+    except ValueError as e:
+        return {"error": str(e)}
+    for context in contexts:
+        context.cache.clear()
+        context.estimates.clear()
+        context.days.clear()
+        context.results.clear()
+    if property_id in (None, "") and _cache_db is not None:
+        with _cache_db_lock:
+            _cache_db.execute("DELETE FROM report_cache")
+            _cache_db.execute("DELETE FROM day_slices")
+            _cache_db.commit()
+    return {"cleared": [c.property for c in contexts]}
+
+
+def _get_smart_sorting(dimensions, metrics):
+    order_bys = []
+    if "date" in dimensions:
+        order_bys.append(OrderBy(dimension=OrderBy.DimensionOrderBy(dimension_name="date"), desc=True))
+    if metrics:
+        order_bys.append(OrderBy(metric=OrderBy.MetricOrderBy(metric_name=metrics[0]), desc=True))
+    return order_bys
+
+
+def _should_aggregate(dimensions, metrics):
+    return len(dimensions) == 0 or "date" not in dimensions
+
+
+def _parse_name_list(value: Any) -> List[str]:
+    parsed = value
+    if isinstance(value, str):
+        try:
+            parsed = json.loads(value)
+            if not isinstance(parsed, list):
+                parsed = [str(parsed)]
+        except json.JSONDecodeError:
+            parsed = [v.strip() for v in value.split(',')]
+    return [str(v).strip() for v in parsed if str(v).strip()]
+
+
+# Enum names accepted by the Data API; proto-plus resolves them when the filter is compiled
+_STRING_MATCH_TYPES = frozenset(("EXACT", "BEGINS_WITH", "ENDS_WITH", "CONTAINS", "FULL_REGEXP", "PARTIAL_REGEXP"))
+_NUMERIC_OPERATIONS = frozenset(("EQUAL", "LESS_THAN", "LESS_THAN_OR_EQUAL", "GREATER_THAN", "GREATER_THAN_OR_EQUAL"))
+
+
+def _normalize_numeric_value(value: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(value, dict):
+        if "int64Value" in value:
+            return {"int64Value": int(value["int64Value"])}
+        if "doubleValue" in value:
+            return {"doubleValue": float(value["doubleValue"])}
+        return None
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, int) or (isinstance(value, str) and value.lstrip("-").isdigit()):
+        return {"int64Value": int(value)}
+    return {"doubleValue": float(value)}
+
+
+def _normalize_filter_leaf(f: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    field = f.get('fieldName')
+    if not field or not _is_known_dimension(field):
+        return None
+
+    if 'stringFilter' in f:
+        sf = f['stringFilter']
+        match_type = sf.get('matchType', 'EXACT')
+        return {"fieldName": field, "stringFilter": {
+            "matchType": match_type if match_type in _STRING_MATCH_TYPES else "EXACT",
+            "value": str(sf.get('value', '')),
+            "caseSensitive": bool(sf.get('caseSensitive', False))
+        }}
+
+    if 'inListFilter' in f:
+        ilf = f['inListFilter']
+        values = sorted({str(v) for v in ilf.get('values', [])})
+        if not values:
+            return None
+        return {"fieldName": field, "inListFilter": {
+            "values": values, "caseSensitive": bool(ilf.get('caseSensitive', False))
+        }}
+
+    if 'numericFilter' in f:
+        nf = f['numericFilter']
+        operation = nf.get('operation', 'EQUAL')
+        value = _normalize_numeric_value(nf.get('value'))
+        if operation not in _NUMERIC_OPERATIONS or value is None:
+            return None
+        return {"fieldName": field, "numericFilter": {"operation": operation, "value": value}}
+
+    if 'betweenFilter' in f:
+        bf = f['betweenFilter']
+        from_value = _normalize_numeric_value(bf.get('fromValue'))
+        to_value = _normalize_numeric_value(bf.get('toValue'))
+        if from_value is None or to_value is None:
+            return None
+        return {"fieldName": field, "betweenFilter": {"fromValue": from_value, "toValue": to_value}}
 
-                except Exception:
+    return None
+
+
+def _normalize_filter(expr: Any) -> Optional[Dict[str, Any]]:
+    """Canonical form of a dimension_filter tree, or None when it is invalid.
+
+    Nested groups of the same kind are flattened, duplicate and single-child groups collapse, double
+    negations cancel, and group members and in-list values are sorted, so equivalent filters written
+    differently normalize to the same tree.
+    """
+    if not isinstance(expr, dict):
+        return None
+    for group in ('andGroup', 'orGroup'):
+        if group in expr:
+            members: Dict[str, Dict[str, Any]] = {}
+            for e in (expr[group] or {}).get('expressions', []):
+                normalized = _normalize_filter(e)
+                if normalized is None:
                     return None
+                for member in normalized[group]['expressions'] if group in normalized else [normalized]:
+                    members.setdefault(json.dumps(member, sort_keys=True), member)
+            if not members:
+                return None
+            if len(members) == 1:
+                return next(iter(members.values()))
+            return {group: {"expressions": [members[k] for k in sorted(members)]}}
+
+    if 'notExpression' in expr:
+        normalized = _normalize_filter(expr['notExpression'])
+        if normalized is None:
+            return None
+        if 'notExpression' in normalized:
+            return normalized['notExpression']
+        return {"notExpression": normalized}
+
+    if 'filter' in expr and isinstance(expr['filter'], dict):
+        leaf = _normalize_filter_leaf(expr['filter'])
+        return {"filter": leaf} if leaf is not None else None
+    return None
+
+
+def _numeric_value(value: Dict[str, Any]) -> NumericValue:
+    if "int64Value" in value:
+        return NumericValue(int64_value=value["int64Value"])
+    return NumericValue(double_value=value["doubleValue"])
+
+
+def _compile_filter(expr: Dict[str, Any]) -> FilterExpression:
+    if 'andGroup' in expr:
+        return FilterExpression(and_group=FilterExpressionList(
+            expressions=[_compile_filter(e) for e in expr['andGroup']['expressions']]
+        ))
+    if 'orGroup' in expr:
+        return FilterExpression(or_group=FilterExpressionList(
+            expressions=[_compile_filter(e) for e in expr['orGroup']['expressions']]
+        ))
+    if 'notExpression' in expr:
+        return FilterExpression(not_expression=_compile_filter(expr['notExpression']))
+
+    f = expr['filter']
+    if 'stringFilter' in f:
+        sf = f['stringFilter']
+        leaf = Filter(field_name=f['fieldName'], string_filter=Filter.StringFilter(
+            value=sf['value'], match_type=sf['matchType'], case_sensitive=sf['caseSensitive']
+        ))
+    elif 'inListFilter' in f:
+        ilf = f['inListFilter']
+        leaf = Filter(field_name=f['fieldName'], in_list_filter=Filter.InListFilter(
+            values=ilf['values'], case_sensitive=ilf['caseSensitive']
+        ))
+    elif 'numericFilter' in f:
+        nf = f['numericFilter']
+        leaf = Filter(field_name=f['fieldName'], numeric_filter=Filter.NumericFilter(
+            operation=nf['operation'], value=_numeric_value(nf['value'])
+        ))
+    else:
+        bf = f['betweenFilter']
+        leaf = Filter(field_name=f['fieldName'], between_filter=Filter.BetweenFilter(
+            from_value=_numeric_value(bf['fromValue']), to_value=_numeric_value(bf['toValue'])
+        ))
+    return FilterExpression(filter=leaf)
+
+
+class _FilterCompiler:
+    """Memoizes compiled dimension filters by the hash of their canonical form; raw JSON strings
+    are also remembered so a repeated filter skips parsing and normalization entirely."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max(1, max_entries)
+        self._compiled: "OrderedDict[str, Tuple[Dict[str, Any], FilterExpression]]" = OrderedDict()
+        self._raw: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def _remember(self, table: OrderedDict, key: str, value: Any) -> None:
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.max_entries:
+            table.popitem(last=False)
+
+    def compile(self, dimension_filter: Any) -> Tuple[Optional[Dict[str, Any]], Optional[FilterExpression]]:
+        """Returns (canonical filter, compiled expression), or (None, None) for an invalid filter."""
+        raw = dimension_filter if isinstance(dimension_filter, str) else None
+        with self._lock:
+            key = self._raw.get(raw) if raw is not None else None
+            if key is not None and key in self._compiled:
+                self._compiled.move_to_end(key)
+                self._stats["hits"] += 1
+                return self._compiled[key]
+
+        parsed = json.loads(raw) if raw is not None else dimension_filter
+        try:
+            normalized = _normalize_filter(parsed)
+        except (AttributeError, TypeError, ValueError):
+            normalized = None
+        if normalized is None:
+            return None, None
+        key = hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._lock:
+            if raw is not None:
+                self._remember(self._raw, raw, key)
+            entry = self._compiled.get(key)
+            if entry is not None:
+                self._compiled.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry
+            self._stats["misses"] += 1
+        entry = (normalized, _compile_filter(normalized))
+        with self._lock:
+            self._remember(self._compiled, key, entry)
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._compiled), **self._stats}
+
+
+_filter_compiler = _FilterCompiler(GA4_FILTER_CACHE_ENTRIES)
+
+
+def _parse_dimension_filter(dimension_filter: Any) -> Tuple[Optional[FilterExpression], Optional[Dict[str, Any]]]:
+    if not isinstance(dimension_filter, (str, dict)):
+        return None, {"error": "dimension_filter must be a JSON string or dict."}
+    try:
+        _, filter_expression = _filter_compiler.compile(dimension_filter)
+    except json.JSONDecodeError as e:
+        return None, {"error": f"Failed to parse dimension_filter JSON: {e}"}
+    if filter_expression is None:
+        return None, {"error": "Invalid or unsupported dimension_filter structure, or invalid dimension name."}
+    return filter_expression, None
 
-            filter_expression = build_filter_expr(filter_dict)
-            if filter_expression is None:
-                return {"error": "Invalid or unsupported dimension_filter structure, or invalid dimension name."}
 
-        client = BetaAnalyticsDataClient()
-        dimension_objects = [Dimension(name=d) for d in parsed_dimensions]
-        metric_objects = [Metric(name=m) for m in parsed_metrics]
+def _build_report_request(
+    dimensions: Any,
+    metrics: Any,
+    date_range_start: str,
+    date_range_end: str,
+    dimension_filter: Any = None,
+    limit: Any = None,
+    enable_aggregation: bool = True,
+    property_id: Any = None
+) -> Tuple[Optional[RunReportRequest], Optional[Dict[str, Any]]]:
+    try:
+        prop = _resolve_property(property_id)
+    except ValueError as e:
+        return None, {"error": str(e)}
+    parsed_dimensions = _parse_name_list(dimensions)
+    parsed_metrics = _parse_name_list(metrics)
+
+    if not parsed_dimensions:
+        return None, {"error": "Dimensions list cannot be empty after parsing."}
+    if not parsed_metrics:
+        return None, {"error": "Metrics list cannot be empty after parsing."}
+    if GA4_VALIDATE_NAMES:
+        error = _validate_names(parsed_dimensions, parsed_metrics)
+        if error:
+            return None, error
+
+    filter_expression = None
+    if dimension_filter:
+        filter_expression, error = _parse_dimension_filter(dimension_filter)
+        if error:
+            return None, error
+
+    request = RunReportRequest(
+        property=prop,
+        dimensions=[Dimension(name=d) for d in parsed_dimensions],
+        metrics=[Metric(name=m) for m in parsed_metrics],
+        date_ranges=[DateRange(start_date=date_range_start, end_date=date_range_end)],
+        dimension_filter=filter_expression if filter_expression else None,
+        limit=str(limit) if limit else None,
+        order_bys=_get_smart_sorting(parsed_dimensions, parsed_metrics),
+        metric_aggregations=[MetricAggregation.TOTAL] if enable_aggregation and _should_aggregate(parsed_dimensions, parsed_metrics) else None,
+        return_property_quota=True
+    )
+    return request, None
+
+
+def _iter_row_dicts(response: Any) -> Iterator[Dict[str, Any]]:
+    dimension_names = [h.name for h in response.dimension_headers]
+    metric_names = [h.name for h in response.metric_headers]
+    for row in response.rows:
+        data_row: Dict[str, Any] = {}
+        for i, name in enumerate(dimension_names):
+            data_row[name] = row.dimension_values[i].value if i < len(row.dimension_values) else None
+        for i, name in enumerate(metric_names):
+            data_row[name] = row.metric_values[i].value if i < len(row.metric_values) else None
+        yield data_row
 
-        if not proceed_with_large_dataset or estimate_only:
+
+_OUTPUT_FORMATS = ("rows", "columnar")
+
+
+def _parse_metric_column(values: List[str], metric_type: Any) -> List[Any]:
+    cast = int if metric_type == MetricType.TYPE_INTEGER else float
+    try:
+        return [cast(v) for v in values]
+    except ValueError:
+        parsed: List[Any] = []
+        for v in values:
             try:
-                estimation_request = RunReportRequest(
-                    property=f"properties/{GA4_PROPERTY_ID}",
-                    dimensions=dimension_objects,
-                    metrics=metric_objects,
-                    date_ranges=[DateRange(start_date=date_range_start, end_date=date_range_end)],
-                    dimension_filter=filter_expression if filter_expression else None,
-                    limit="1"
-                )
-                estimation_response = client.run_report(estimation_request)
-                estimated_rows = estimation_response.row_count
-
-                if estimate_only:
-                    return {"estimated_rows": estimated_rows}
-
-                if estimated_rows > 2500:
-                    return {
-                        "warning": True,
-                        "estimated_rows": estimated_rows,
-                        "suggestions": [
-                            "Reduce date range to get fewer rows",
-                            "Add dimension filters to narrow results",
-                            "Consider using fewer dimensions",
-                            "Use limit parameter to restrict number of rows"
-                        ],
-                        "proceed_instructions": "Add proceed_with_large_dataset=True to continue with this query"
-                    }
-            except Exception:
-                pass
+                parsed.append(cast(v))
+            except ValueError:
+                parsed.append(None)
+        return parsed
+
+
+def _columnar_report(response: Any) -> Dict[str, Any]:
+    rows = response.rows
+    columns: Dict[str, List[Any]] = {}
+    for i, header in enumerate(response.dimension_headers):
+        columns[header.name] = [row.dimension_values[i].value for row in rows]
+    for i, header in enumerate(response.metric_headers):
+        columns[header.name] = _parse_metric_column([row.metric_values[i].value for row in rows], header.type_)
+    return {
+        "dimension_headers": [h.name for h in response.dimension_headers],
+        "metric_headers": [{"name": h.name, "type": MetricType(h.type_).name} for h in response.metric_headers],
+        "columns": columns
+    }
+
+
+def _report_result(
+    response: Any,
+    parsed_dimensions: List[str],
+    parsed_metrics: List[str],
+    limit: Any,
+    enable_aggregation: bool,
+    cache_hit: bool,
+    output_format: str = "rows"
+) -> Any:
+    if output_format == "columnar":
+        result: Any = _columnar_report(response)
+        returned_rows = len(response.rows)
+    else:
+        result = list(_iter_row_dicts(response))
+        returned_rows = len(result)
+
+    applied_optimizations = []
+    if limit:
+        applied_optimizations.append(f"Limited to {limit} rows")
+    if enable_aggregation and _should_aggregate(parsed_dimensions, parsed_metrics):
+        applied_optimizations.append("Server-side aggregation applied")
+    if _get_smart_sorting(parsed_dimensions, parsed_metrics):
+        applied_optimizations.append("Intelligent sorting applied")
+    if cache_hit:
+        applied_optimizations.append("Served from response cache")
+
+    if not applied_optimizations and output_format == "rows":
+        return result
+
+    return {
+        "data": result,
+        "metadata": {
+            "total_rows": response.row_count,
+            "returned_rows": returned_rows,
+            "applied_optimizations": applied_optimizations
+        }
+    }
+
+
+def _incremental_days(request: RunReportRequest) -> Optional[List[date]]:
+    if len(request.date_ranges) != 1 or "date" not in [d.name for d in request.dimensions]:
+        return None
+    today = date.today()
+    start = _resolve_date(request.date_ranges[0].start_date, today)
+    end = _resolve_date(request.date_ranges[0].end_date, today)
+    if start is None or end is None or start > end:
+        return None
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+
+def _parse_ga4_date(value: str) -> Optional[date]:
+    # GA4 returns YYYYMMDD, but thresholded or bucketed rows can carry values such as "(other)"
+    if len(value) != 8 or not value.isdigit():
+        return None
+    try:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    except ValueError:
+        return None
+
+
+def _contiguous_runs(days: List[date]) -> List[Tuple[date, date]]:
+    runs: List[Tuple[date, date]] = []
+    for day in sorted(days):
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+def _incremental_steps(
+    request: RunReportRequest,
+    days: List[date],
+    use_cache: bool
+) -> Generator[Tuple[RunReportRequest, bool], Tuple[Any, bool], Tuple[Optional[Any], Dict[str, int]]]:
+    # Settled days come from the day store; missing days and the still-settling tail are fetched in
+    # contiguous runs, split back into per-day slices and merged newest-first like the smart sort.
+    # Returns (None, stats) when a row's date cannot be assigned to a day, so the caller can fall back
+    # to a plain request; runs that were split cleanly before that stay in the store.
+    store = _property_context(request.property).days
+    signature = _cache_key(_copy_request(_shape_request(request), date_ranges=[]))
+    settled_before = date.today() - timedelta(days=GA4_SETTLING_DAYS)
+    slices: Dict[date, Any] = {}
+    missing = []
+    for day in days:
+        payload = store.get(signature, day) if day < settled_before else None
+        if payload is not None:
+            slices[day] = RunReportResponse.deserialize(payload)
+        else:
+            missing.append(day)
+
+    api_calls = 0
+    date_index = [d.name for d in request.dimensions].index("date")
+    for start, end in _contiguous_runs(missing):
+        run_request = _copy_request(
+            request,
+            date_ranges=[DateRange(start_date=start.isoformat(), end_date=end.isoformat())],
+            limit=_MAX_PAGE_SIZE,
+            metric_aggregations=[]
+        )
+        by_day: Dict[date, List[Any]] = {start + timedelta(days=n): [] for n in range((end - start).days + 1)}
+        offset = 0
+        while True:
+            response, cache_hit = yield _copy_request(run_request, offset=offset), use_cache
+            api_calls += 0 if cache_hit else 1
+            for row in response.rows:
+                day = _parse_ga4_date(row.dimension_values[date_index].value)
+                if day not in by_day:
+                    store.count("unsplittable_reports")
+                    return None, {"days": len(days), "days_from_store": 0, "api_calls": api_calls}
+                by_day[day].append(row)
+            offset += len(response.rows)
+            if not response.rows or offset >= response.row_count:
+                break
+        for day, rows in by_day.items():
+            day_slice = RunReportResponse(
+                dimension_headers=response.dimension_headers,
+                metric_headers=response.metric_headers,
+                rows=rows,
+                row_count=len(rows)
+            )
+            if day < settled_before:
+                store.set(signature, day, RunReportResponse.serialize(day_slice))
+            slices[day] = day_slice
+
+    store.count("days_from_store", len(days) - len(missing))
+    store.count("days_fetched", len(missing))
+    headers = next(iter(slices.values()))
+    merged = RunReportResponse(
+        dimension_headers=headers.dimension_headers,
+        metric_headers=headers.metric_headers,
+        rows=[row for day in sorted(slices, reverse=True) for row in slices[day].rows]
+    )
+    merged.row_count = len(merged.rows)
+    return merged, {"days": len(days), "days_from_store": len(days) - len(missing), "api_calls": api_calls}
+
+
+def _ga4_data_steps(
+    dimensions: Any,
+    metrics: Any,
+    date_range_start: str,
+    date_range_end: str,
+    dimension_filter: Any,
+    estimate_only: bool,
+    proceed_with_large_dataset: bool,
+    limit: Any,
+    enable_aggregation: bool,
+    use_cache: bool,
+    format: str,
+    property_id: Any,
+    incremental: bool = False
+) -> Generator[Tuple[RunReportRequest, bool], Tuple[Any, bool], Any]:
+    # Yields (request, use_cache) for each report it needs and receives (response, cache_hit) back,
+    # so the sync and async tools share one code path and differ only in how they call the API
+    if format not in _OUTPUT_FORMATS:
+        return {"error": f"format must be one of {list(_OUTPUT_FORMATS)}."}
+    if limit:
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            limit = -1
+        if limit < 1:
+            return {"error": "limit must be a positive integer."}
+    with _tracer.span("build_request") as span:
+        request, error = _build_report_request(
+            dimensions, metrics, date_range_start, date_range_end, dimension_filter, limit, enable_aggregation,
+            property_id
+        )
+    if error:
+        return error
+    span.root.set(property=request.property, dimensions=len(request.dimensions), metrics=len(request.metrics))
+    parsed_dimensions = [d.name for d in request.dimensions]
+    parsed_metrics = [m.name for m in request.metrics]
+    estimates = _property_context(request.property).estimates
+
+    shape_request = _shape_request(request)
+    shape_key = _cache_key(shape_request)
+    known_rows = estimates.lookup(shape_key) if use_cache else None
+    large_dataset_warning = {
+        "warning": True,
+        "suggestions": [
+            "Reduce date range to get fewer rows",
+            "Add dimension filters to narrow results",
+            "Consider using fewer dimensions",
+            "Use limit parameter to restrict number of rows",
+            "Use get_ga4_data_page to pull the report incrementally, or export_ga4_data to stream it to a file"
+        ],
+        "proceed_instructions": "Add proceed_with_large_dataset=True to continue with this query"
+    }
+
+    if estimate_only:
+        if known_rows is not None:
+            estimates.count("estimation_calls_saved")
+            return {"estimated_rows": known_rows}
+        estimation_request = _shape_request(request)
+        estimation_request.limit = 1
+        with _tracer.span("estimate"):
+            estimation_response, _ = yield estimation_request, use_cache
+        estimates.count("estimation_calls")
+        estimates.record(shape_key, estimation_response.row_count, _cache_ttl(request))
+        return {"estimated_rows": estimation_response.row_count}
+
+    # A limit at or below the threshold already bounds the result, so no size check is needed
+    check_size = not proceed_with_large_dataset and not (limit and limit <= GA4_LARGE_DATASET_ROWS)
+    if check_size and known_rows is not None:
+        estimates.count("estimation_calls_saved")
+        if known_rows > GA4_LARGE_DATASET_ROWS:
+            return {**large_dataset_warning, "estimated_rows": known_rows}
+        check_size = False
+
+    # Incremental fetches download whole days, so they only serve unlimited reports
+    days = _incremental_days(request) if incremental and use_cache and not limit else None
+    if days and check_size:
+        # Check the size before downloading any missing day, not after
+        estimation_request = _shape_request(request)
+        estimation_request.limit = 1
+        with _tracer.span("estimate"):
+            estimation_response, _ = yield estimation_request, use_cache
+        estimates.count("estimation_calls")
+        estimates.record(shape_key, estimation_response.row_count, _cache_ttl(request))
+        if estimation_response.row_count > GA4_LARGE_DATASET_ROWS:
+            return {**large_dataset_warning, "estimated_rows": estimation_response.row_count}
+        check_size = False
+    response = None
+    if days:
+        with _tracer.span("incremental_fetch") as span:
+            response, incremental_stats = yield from _incremental_steps(request, days, use_cache)
+            span.set(days=incremental_stats["days"], days_from_store=incremental_stats["days_from_store"])
+    if response is not None:
+        estimates.record(shape_key, response.row_count, _cache_ttl(request))
+        _cache_store(_copy_request(request, limit=0), response)
+        with _tracer.span("convert", rows=len(response.rows)):
+            result = _report_result(
+                response, parsed_dimensions, parsed_metrics, limit, enable_aggregation, False, format
+            )
+        _tracer.count("rows", len(response.rows))
+        if isinstance(result, dict):
+            result["metadata"]["applied_optimizations"].append(
+                f"Incremental fetch: {incremental_stats['days_from_store']} of {incremental_stats['days']} days "
+                "served from the local day store"
+            )
+            result["metadata"]["incremental"] = incremental_stats
+        return result
+
+    # Fetch the first page of real data and read row_count from it instead of a separate estimate
+    report_request = _copy_request(request, limit=GA4_LARGE_DATASET_ROWS) if check_size else request
+    with _tracer.span("report", size_check=check_size):
+        response, cache_hit = yield report_request, use_cache
+    estimates.record(shape_key, response.row_count, _cache_ttl(request))
+    if check_size:
+        if response.row_count > GA4_LARGE_DATASET_ROWS:
+            return {**large_dataset_warning, "estimated_rows": response.row_count}
+        estimates.count("estimation_calls_saved")
+        if use_cache and not cache_hit:
+            # The capped page holds the whole report, so it also answers the request without the cap, which
+            # is what the next identical call sends once the row count is known
+            _cache_store(request, response)
+
+    with _tracer.span("convert", rows=len(response.rows)):
+        result = _report_result(
+            response, parsed_dimensions, parsed_metrics, limit, enable_aggregation, cache_hit, format
+        )
+    _tracer.count("rows", len(response.rows))
+    return result
+
+
+def _run_steps(steps: Generator[Tuple[RunReportRequest, bool], Tuple[Any, bool], Any]) -> Any:
+    try:
+        step = next(steps)
+        while True:
+            step = steps.send(_run_report(*step))
+    except StopIteration as done:
+        return done.value
+    finally:
+        # Close the generator here so spans still open inside it end with this call
+        steps.close()
+
+
+async def _run_steps_async(steps: Generator[Tuple[RunReportRequest, bool], Tuple[Any, bool], Any]) -> Any:
+    try:
+        step = next(steps)
+        while True:
+            step = steps.send(await _run_report_async(*step))
+    except StopIteration as done:
+        return done.value
+    finally:
+        steps.close()
+
+
+def _traced_result(span: _Span, result: Any) -> Any:
+    if isinstance(result, dict) and "error" in result:
+        span.error = str(result["error"])
+    if GA4_TRACE_PAYLOAD:
+        # Measures the cost and size of the JSON the stdio transport will send, at the price of one extra dump
+        with _tracer.span("serialize") as serialize_span:
+            payload_bytes = len(json.dumps(result, default=str).encode("utf-8"))
+            serialize_span.set(payload_bytes=payload_bytes)
+        _tracer.count("payload_bytes", payload_bytes)
+    return result
+
+
+@mcp.tool()
+def get_ga4_data(
+    dimensions=["date"],
+    metrics=["totalUsers", "newUsers", "bounceRate", "screenPageViewsPerSession", "averageSessionDuration"],
+    date_range_start="7daysAgo",
+    date_range_end="yesterday",
+    dimension_filter=None,
+    estimate_only=False,
+    proceed_with_large_dataset=False,
+    limit=None,
+    enable_aggregation=True,
+    use_cache=True,
+    format="rows",
+    property_id=None,
+    incremental=False
+):
+    with _tracer.span("get_ga4_data", format=format) as span:
+        try:
+            result = _run_steps(_ga4_data_steps(
+                dimensions, metrics, date_range_start, date_range_end, dimension_filter, estimate_only,
+                proceed_with_large_dataset, limit, enable_aggregation, use_cache, format, property_id, incremental
+            ))
+        except Exception as e:
+            result = {"error": f"Error fetching GA4 data: {str(e)}"}
+        return _traced_result(span, result)
+
+
+@mcp.tool()
+async def get_ga4_data_async(
+    dimensions=["date"],
+    metrics=["totalUsers", "newUsers", "bounceRate", "screenPageViewsPerSession", "averageSessionDuration"],
+    date_range_start="7daysAgo",
+    date_range_end="yesterday",
+    dimension_filter=None,
+    estimate_only=False,
+    proceed_with_large_dataset=False,
+    limit=None,
+    enable_aggregation=True,
+    use_cache=True,
+    format="rows",
+    property_id=None,
+    incremental=False
+):
+    """Same as get_ga4_data, but runs on the async Data API client so slow reports do not block
+    other tool calls. Requests are limited per property to stay within GA4 concurrency quotas."""
+    with _tracer.span("get_ga4_data_async", format=format) as span:
+        try:
+            result = await _run_steps_async(_ga4_data_steps(
+                dimensions, metrics, date_range_start, date_range_end, dimension_filter, estimate_only,
+                proceed_with_large_dataset, limit, enable_aggregation, use_cache, format, property_id, incremental
+            ))
+        except Exception as e:
+            result = {"error": f"Error fetching GA4 data: {str(e)}"}
+        return _traced_result(span, result)
+
+
+# Data API hard cap on rows per RunReport page
+_MAX_PAGE_SIZE = 250000
+
+_fetch_executor = ThreadPoolExecutor(max_workers=max(1, GA4_PAGE_CONCURRENCY), thread_name_prefix="ga4-fetch")
+_prefetched_pages: "OrderedDict[str, Future]" = OrderedDict()
+_prefetch_lock = threading.Lock()
+
+
+def _with_stable_order(request: RunReportRequest) -> RunReportRequest:
+    # Tie-break on every dimension so rows never shift between pages
+    ordered = {o.dimension.dimension_name for o in request.order_bys if o.dimension}
+    extra = [
+        OrderBy(dimension=OrderBy.DimensionOrderBy(dimension_name=d.name))
+        for d in request.dimensions if d.name not in ordered
+    ]
+    return _copy_request(request, order_bys=list(request.order_bys) + extra)
+
+
+def _fetch_page(request: RunReportRequest, offset: int, page_size: int, use_cache: bool = True) -> Any:
+    response, _ = _run_report(_copy_request(request, offset=offset, limit=page_size), use_cache)
+    return response
+
+
+def _iter_report_pages(
+    request: RunReportRequest,
+    page_size: int = GA4_PAGE_SIZE,
+    concurrency: int = GA4_PAGE_CONCURRENCY,
+    use_cache: bool = True
+) -> Iterator[Any]:
+    page_size = max(1, min(int(page_size), _MAX_PAGE_SIZE))
+    request = _with_stable_order(request)
+    first = _fetch_page(request, 0, page_size, use_cache)
+    yield first
+
+    # Once row_count is known, keep a bounded window of pages in flight and yield them in order
+    offsets = iter(range(page_size, first.row_count, page_size))
+    pending: "deque[Future]" = deque(
+        _fetch_executor.submit(_fetch_page, request, offset, page_size, use_cache)
+        for offset in itertools.islice(offsets, max(1, concurrency))
+    )
+    try:
+        while pending:
+            response = pending.popleft().result()
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append(_fetch_executor.submit(_fetch_page, request, offset, page_size, use_cache))
+            yield response
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _iter_report_rows(
+    request: RunReportRequest,
+    page_size: int = GA4_PAGE_SIZE,
+    concurrency: int = GA4_PAGE_CONCURRENCY,
+    use_cache: bool = True
+) -> Iterator[Dict[str, Any]]:
+    for response in _iter_report_pages(request, page_size, concurrency, use_cache):
+        yield from _iter_row_dicts(response)
+
+
+def _encode_cursor(request: RunReportRequest, offset: int, page_size: int) -> str:
+    payload = {
+        "request": base64.b64encode(RunReportRequest.serialize(request)).decode(),
+        "offset": offset,
+        "page_size": page_size
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[RunReportRequest, int, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(str(cursor).encode()))
+        request = RunReportRequest.deserialize(base64.b64decode(payload["request"]))
+        offset, page_size = int(payload["offset"]), int(payload["page_size"])
+    except Exception:
+        # Bad base64, JSON or protobuf all mean the same thing to the caller
+        offset = -1
+    if offset < 0:
+        raise ValueError("Invalid cursor; pass next_cursor back exactly as get_ga4_data_page returned it.")
+    # Cursors come back from the client, so they get the same property checks and page size cap as arguments
+    request.property = _resolve_property(request.property)
+    return request, offset, max(1, min(page_size, _MAX_PAGE_SIZE))
+
+
+def _prefetch_page(cursor: str, request: RunReportRequest, offset: int, page_size: int) -> None:
+    with _prefetch_lock:
+        if cursor in _prefetched_pages:
+            return
+        _prefetched_pages[cursor] = _fetch_executor.submit(_fetch_page, request, offset, page_size, True)
+        while len(_prefetched_pages) > GA4_PAGE_CONCURRENCY * 4:
+            _prefetched_pages.popitem(last=False)[1].cancel()
+
+
+@mcp.tool()
+def get_ga4_data_page(
+    dimensions=["date"],
+    metrics=["totalUsers", "newUsers", "bounceRate", "screenPageViewsPerSession", "averageSessionDuration"],
+    date_range_start="7daysAgo",
+    date_range_end="yesterday",
+    dimension_filter=None,
+    page_size=GA4_PAGE_SIZE,
+    cursor=None,
+    enable_aggregation=True,
+    use_cache=True,
+    format="rows",
+    property_id=None,
+    prefetch=GA4_PAGE_PREFETCH
+):
+    """Fetch one page of a report. Pass the returned next_cursor back (alone) to get the following page.
+    With prefetch=True the next page is fetched in the background (one extra API call even if never read)."""
+    try:
+        if format not in _OUTPUT_FORMATS:
+            return {"error": f"format must be one of {list(_OUTPUT_FORMATS)}."}
+        if cursor:
+            try:
+                request, offset, page_size = _decode_cursor(cursor)
+            except ValueError as e:
+                return {"error": str(e)}
+        else:
+            request, error = _build_report_request(
+                dimensions, metrics, date_range_start, date_range_end, dimension_filter, None, enable_aggregation,
+                property_id
+            )
+            if error:
+                return error
+            request = _with_stable_order(request)
+            offset = 0
+            page_size = max(1, min(int(page_size), _MAX_PAGE_SIZE))
+
+        with _prefetch_lock:
+            prefetched = _prefetched_pages.pop(cursor, None) if cursor else None
+        if prefetched and not use_cache:
+            # A prefetched page is a cached read; use_cache=False asks for a fresh one
+            prefetched.cancel()
+            prefetched = None
+        response = prefetched.result() if prefetched else _fetch_page(request, offset, page_size, use_cache)
+
+        next_offset = offset + len(response.rows)
+        next_cursor = None
+        if response.rows and next_offset < response.row_count:
+            next_cursor = _encode_cursor(request, next_offset, page_size)
+            if prefetch and use_cache:
+                _prefetch_page(next_cursor, request, next_offset, page_size)
+
+        return {
+            "data": _columnar_report(response) if format == "columnar" else list(_iter_row_dicts(response)),
+            "metadata": {
+                "total_rows": response.row_count,
+                "offset": offset,
+                "returned_rows": len(response.rows)
+            },
+            "next_cursor": next_cursor
+        }
+
+    except Exception as e:
+        return {"error": f"Error fetching GA4 data: {str(e)}"}
+
+
+def _write_columnar_export(pages: Iterator[Any], output_path: str, output_format: str) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow is required for parquet/arrow export (pip install 'google-analytics-mcp[arrow]')")
+
+    rows_written = 0
+    writer = None
+    try:
+        for response in pages:
+            table = pa.table(_columnar_report(response)["columns"])
+            if writer is None:
+                if output_format == "parquet":
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                else:
+                    writer = pa.ipc.new_file(output_path, table.schema)
+            writer.write_table(table)
+            rows_written += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows_written
+
+
+def _resolve_export_path(output_path: Any) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    # Exports are confined to GA4_EXPORT_DIR so a tool call cannot overwrite arbitrary files
+    root = os.path.realpath(GA4_EXPORT_DIR)
+    path = os.path.realpath(os.path.join(root, str(output_path)))
+    if path == root or os.path.commonpath([root, path]) != root:
+        return None, {"error": f"output_path must be a file inside the export directory {root}."}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path, None
+
+
+@mcp.tool()
+def export_ga4_data(
+    output_path,
+    dimensions=["date"],
+    metrics=["totalUsers", "newUsers", "bounceRate", "screenPageViewsPerSession", "averageSessionDuration"],
+    date_range_start="7daysAgo",
+    date_range_end="yesterday",
+    dimension_filter=None,
+    page_size=GA4_PAGE_SIZE,
+    format="jsonl",
+    property_id=None
+):
+    """Stream a full report to a file page by page, fetching pages concurrently.
+    output_path is relative to the server's export directory (GA4_EXPORT_DIR) and cannot leave it.
+    format is "jsonl", or "parquet"/"arrow" for typed columnar files (requires pyarrow)."""
+    try:
+        if format not in ("jsonl", "parquet", "arrow"):
+            return {"error": "format must be one of ['jsonl', 'parquet', 'arrow']."}
+        path, error = _resolve_export_path(output_path)
+        if error:
+            return error
+        request, error = _build_report_request(
+            dimensions, metrics, date_range_start, date_range_end, dimension_filter, None, False, property_id
+        )
+        if error:
+            return error
+        if format != "jsonl":
+            rows_written = _write_columnar_export(_iter_report_pages(request, page_size, use_cache=False), path, format)
+            return {"output_path": path, "rows_written": rows_written, "format": format}
+
+        rows_written = 0
+        with open(path, "w", encoding="utf-8") as fh:
+            for row in _iter_report_rows(request, page_size, use_cache=False):
+                fh.write(json.dumps(row))
+                fh.write("\n")
+                rows_written += 1
+        return {"output_path": path, "rows_written": rows_written, "format": format}
+
+    except Exception as e:
+        return {"error": f"Error exporting GA4 data: {str(e)}"}
+
+
+# Data API cap on reports per BatchRunReports call
+_MAX_BATCH_REQUESTS = 5
+
+
+def _run_batch(requests: List[RunReportRequest]) -> List[Any]:
+    batch = BatchRunReportsRequest(property=requests[0].property, requests=requests)
+    return list(_call_api("batch_run_reports", batch).reports)
+
+
+@mcp.tool()
+def get_ga4_data_batch(reports, use_cache=True, property_id=None):
+    """Run several report specs through BatchRunReports. Each spec takes the get_ga4_data arguments
+    (dimensions, metrics, date_range_start, date_range_end, dimension_filter, limit, enable_aggregation,
+    format, property_id); results come back in the same order."""
+    try:
+        if isinstance(reports, str):
+            try:
+                reports = json.loads(reports)
+            except json.JSONDecodeError as e:
+                return {"error": f"Failed to parse reports JSON: {e}"}
+        if not isinstance(reports, list) or not reports:
+            return {"error": "reports must be a non-empty list of report specs."}
+        if len(reports) > GA4_BATCH_MAX_REPORTS:
+            return {"error": f"At most {GA4_BATCH_MAX_REPORTS} reports can be batched in one call."}
+
+        results: List[Any] = [None] * len(reports)
+        prepared = []
+        for i, spec in enumerate(reports):
+            if not isinstance(spec, dict):
+                results[i] = {"error": "Each report spec must be an object."}
+                continue
+            limit = spec.get("limit")
+            enable_aggregation = spec.get("enable_aggregation", True)
+            output_format = spec.get("format", "rows")
+            if output_format not in _OUTPUT_FORMATS:
+                results[i] = {"error": f"format must be one of {list(_OUTPUT_FORMATS)}."}
+                continue
+            request, error = _build_report_request(
+                spec.get("dimensions", ["date"]),
+                spec.get("metrics", ["totalUsers"]),
+                spec.get("date_range_start", "7daysAgo"),
+                spec.get("date_range_end", "yesterday"),
+                spec.get("dimension_filter"),
+                # Batched reports are not size-checked, so cap them like an unconfirmed get_ga4_data call
+                limit or GA4_LARGE_DATASET_ROWS,
+                enable_aggregation,
+                spec.get("property_id", property_id)
+            )
+            if error:
+                results[i] = error
+                continue
+            prepared.append((i, request, limit, enable_aggregation, output_format))
+
+        responses: Dict[int, Tuple[Any, bool]] = {}
+        to_fetch: Dict[str, List[Tuple[int, RunReportRequest]]] = {}
+        for i, request, _, _, _ in prepared:
+            cached = _cache_lookup(request) if use_cache else None
+            if cached is not None:
+                responses[i] = (cached, True)
+            else:
+                to_fetch.setdefault(request.property, []).append((i, request))
+
+        # A BatchRunReports call covers a single property
+        chunks = [
+            pending[n:n + _MAX_BATCH_REQUESTS]
+            for pending in to_fetch.values()
+            for n in range(0, len(pending), _MAX_BATCH_REQUESTS)
+        ]
+        futures = [_fetch_executor.submit(_run_batch, [request for _, request in chunk]) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                chunk_responses = future.result()
+            except Exception as e:
+                for i, _ in chunk:
+                    results[i] = {"error": f"Error fetching GA4 data: {str(e)}"}
+                continue
+            for (i, request), response in zip(chunk, chunk_responses):
+                if use_cache:
+                    _cache_store(request, response)
+                responses[i] = (response, False)
+
+        for i, request, limit, enable_aggregation, output_format in prepared:
+            if i not in responses:
+                continue
+            response, cache_hit = responses[i]
+            parsed_dimensions = [d.name for d in request.dimensions]
+            parsed_metrics = [m.name for m in request.metrics]
+            _property_context(request.property).estimates.record(
+                _cache_key(_shape_request(request)), response.row_count, _cache_ttl(request)
+            )
+            results[i] = _report_result(
+                response, parsed_dimensions, parsed_metrics, limit, enable_aggregation, cache_hit, output_format
+            )
+            if not limit and response.row_count > len(response.rows) and isinstance(results[i], dict):
+                results[i]["metadata"]["truncated"] = True
+
+        return {"reports": results, "api_calls": len(chunks)}
+
+    except Exception as e:
+        return {"error": f"Error fetching GA4 data: {str(e)}"}
+
+
+# The Realtime API accepts a much smaller schema than core reports
+_REALTIME_DIMENSIONS = frozenset((
+    "appVersion", "audienceId", "audienceName", "audienceResourceName", "city", "cityId", "country",
+    "countryId", "deviceCategory", "eventName", "minutesAgo", "platform", "streamId", "streamName",
+    "unifiedScreenName"
+))
+_REALTIME_METRICS = frozenset(("activeUsers", "conversions", "eventCount", "keyEvents", "screenPageViews"))
+
+
+class _RealtimeSubscription:
+    """One background poller for a (property, dimensions, metrics) realtime report, shared by every
+    caller asking for it. Keeps the last few snapshots so callers can ask for changes since a cursor."""
+
+    def __init__(self, key: Tuple[str, Tuple[str, ...], Tuple[str, ...]], request: Any):
+        self.key = key
+        self.request = request
+        self.token = os.urandom(4).hex()
+        self.seq = 0
+        self.polls = 0
+        self.reads = 0
+        self.polled_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_read = time.time()
+        self.stopped = False
+        self._snapshots: "OrderedDict[int, Dict[Tuple[str, ...], Tuple[str, ...]]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"ga4-realtime-{self.token}", daemon=True)
+        self._thread.start()
+
+    def _poll(self) -> None:
+        # Realtime requests draw on their own GA4 token pool, so they get their own quota bucket
+        response = _call_api("run_realtime_report", self.request, quota_key=f"{self.request.property}/realtime")
+        rows = {
+            tuple(v.value for v in row.dimension_values): tuple(v.value for v in row.metric_values)
+            for row in response.rows
+        }
+        with self._cond:
+            self.seq += 1
+            self.polls += 1
+            self._snapshots[self.seq] = rows
+            while len(self._snapshots) > GA4_REALTIME_HISTORY:
+                self._snapshots.popitem(last=False)
+            self.polled_at = time.time()
+            self.last_error = None
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._poll()
+            except Exception as e:
+                with self._cond:
+                    self.last_error = str(e)
+                    self._cond.notify_all()
+            if time.time() - self.last_read > GA4_REALTIME_IDLE_TIMEOUT:
+                break
+            self._stop.wait(GA4_REALTIME_INTERVAL)
+        with _realtime_lock:
+            self.stopped = True
+            if _realtime_subscriptions.get(self.key) is self:
+                del _realtime_subscriptions[self.key]
+        with self._cond:
+            self._cond.notify_all()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def read(self, since: Optional[int], wait_seconds: float) -> Tuple[int, Optional[Dict], Optional[Dict]]:
+        """Returns (seq, latest snapshot, snapshot at `since` or None when it is unknown or evicted),
+        waiting up to `wait_seconds` for a poll newer than `since`."""
+        deadline = time.monotonic() + wait_seconds
+        with self._cond:
+            self.reads += 1
+            self.last_read = time.time()
+            while not self.stopped:
+                if self.seq > (since or 0) or (self.last_error and not self.seq):
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            latest = self._snapshots.get(self.seq)
+            previous = self._snapshots.get(since) if since else None
+            return self.seq, latest, previous
+
+
+_realtime_subscriptions: Dict[Tuple[str, Tuple[str, ...], Tuple[str, ...]], _RealtimeSubscription] = {}
+_realtime_lock = threading.Lock()
+
+
+def _realtime_subscription(prop: str, dimensions: List[str], metrics: List[str]) -> _RealtimeSubscription:
+    key = (prop, tuple(dimensions), tuple(metrics))
+    with _realtime_lock:
+        subscription = _realtime_subscriptions.get(key)
+        if subscription is not None and not subscription.stopped:
+            return subscription
+        if len(_realtime_subscriptions) >= GA4_REALTIME_MAX_SUBSCRIPTIONS:
+            raise ValueError(
+                f"Too many live realtime subscriptions ({GA4_REALTIME_MAX_SUBSCRIPTIONS}); reuse existing "
+                "dimension/metric combinations or wait for idle ones to expire."
+            )
+        request = RunRealtimeReportRequest(
+            property=prop,
+            dimensions=[Dimension(name=d) for d in dimensions],
+            metrics=[Metric(name=m) for m in metrics],
+            return_property_quota=True
+        )
+        subscription = _realtime_subscriptions[key] = _RealtimeSubscription(key, request)
+        return subscription
+
+
+def _realtime_row(dimensions: List[str], metrics: List[str], key: Tuple[str, ...], values: Tuple[str, ...]) -> Dict[str, Any]:
+    return {**dict(zip(dimensions, key)), **dict(zip(metrics, values))}
+
+
+def _realtime_changes(
+    dimensions: List[str],
+    metrics: List[str],
+    previous: Dict[Tuple[str, ...], Tuple[str, ...]],
+    latest: Dict[Tuple[str, ...], Tuple[str, ...]]
+) -> Dict[str, List[Dict[str, Any]]]:
+    added, changed, removed = [], [], []
+    for key, values in latest.items():
+        before = previous.get(key)
+        if before is None:
+            added.append(_realtime_row(dimensions, metrics, key, values))
+        elif before != values:
+            row = _realtime_row(dimensions, metrics, key, values)
+            row["delta"] = {m: _parse_number(v) - _parse_number(b) for m, v, b in zip(metrics, values, before)}
+            changed.append(row)
+    for key, values in previous.items():
+        if key not in latest:
+            removed.append(_realtime_row(dimensions, metrics, key, values))
+    return {"added": added, "changed": changed, "removed": removed}
+
+
+def _parse_number(value: str) -> Any:
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+@mcp.tool()
+def get_realtime_data(
+    dimensions=["country"],
+    metrics=["activeUsers"],
+    cursor=None,
+    wait_seconds=0,
+    property_id=None
+):
+    """Live activity from the GA4 Realtime API (last 30 minutes). Callers asking for the same dimensions and
+    metrics share one background poller that refreshes every GA4_REALTIME_INTERVAL seconds. Pass back the
+    returned cursor to get only the rows added, changed or removed since then; wait_seconds blocks until
+    the next poll when nothing is new yet."""
+    try:
+        prop = _resolve_property(property_id)
+        parsed_dimensions = _parse_name_list(dimensions)
+        parsed_metrics = _parse_name_list(metrics)
+        if not parsed_metrics:
+            return {"error": "Metrics list cannot be empty after parsing."}
+        unknown = [d for d in parsed_dimensions if d not in _REALTIME_DIMENSIONS and not _is_custom_name(d)]
+        unknown += [m for m in parsed_metrics if m not in _REALTIME_METRICS]
+        if unknown:
+            return {
+                "error": f"Not available in realtime reports: {unknown}.",
+                "realtime_dimensions": sorted(_REALTIME_DIMENSIONS),
+                "realtime_metrics": sorted(_REALTIME_METRICS)
+            }
+
+        subscription = _realtime_subscription(prop, parsed_dimensions, parsed_metrics)
+        since = None
+        if cursor:
+            token, _, seq = str(cursor).partition(".")
+            if token == subscription.token and seq.isdigit():
+                since = int(seq)
+        # A new subscription has nothing to return until its first poll lands
+        wait = float(wait_seconds or 0) if since else max(float(wait_seconds or 0), GA4_REALTIME_FIRST_WAIT)
+        seq, latest, previous = subscription.read(since, min(wait, GA4_REALTIME_MAX_WAIT))
+        if latest is None:
+            return {"error": f"Error fetching GA4 realtime data: {subscription.last_error or 'no data yet, retry shortly'}"}
+
+        result: Dict[str, Any] = {"cursor": f"{subscription.token}.{seq}"}
+        if previous is None:
+            result["full"] = True
+            result["data"] = [_realtime_row(parsed_dimensions, parsed_metrics, k, v) for k, v in latest.items()]
+        else:
+            result["full"] = False
+            result["changes"] = _realtime_changes(parsed_dimensions, parsed_metrics, previous, latest)
+        result["metadata"] = {
+            "polled_at": datetime.fromtimestamp(subscription.polled_at or time.time(), timezone.utc).isoformat(),
+            "poll_interval_seconds": GA4_REALTIME_INTERVAL,
+            "upstream_polls": subscription.polls,
+            "shared_reads": subscription.reads,
+            "last_error": subscription.last_error
+        }
+        return result
+
+    except Exception as e:
+        return {"error": f"Error fetching GA4 realtime data: {str(e)}"}
+
+
+_COHORT_GRANULARITIES = {"DAILY": "cohortNthDay", "WEEKLY": "cohortNthWeek", "MONTHLY": "cohortNthMonth"}
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _cohort_periods(start: date, count: int, granularity: str) -> List[Tuple[date, date]]:
+    """Consecutive cohort date ranges: single days, Sunday-Saturday weeks or calendar months."""
+    if granularity == "DAILY":
+        return [(start + timedelta(days=i), start + timedelta(days=i)) for i in range(count)]
+    if granularity == "WEEKLY":
+        sunday = start - timedelta(days=(start.weekday() + 1) % 7)
+        return [(sunday + timedelta(weeks=i), sunday + timedelta(weeks=i, days=6)) for i in range(count)]
+    first = start.replace(day=1)
+    return [(_add_months(first, i), _add_months(first, i + 1) - timedelta(days=1)) for i in range(count)]
+
+
+def _cohort_last_day(cohort_spec: Any, today: date) -> Optional[date]:
+    ends = [_resolve_date(c.date_range.end_date, today) for c in cohort_spec.cohorts]
+    if any(end is None for end in ends):
+        return None
+    offset = cohort_spec.cohorts_range.end_offset
+    granularity = CohortsRange.Granularity(cohort_spec.cohorts_range.granularity).name
+    if granularity == "MONTHLY":
+        return _add_months(max(ends), offset + 1) - timedelta(days=1)
+    return max(ends) + timedelta(days=offset * (7 if granularity == "WEEKLY" else 1))
+
+
+def _metric_value(value: str, metric_type: Any) -> Any:
+    try:
+        # Compared as ints: the v1alpha and v1beta MetricType enums are distinct types
+        return int(value) if int(metric_type) == int(MetricType.TYPE_INTEGER) else float(value)
+    except ValueError:
+        return None
+
+
+@mcp.tool()
+def get_cohort_data(
+    cohort_start_date=None,
+    cohort_count=4,
+    granularity="WEEKLY",
+    periods=None,
+    metrics=["cohortActiveUsers", "cohortTotalUsers"],
+    accumulate=False,
+    use_cache=True,
+    property_id=None
+):
+    """Retention-style cohort report in one API call. Users are grouped by first session date into
+    cohort_count consecutive cohorts (days, Sunday-Saturday weeks or calendar months) starting at
+    cohort_start_date, and each metric is returned as a cohorts x periods matrix (null where a period has
+    not happened yet). periods defaults to cohort_count; accumulate=True returns running totals."""
+    try:
+        granularity = str(granularity).upper()
+        if granularity not in _COHORT_GRANULARITIES:
+            return {"error": f"granularity must be one of {list(_COHORT_GRANULARITIES)}."}
+        cohort_count = int(cohort_count)
+        periods = int(periods) if periods else cohort_count
+        if cohort_count < 1 or periods < 1:
+            return {"error": "cohort_count and periods must be at least 1."}
+        parsed_metrics = _parse_name_list(metrics)
+        if not parsed_metrics:
+            return {"error": "Metrics list cannot be empty after parsing."}
+        nth_dimension = _COHORT_GRANULARITIES[granularity]
+        if GA4_VALIDATE_NAMES:
+            error = _validate_names(["cohort", nth_dimension], parsed_metrics)
+            if error:
+                return error
+        prop = _resolve_property(property_id)
+
+        today = date.today()
+        if cohort_start_date:
+            start = _resolve_date(str(cohort_start_date), today)
+            if start is None:
+                return {"error": "cohort_start_date must be YYYY-MM-DD, 'today', 'yesterday' or 'NdaysAgo'."}
+        else:
+            step = {"DAILY": 1, "WEEKLY": 7, "MONTHLY": 31}[granularity]
+            start = today - timedelta(days=step * cohort_count)
+        ranges = _cohort_periods(start, cohort_count, granularity)
+        names = [first.isoformat() for first, _ in ranges]
 
         request = RunReportRequest(
-            property=f"properties/{GA4_PROPERTY_ID}",
-            dimensions=dimension_objects,
-            metrics=metric_objects,
-            date_ranges=[DateRange(start_date=date_range_start, end_date=date_range_end)],
-            dimension_filter=filter_expression if filter_expression else None,
-            limit=str(limit) if limit else None,
-            order_bys=_get_smart_sorting(parsed_dimensions, parsed_metrics),
-            metric_aggregations=[MetricAggregation.TOTAL] if enable_aggregation and _should_aggregate(parsed_dimensions, parsed_metrics) else None
+            property=prop,
+            dimensions=[Dimension(name="cohort"), Dimension(name=nth_dimension)],
+            metrics=[Metric(name=m) for m in parsed_metrics],
+            cohort_spec=CohortSpec(
+                cohorts=[
+                    Cohort(
+                        name=name, dimension="firstSessionDate",
+                        date_range=DateRange(start_date=first.isoformat(), end_date=last.isoformat())
+                    )
+                    for name, (first, last) in zip(names, ranges)
+                ],
+                cohorts_range=CohortsRange(granularity=granularity, start_offset=0, end_offset=periods - 1),
+                cohort_report_settings=CohortReportSettings(accumulate=bool(accumulate))
+            ),
+            return_property_quota=True
         )
-        response = client.run_report(request)
-        result = []
+        response, cache_hit = _run_report(request, use_cache)
+
+        metric_types = [h.type_ for h in response.metric_headers]
+        row_index = {name: i for i, name in enumerate(names)}
+        matrix = {m: [[None] * periods for _ in names] for m in parsed_metrics}
         for row in response.rows:
-            data_row: Dict[str, Any] = {}
-            for i, dimension_header in enumerate(response.dimension_headers):
-                data_row[dimension_header.name] = row.dimension_values[i].value if i < len(row.dimension_values) else None
-            for i, metric_header in enumerate(response.metric_headers):
-                data_row[metric_header.name] = row.metric_values[i].value if i < len(row.metric_values) else None
-            result.append(data_row)
-
-        applied_optimizations = []
-        if limit:
-            applied_optimizations.append(f"Limited to {limit} rows")
-        if enable_aggregation and _should_aggregate(parsed_dimensions, parsed_metrics):
-            applied_optimizations.append("Server-side aggregation applied")
-        if _get_smart_sorting(parsed_dimensions, parsed_metrics):
-            applied_optimizations.append("Intelligent sorting applied")
-
-        if not applied_optimizations:
-            return result
+            cohort, nth = row.dimension_values[0].value, row.dimension_values[1].value
+            if cohort not in row_index or not nth.isdigit() or int(nth) >= periods:
+                continue
+            for m, value, metric_type in zip(parsed_metrics, row.metric_values, metric_types):
+                matrix[m][row_index[cohort]][int(nth)] = _metric_value(value.value, metric_type)
+
+        return {
+            "cohorts": [
+                {"name": name, "start": first.isoformat(), "end": last.isoformat()}
+                for name, (first, last) in zip(names, ranges)
+            ],
+            "periods": list(range(periods)),
+            "granularity": granularity,
+            "metrics": matrix,
+            "metadata": {"api_calls": 0 if cache_hit else 1, "cache_hit": cache_hit, "accumulate": bool(accumulate)}
+        }
+
+    except Exception as e:
+        return {"error": f"Error fetching GA4 cohort data: {str(e)}"}
+
+
+def _funnel_step(index: int, step: Any) -> Any:
+    if isinstance(step, str):
+        step = {"event": step}
+    if not isinstance(step, dict) or not step.get("event"):
+        raise ValueError(f"Funnel step {index + 1} needs an event name.")
+    funnel_step = FunnelStep(
+        name=step.get("name") or step["event"],
+        is_directly_followed_by=bool(step.get("directly_followed_by", False)),
+        filter_expression=FunnelFilterExpression(funnel_event_filter=FunnelEventFilter(event_name=step["event"]))
+    )
+    if index and step.get("within_seconds"):
+        funnel_step.within_duration_from_prior_step = timedelta(seconds=float(step["within_seconds"]))
+    return funnel_step
+
+
+@mcp.tool()
+def get_funnel_data(
+    steps,
+    date_range_start="28daysAgo",
+    date_range_end="yesterday",
+    open_funnel=False,
+    breakdown_dimension=None,
+    use_cache=True,
+    property_id=None
+):
+    """Funnel report in one call through the Data API v1alpha runFunnelReport. steps is a list of event
+    names, or of {"event", "name", "directly_followed_by", "within_seconds"} objects. Returns per-step
+    activeUsers, completionRate, abandonments and abandonmentRate as compact arrays, split by
+    breakdown_dimension values when one is given."""
+    try:
+        if isinstance(steps, str):
+            try:
+                steps = json.loads(steps)
+            except ValueError:
+                steps = [s.strip() for s in steps.split(",") if s.strip()]
+        if not isinstance(steps, list) or len(steps) < 2:
+            return {"error": "A funnel needs at least two steps."}
+        if breakdown_dimension and GA4_VALIDATE_NAMES:
+            error = _validate_names([breakdown_dimension], [])
+            if error:
+                return error
+        prop = _resolve_property(property_id)
+
+        request = RunFunnelReportRequest(
+            property=prop,
+            date_ranges=[FunnelDateRange(start_date=date_range_start, end_date=date_range_end)],
+            funnel=Funnel(is_open_funnel=bool(open_funnel), steps=[_funnel_step(i, s) for i, s in enumerate(steps)]),
+            return_property_quota=True
+        )
+        if breakdown_dimension:
+            request.funnel_breakdown = FunnelBreakdown(breakdown_dimension=FunnelDimension(name=breakdown_dimension))
+
+        context = _property_context(prop)
+        key = _cache_key(request)
+        payload = context.cache.get(key) if use_cache else None
+        cache_hit = payload is not None
+        if cache_hit:
+            response = RunFunnelReportResponse.deserialize(payload)
+        else:
+            response = _call_api("run_funnel_report", request, clients=_funnel_clients)
+            context.cache.set(key, RunFunnelReportResponse.serialize(response), _cache_ttl(request))
+
+        table = response.funnel_table
+        dimension_names = [h.name for h in table.dimension_headers]
+        metric_names = [h.name for h in table.metric_headers]
+        metric_types = [h.type_ for h in table.metric_headers]
+        step_names = [_funnel_step(i, s).name for i, s in enumerate(steps)]
+
+        # Rows are keyed by "N. step name" and, with a breakdown, the breakdown value
+        series: Dict[str, Dict[str, List[Any]]] = {}
+        for row in table.rows:
+            values = [v.value for v in row.dimension_values]
+            step_label = values[0]
+            number, _, _ = step_label.partition(". ")
+            if not number.isdigit() or not 0 < int(number) <= len(step_names):
+                continue
+            group = values[1] if len(values) > 1 else "total"
+            metrics_by_name = series.setdefault(group, {m: [None] * len(step_names) for m in metric_names})
+            for m, value, metric_type in zip(metric_names, row.metric_values, metric_types):
+                metrics_by_name[m][int(number) - 1] = _metric_value(value.value, metric_type)
+
+        return {
+            "steps": step_names,
+            "breakdown_dimension": breakdown_dimension if len(dimension_names) > 1 else None,
+            "metrics": series if breakdown_dimension else series.get("total", {}),
+            "metadata": {"api_calls": 0 if cache_hit else 1, "cache_hit": cache_hit, "open_funnel": bool(open_funnel)}
+        }
+
+    except Exception as e:
+        return {"error": f"Error fetching GA4 funnel data: {str(e)}"}
+
+
+# Metrics that cannot be summed across collapsed dimensions: ratios, averages and distinct-user counts
+_NON_ADDITIVE_PATTERN = re.compile(r"Rate$|Per[A-Z]|^average|Average|Stickiness|Position$|^returnOnAdSpend$")
+_DISTINCT_USER_METRICS = {
+    "totalUsers", "activeUsers", "newUsers", "active1DayUsers", "active7DayUsers", "active28DayUsers",
+    "purchasers", "totalPurchasers", "firstTimePurchasers", "scrolledUsers", "crashAffectedUsers",
+    "cohortActiveUsers", "cohortTotalUsers"
+}
+_NON_ADDITIVE_METRICS = frozenset(
+    name for name in _METRIC_INDEX if _NON_ADDITIVE_PATTERN.search(name) or name in _DISTINCT_USER_METRICS
+)
+
+
+def _ga4_week(dates: Any) -> Any:
+    """GA4's week of the year: weeks start on Sunday and January 1 is always week 01."""
+    day_of_year = dates.dt.dayofyear - 1
+    sunday_based = (dates.dt.dayofweek + 1) % 7
+    jan1 = (sunday_based - day_of_year) % 7
+    return ((day_of_year + jan1) // 7 + 1).map("{:02d}".format)
+
+
+# Time dimensions that can be derived from the date dimension (strftime formats, or a function of the
+# dates where strftime has no match: %U puts days before the first Sunday in week 00, GA4 in week 01)
+_DATE_DERIVED_DIMENSIONS = {"year": "%Y", "month": "%m", "week": _ga4_week, "day": "%d", "dayOfWeek": "%w"}
+
+
+def _filter_fields(expr: Dict[str, Any]) -> set:
+    if "andGroup" in expr or "orGroup" in expr:
+        group = expr.get("andGroup") or expr.get("orGroup")
+        return set().union(*(_filter_fields(e) for e in group["expressions"]))
+    if "notExpression" in expr:
+        return _filter_fields(expr["notExpression"])
+    return {expr.get("filter", {}).get("fieldName")}
+
+
+def _filter_mask(df: Any, expr: Dict[str, Any]) -> Any:
+    import numpy as np
+    import pandas as pd
+
+    if "andGroup" in expr:
+        return np.logical_and.reduce([_filter_mask(df, e) for e in expr["andGroup"]["expressions"]])
+    if "orGroup" in expr:
+        return np.logical_or.reduce([_filter_mask(df, e) for e in expr["orGroup"]["expressions"]])
+    if "notExpression" in expr:
+        return ~_filter_mask(df, expr["notExpression"])
+
+    f = expr["filter"]
+    if "numericFilter" in f or "betweenFilter" in f:
+        numbers = pd.to_numeric(df[f["fieldName"]], errors="coerce")
+        if "betweenFilter" in f:
+            bounds = f["betweenFilter"]
+            low, high = (next(iter(bounds[k].values())) for k in ("fromValue", "toValue"))
+            return numbers.between(low, high).to_numpy()
+        nf = f["numericFilter"]
+        value = next(iter(nf["value"].values()))
+        compare = {
+            "EQUAL": numbers.eq, "LESS_THAN": numbers.lt, "LESS_THAN_OR_EQUAL": numbers.le,
+            "GREATER_THAN": numbers.gt, "GREATER_THAN_OR_EQUAL": numbers.ge
+        }[nf["operation"]]
+        return compare(value).to_numpy()
+
+    column = df[f["fieldName"]].astype(str)
+    if "inListFilter" in f:
+        ilf = f["inListFilter"]
+        values = ilf.get("values", [])
+        if ilf.get("caseSensitive", False):
+            return column.isin(values).to_numpy()
+        return column.str.lower().isin([v.lower() for v in values]).to_numpy()
+
+    sf = f["stringFilter"]
+    value = sf.get("value", "")
+    case = sf.get("caseSensitive", False)
+    match_type = sf.get("matchType", "EXACT")
+    if match_type in ("FULL_REGEXP", "PARTIAL_REGEXP"):
+        flags = 0 if case else re.IGNORECASE
+        matcher = column.str.fullmatch if match_type == "FULL_REGEXP" else column.str.contains
+        return matcher(value, flags=flags, regex=True).to_numpy()
+    if not case:
+        column = column.str.lower()
+        value = value.lower()
+    if match_type == "BEGINS_WITH":
+        return column.str.startswith(value).to_numpy()
+    if match_type == "ENDS_WITH":
+        return column.str.endswith(value).to_numpy()
+    if match_type == "CONTAINS":
+        return column.str.contains(value, regex=False).to_numpy()
+    return (column == value).to_numpy()
+
+
+def _find_local_source(
+    context: _PropertyContext,
+    target: Dict[str, Any],
+    filter_dict: Optional[Dict[str, Any]]
+) -> Optional[Tuple[Dict[str, Any], Any, Optional[Dict[str, Any]]]]:
+    for key, shape in context.results.newest_first():
+        if not set(target["metrics"]) <= set(shape["metrics"]):
+            continue
+        derived = [d for d in target["dimensions"] if d not in shape["dimensions"]]
+        has_date = "date" in shape["dimensions"]
+        if any(d not in _DATE_DERIVED_DIMENSIONS for d in derived) or (derived and not has_date):
+            continue
+        if (shape["start"], shape["end"]) != (target["start"], target["end"]):
+            if not has_date or not (shape["start"] <= target["start"] and target["end"] <= shape["end"]):
+                continue
+        collapsed = set(shape["dimensions"]) - set(target["dimensions"])
+        if collapsed and _NON_ADDITIVE_METRICS.intersection(target["metrics"]):
+            continue
+
+        if shape["filter"] == target["filter"]:
+            local_filter = None
+        elif shape["filter"] is None and filter_dict is not None and _filter_fields(filter_dict) <= set(shape["dimensions"]):
+            local_filter = filter_dict
+        else:
+            continue
+
+        payload = context.cache.get(key)
+        if payload is None:
+            context.results.discard(key)
+            continue
+        return shape, RunReportResponse.deserialize(payload), local_filter
+    return None
+
 
+@mcp.tool()
+def query_cached_data(
+    dimensions=["date"],
+    metrics=["totalUsers"],
+    date_range_start="7daysAgo",
+    date_range_end="yesterday",
+    dimension_filter=None,
+    order_by=None,
+    descending=True,
+    top_n=None,
+    format="rows",
+    property_id=None
+):
+    """Answer a report from already-fetched get_ga4_data results without calling the API: roll up to fewer
+    dimensions (including week/month/year/day/dayOfWeek derived from date), narrow the date range, apply a
+    dimension_filter and take the top N. Non-additive metrics (rates, averages, user counts) are never summed."""
+    try:
+        import pandas as pd
+    except ImportError:
+        return {"error": "pandas is required for local queries (pip install 'google-analytics-mcp[analysis]')"}
+
+    try:
+        if format not in _OUTPUT_FORMATS:
+            return {"error": f"format must be one of {list(_OUTPUT_FORMATS)}."}
+        request, error = _build_report_request(
+            dimensions, metrics, date_range_start, date_range_end, dimension_filter, None, False, property_id
+        )
+        if error:
+            return error
+        target = _result_shape(request)
+        if target is None:
+            return {"error": "Local queries need a single date range with resolvable dates."}
+        filter_dict = _filter_compiler.compile(dimension_filter)[0] if dimension_filter else None
+
+        context = _property_context(request.property)
+        found = _find_local_source(context, target, filter_dict)
+        if found is None:
+            return {
+                "error": "No cached report can answer this query locally.",
+                "hint": "Fetch a finer-grained report with get_ga4_data first (same metrics, a superset of the "
+                        "dimensions, covering the date range), then query it here."
+            }
+        shape, response, local_filter = found
+
+        df = pd.DataFrame(_columnar_report(response)["columns"])
+        if "date" in df.columns:
+            dates = pd.to_datetime(df["date"], format="%Y%m%d")
+            keep = (dates.dt.date >= target["start"]) & (dates.dt.date <= target["end"])
+            df, dates = df[keep.to_numpy()], dates[keep.to_numpy()]
+            for dim in target["dimensions"]:
+                if dim not in df.columns:
+                    derive = _DATE_DERIVED_DIMENSIONS[dim]
+                    df[dim] = derive(dates) if callable(derive) else dates.dt.strftime(derive)
+        if local_filter is not None and len(df):
+            df = df[_filter_mask(df, local_filter)]
+
+        if set(shape["dimensions"]) - set(target["dimensions"]):
+            df = df.groupby(target["dimensions"], as_index=False, sort=False)[target["metrics"]].sum()
+        df = df[target["dimensions"] + target["metrics"]]
+
+        if order_by:
+            if order_by not in df.columns:
+                return {"error": f"order_by must be one of the requested dimensions or metrics: {list(df.columns)}"}
+            df = df.sort_values(order_by, ascending=not descending, kind="stable")
+        else:
+            sort_columns = (["date"] if "date" in target["dimensions"] else []) + [target["metrics"][0]]
+            df = df.sort_values(sort_columns, ascending=False, kind="stable")
+        total_rows = len(df)
+        df = df.head(int(top_n) if top_n else GA4_LOCAL_MAX_ROWS)
+
+        if format == "columnar":
+            data: Any = {
+                "dimension_headers": target["dimensions"],
+                "metric_headers": target["metrics"],
+                "columns": {column: df[column].tolist() for column in df.columns}
+            }
+        else:
+            data = df.to_dict(orient="records")
         return {
-            "data": result,
+            "data": data,
             "metadata": {
-                "total_rows": response.row_count,
-                "returned_rows": len(result),
-                "applied_optimizations": applied_optimizations
+                "total_rows": total_rows,
+                "returned_rows": len(df),
+                "source": {
+                    "dimensions": shape["dimensions"],
+                    "metrics": shape["metrics"],
+                    "date_range": [shape["start"].isoformat(), shape["end"].isoformat()]
+                },
+                "applied_optimizations": ["Answered locally from cached results, no API call"]
             }
         }
 
     except Exception as e:
-        return {"error": f"Error fetching GA4 data: {str(e)}"}
+        return {"error": f"Error querying cached GA4 data: {str(e)}"}
+
+
+def _prewarm() -> None:
+    try:
+        with _tracer.span("prewarm"):
+            _load_sdk()
+            if GA4_PROPERTY_ID:
+                _property_context(_resolve_property(None)).clients.prewarm()
+    except Exception:
+        # Prewarming is best effort; the first real call reports any import or credential problem
+        pass
 
 
 def main() -> None:
+    if GA4_PREWARM:
+        threading.Thread(target=_prewarm, name="ga4-prewarm", daemon=True).start()
     mcp.run(transport="stdio")
 
 
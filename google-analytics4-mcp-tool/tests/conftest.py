@@ -0,0 +1,73 @@
+"""Shared fixtures: import the server against an in-process fake Data API."""
+
+import os
+import sys
+from datetime import date, timedelta
+from typing import Any, Callable, List, Tuple
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(HERE, "..", "benchmarks"), os.path.join(HERE, "..", "src")]
+
+os.environ.setdefault("GA4_PROPERTY_ID", "123456789")
+os.environ.setdefault("GA4_QUOTA_TOKENS_PER_HOUR", "1000000000")
+os.environ.pop("GA4_CACHE_PATH", None)
+
+import index  # noqa: E402
+from fake_data_api import FakeDataClient, install  # noqa: E402
+from google.analytics.data_v1beta.types import MetricType, RunReportResponse  # noqa: E402
+
+
+def tool(fn: Any) -> Callable[..., Any]:
+    # FastMCP versions differ on whether @mcp.tool() returns the function or a wrapper around it
+    return getattr(fn, "fn", fn)
+
+
+class DailyDataClient(FakeDataClient):
+    """Serves `rows_per_day` rows for every day of the requested range, one metric value of 1 each.
+
+    Non-date dimensions cycle through `rows_per_day` values, so each (date, dimension) pair is unique.
+    `bad_dates` replaces the date of the first rows with a value that is not YYYYMMDD.
+    """
+
+    def __init__(self, rows_per_day: int, bad_dates: int = 0):
+        super().__init__(0)
+        self.rows_per_day = rows_per_day
+        self.bad_dates = bad_dates
+        self.requests: List[Tuple[str, str, int, int]] = []
+
+    def _respond(self, request: Any) -> Any:
+        date_range = request.date_ranges[0]
+        self.requests.append((date_range.start_date, date_range.end_date, int(request.limit), int(request.offset)))
+        start, end = date.fromisoformat(date_range.start_date), date.fromisoformat(date_range.end_date)
+        total = ((end - start).days + 1) * self.rows_per_day
+        pb = RunReportResponse.pb()()
+        for d in request.dimensions:
+            pb.dimension_headers.add(name=d.name)
+        for m in request.metrics:
+            pb.metric_headers.add(name=m.name, type_=MetricType.TYPE_INTEGER)
+        pb.row_count = total
+        limit = int(request.limit) or 10000
+        for i in range(int(request.offset), min(total, int(request.offset) + limit)):
+            row = pb.rows.add()
+            day = start + timedelta(days=i // self.rows_per_day)
+            for d in request.dimensions:
+                if d.name == "date":
+                    value = "(other)" if i < self.bad_dates else day.strftime("%Y%m%d")
+                else:
+                    value = f"{d.name}-{i % self.rows_per_day}"
+                row.dimension_values.add(value=value)
+            for _ in request.metrics:
+                row.metric_values.add(value="1")
+        return RunReportResponse.deserialize(pb.SerializeToString())
+
+
+@pytest.fixture
+def daily_client() -> Callable[..., DailyDataClient]:
+    """Install a fresh DailyDataClient (and fresh per-property caches) for the test."""
+    def make(rows_per_day: int, bad_dates: int = 0) -> DailyDataClient:
+        client = DailyDataClient(rows_per_day, bad_dates)
+        install(index, client)
+        return client
+    return make
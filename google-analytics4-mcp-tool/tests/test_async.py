@@ -0,0 +1,73 @@
+"""get_ga4_data_async: the same size check and caching as get_ga4_data, over the async client."""
+
+import asyncio
+
+import pytest
+
+import index
+from conftest import tool
+from fake_data_api import FakeDataClient
+
+get_ga4_data_async = tool(index.get_ga4_data_async)
+
+
+class _AsyncFake:
+    """Awaitable wrapper around a FakeDataClient, standing in for BetaAnalyticsDataAsyncClient."""
+
+    def __init__(self, client, latency):
+        self.client = client
+        self.latency = latency
+
+    async def run_report(self, request):
+        await asyncio.sleep(self.latency)
+        return self.client.run_report(request)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def make(total_rows, latency=0.0):
+        fake = FakeDataClient(total_rows)
+        wrapper = _AsyncFake(fake, latency)
+        monkeypatch.setattr(index, "_async_client_manager", index._AsyncGA4ClientManager(1))
+        monkeypatch.setattr(index._AsyncGA4ClientManager, "_get_client", lambda self: wrapper)
+        with index._property_contexts_lock:
+            index._property_contexts.clear()
+        return fake
+    return make
+
+
+def _fetch(**kwargs):
+    return get_ga4_data_async(dimensions=["country"], metrics=["sessions"],
+                              date_range_start="2024-01-01", date_range_end="2024-01-31", **kwargs)
+
+
+def test_returns_data_in_one_call(client):
+    fake = client(100)
+    result = asyncio.run(_fetch())
+    assert fake.calls == 1 and len(result["data"]) == 100
+
+
+def test_repeated_calls_are_served_from_cache(client):
+    fake = client(100)
+    for _ in range(3):
+        result = asyncio.run(_fetch())
+    assert fake.calls == 1
+    assert len(result["data"]) == 100
+
+
+def test_large_report_warns_without_a_second_call(client):
+    fake = client(index.GA4_LARGE_DATASET_ROWS + 1)
+    result = asyncio.run(_fetch())
+    assert result["warning"] and result["estimated_rows"] == index.GA4_LARGE_DATASET_ROWS + 1
+    assert fake.calls == 1
+
+
+def test_concurrent_calls_are_limited_per_property(client):
+    fake = client(10, latency=0.02)
+
+    async def run():
+        return await asyncio.gather(*(_fetch(limit=10 + i) for i in range(4)))
+
+    results = asyncio.run(run())
+    assert fake.calls == 4 and all(len(r["data"]) == 10 for r in results)
+    assert index._async_client_manager.stats()["throttled"] > 0
@@ -0,0 +1,63 @@
+"""get_ga4_data_batch: chunking into BatchRunReports calls and the per-spec row limit."""
+
+import pytest
+
+import index
+from conftest import tool
+from fake_data_api import FakeDataClient, install
+
+get_ga4_data_batch = tool(index.get_ga4_data_batch)
+
+
+@pytest.fixture
+def client():
+    def make(total_rows):
+        client = FakeDataClient(total_rows)
+        install(index, client)
+        return client
+    return make
+
+
+def _spec(day, **kwargs):
+    # A distinct date range per spec keeps them from sharing a cache entry
+    return {
+        "dimensions": ["country"], "metrics": ["sessions"], "date_range_start": "2024-01-01",
+        "date_range_end": f"2024-01-{day + 1:02d}", **kwargs
+    }
+
+
+def test_specs_are_split_into_batches_of_five(client):
+    fake = client(10)
+    result = get_ga4_data_batch([_spec(i) for i in range(7)])
+    assert fake.calls == 2 and result["api_calls"] == 2
+    assert [len(r["data"]) for r in result["reports"]] == [10] * 7
+
+
+def test_batches_are_split_per_property(client):
+    fake = client(10)
+    result = get_ga4_data_batch([_spec(1), _spec(2, property_id="987654321"), _spec(3)])
+    assert fake.calls == 2 and result["api_calls"] == 2
+    assert all("error" not in r for r in result["reports"])
+
+
+def test_spec_without_limit_is_capped_at_the_large_dataset_threshold(client):
+    client(index.GA4_LARGE_DATASET_ROWS * 2)
+    unlimited, limited = get_ga4_data_batch([_spec(1), _spec(2, limit=10)])["reports"]
+    assert len(unlimited["data"]) == index.GA4_LARGE_DATASET_ROWS
+    assert unlimited["metadata"]["truncated"] is True
+    assert len(limited["data"]) == 10
+    assert "truncated" not in limited["metadata"]
+
+
+def test_cached_specs_are_not_refetched(client):
+    fake = client(10)
+    specs = [_spec(1), _spec(2)]
+    get_ga4_data_batch(specs)
+    result = get_ga4_data_batch(specs + [_spec(3)])
+    assert fake.calls == 2 and result["api_calls"] == 1
+
+
+def test_invalid_spec_does_not_fail_the_batch(client):
+    client(10)
+    good, bad = get_ga4_data_batch([_spec(1), "not a spec"])["reports"]
+    assert "data" in good and "error" in bad
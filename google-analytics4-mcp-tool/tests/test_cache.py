@@ -0,0 +1,55 @@
+"""Report cache freshness and keys."""
+
+from datetime import date, timedelta
+
+import pytest
+from google.analytics.data_v1beta.types import DateRange, RunReportRequest
+
+import index
+
+
+def _request(*ranges):
+    return RunReportRequest(
+        property="properties/1",
+        date_ranges=[DateRange(start_date=start, end_date=end) for start, end in ranges]
+    )
+
+
+def _days_ago(days):
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+@pytest.mark.parametrize("end, ttl", [
+    ("today", "GA4_CACHE_TTL_TODAY"),
+    ("yesterday", "GA4_CACHE_TTL_RECENT"),
+    ("3daysAgo", "GA4_CACHE_TTL_RECENT"),
+    ("4daysAgo", "GA4_CACHE_TTL_HISTORICAL"),
+    ("2020-01-31", "GA4_CACHE_TTL_HISTORICAL"),
+    ("not-a-date", "GA4_CACHE_TTL_TODAY"),
+])
+def test_ttl_follows_how_settled_the_range_end_is(monkeypatch, end, ttl):
+    monkeypatch.setattr(index, "GA4_SETTLING_DAYS", 3)
+    assert index._cache_ttl(_request(("2020-01-01", end))) == getattr(index, ttl)
+
+
+def test_ttl_uses_the_latest_of_several_ranges():
+    assert index._cache_ttl(_request(("2020-01-01", "2020-01-31"), ("7daysAgo", "today"))) == index.GA4_CACHE_TTL_TODAY
+    assert index._cache_ttl(_request(("2020-01-01", _days_ago(30)))) == index.GA4_CACHE_TTL_HISTORICAL
+
+
+def test_ttl_without_date_ranges_is_the_shortest():
+    assert index._cache_ttl(_request()) == index.GA4_CACHE_TTL_TODAY
+
+
+def test_relative_ranges_are_keyed_by_day(monkeypatch):
+    relative, absolute = _request(("7daysAgo", "yesterday")), _request(("2020-01-01", "2020-01-31"))
+    keys = index._cache_key(relative), index._cache_key(absolute)
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr(index, "date", Tomorrow)
+    assert index._cache_key(relative) != keys[0]
+    assert index._cache_key(absolute) == keys[1]
@@ -0,0 +1,24 @@
+"""Catalog search."""
+
+import pytest
+
+import index
+from conftest import tool
+
+search_catalog = tool(index.search_catalog)
+
+
+def test_name_matches_rank_first():
+    results = search_catalog("purchase revenue")["results"]
+    assert results[0]["name"] == "purchaseRevenue"
+    assert all(r["score"] >= s["score"] for r, s in zip(results, results[1:]))
+
+
+def test_limit_and_kind_narrow_the_results():
+    results = search_catalog("user", kind="dimension", limit=3)["results"]
+    assert len(results) == 3 and {r["kind"] for r in results} == {"dimension"}
+
+
+@pytest.mark.parametrize("limit", [0, -1, 2.5, "3", True])
+def test_limit_must_be_a_positive_integer(limit):
+    assert "error" in search_catalog("revenue", limit=limit)
@@ -0,0 +1,78 @@
+"""Pooled Data API clients shared across tool calls."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from google.api_core import exceptions as gapi_exceptions
+
+import index
+from conftest import tool
+from fake_data_api import FakeChannel, FakeDataClient, install
+
+get_ga4_data = tool(index.get_ga4_data)
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Install a fake client and record every pooled client the server opens."""
+    client = FakeDataClient(10, latency=0.05)
+    install(index, client)
+    opened = []
+
+    def connect(manager):
+        pooled = index._PooledClient(client, FakeChannel())
+        opened.append(pooled)
+        return pooled
+
+    monkeypatch.setattr(index._GA4ClientManager, "_connect", connect)
+    return opened
+
+
+def _stats():
+    return index._property_context(index._resolve_property(None)).clients.stats()
+
+
+def test_sequential_calls_reuse_one_client(connections):
+    for start in ("2024-01-01", "2024-02-01", "2024-03-01"):
+        get_ga4_data(dimensions=["date"], metrics=["sessions"], date_range_start=start, date_range_end=start)
+    assert len(connections) == 1
+    assert _stats()["pool_misses"] == 1 and _stats()["pool_hits"] == 2
+
+
+def test_concurrent_calls_never_open_more_than_the_pool_size(connections):
+    manager = index._GA4ClientManager(2)
+    request, _ = index._build_report_request(["date"], ["sessions"], "7daysAgo", "yesterday", None, None, False, None)
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(lambda _: manager.call("run_report", request), range(6)))
+    stats = manager.stats()
+    assert len(connections) == 2 and stats["open_clients"] == 2 and stats["idle_clients"] == 2
+    assert stats["pool_waits"] > 0
+
+
+def test_unhealthy_client_is_replaced_on_checkout(connections):
+    manager = index._GA4ClientManager(1)
+    manager.prewarm()
+    connections[0]._on_state_change(index.grpc.ChannelConnectivity.TRANSIENT_FAILURE)
+    request, _ = index._build_report_request(["date"], ["sessions"], "7daysAgo", "yesterday", None, None, False, None)
+    manager.call("run_report", request)
+    assert len(connections) == 2
+    assert manager.stats()["health_check_failures"] == 1 and manager.stats()["open_clients"] == 1
+
+
+def test_unavailable_client_is_reconnected_once(connections, monkeypatch):
+    manager = index._GA4ClientManager(1)
+    failures = [gapi_exceptions.ServiceUnavailable("connection reset")]
+    lock = threading.Lock()
+    run_report = FakeDataClient.run_report
+
+    def flaky(self, request=None, **kwargs):
+        with lock:
+            if failures:
+                raise failures.pop()
+        return run_report(self, request, **kwargs)
+
+    monkeypatch.setattr(FakeDataClient, "run_report", flaky)
+    request, _ = index._build_report_request(["date"], ["sessions"], "7daysAgo", "yesterday", None, None, False, None)
+    assert len(manager.call("run_report", request).rows) == 10
+    assert len(connections) == 2 and manager.stats()["reconnects"] == 1
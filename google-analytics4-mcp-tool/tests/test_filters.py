@@ -0,0 +1,67 @@
+"""Dimension filter normalization and the memoizing compiler."""
+
+import json
+
+import index
+
+
+def _leaf(field, value, **string_filter):
+    return {"filter": {"fieldName": field, "stringFilter": {"value": value, **string_filter}}}
+
+
+def test_leaf_defaults_are_filled_in():
+    assert index._normalize_filter(_leaf("country", "India")) == {"filter": {"fieldName": "country", "stringFilter": {
+        "matchType": "EXACT", "value": "India", "caseSensitive": False
+    }}}
+    assert index._normalize_filter(
+        {"filter": {"fieldName": "country", "inListFilter": {"values": ["b", "a", "b"]}}}
+    ) == {"filter": {"fieldName": "country", "inListFilter": {"values": ["a", "b"], "caseSensitive": False}}}
+    assert index._normalize_filter(
+        {"filter": {"fieldName": "country", "numericFilter": {"operation": "GREATER_THAN", "value": "5"}}}
+    )["filter"]["numericFilter"]["value"] == {"int64Value": 5}
+
+
+def test_equivalent_trees_normalize_identically():
+    a, b, c = _leaf("country", "India"), _leaf("city", "Pune"), _leaf("deviceCategory", "mobile")
+    nested = {"andGroup": {"expressions": [a, {"andGroup": {"expressions": [b, c]}}]}}
+    flat = {"andGroup": {"expressions": [c, b, a, b]}}
+    assert index._normalize_filter(nested) == index._normalize_filter(flat)
+    assert index._normalize_filter({"orGroup": {"expressions": [a]}}) == index._normalize_filter(a)
+    assert index._normalize_filter({"notExpression": {"notExpression": a}}) == index._normalize_filter(a)
+
+
+def test_invalid_filters_normalize_to_none():
+    assert index._normalize_filter(_leaf("notADimension", "x")) is None
+    assert index._normalize_filter({"andGroup": {"expressions": []}}) is None
+    assert index._normalize_filter({"andGroup": {"expressions": [_leaf("country", "x"), "bad"]}}) is None
+    assert index._normalize_filter(
+        {"filter": {"fieldName": "country", "numericFilter": {"operation": "ABOUT", "value": 1}}}
+    ) is None
+    assert index._normalize_filter([]) is None
+
+
+def test_compiler_memoizes_equivalent_filters():
+    compiler = index._FilterCompiler(8)
+    a, b = _leaf("country", "India"), _leaf("city", "Pune")
+    normalized, expression = compiler.compile({"andGroup": {"expressions": [a, b]}})
+    assert expression.and_group.expressions[0].filter.field_name == "city"
+    assert compiler.compile({"andGroup": {"expressions": [b, a]}}) == (normalized, expression)
+    assert compiler.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_compiler_skips_parsing_for_repeated_json_strings():
+    compiler = index._FilterCompiler(8)
+    raw = json.dumps(_leaf("country", "India"))
+    first = compiler.compile(raw)
+    assert compiler.compile(raw) is first
+    assert compiler.compile("{}") == (None, None)
+    assert compiler.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_compiler_evicts_least_recently_used():
+    compiler = index._FilterCompiler(2)
+    for value in ("a", "b", "c"):
+        compiler.compile(_leaf("country", value))
+    assert compiler.stats()["entries"] == 2
+    compiler.compile(_leaf("country", "a"))
+    assert compiler.stats()["misses"] == 4
@@ -0,0 +1,67 @@
+"""get_ga4_data: the size check, caching and argument handling."""
+
+import pytest
+
+import index
+from conftest import tool
+from fake_data_api import FakeDataClient, install
+
+get_ga4_data = tool(index.get_ga4_data)
+
+
+@pytest.fixture
+def client():
+    def make(total_rows):
+        client = FakeDataClient(total_rows)
+        install(index, client)
+        return client
+    return make
+
+
+def _fetch(**kwargs):
+    return get_ga4_data(dimensions=["country"], metrics=["sessions"],
+                        date_range_start="2024-01-01", date_range_end="2024-01-31", **kwargs)
+
+
+def test_size_check_reads_row_count_from_the_first_page(client):
+    fake = client(100)
+    result = _fetch()
+    assert fake.calls == 1 and len(result["data"]) == 100
+
+
+def test_repeated_calls_are_served_from_cache(client):
+    fake = client(100)
+    for _ in range(3):
+        result = _fetch()
+    assert fake.calls == 1
+    assert len(result["data"]) == 100
+
+
+def test_large_report_warns_without_a_second_call(client):
+    fake = client(index.GA4_LARGE_DATASET_ROWS + 1)
+    result = _fetch()
+    assert result["warning"] and result["estimated_rows"] == index.GA4_LARGE_DATASET_ROWS + 1
+    assert _fetch()["warning"] and fake.calls == 1
+    assert len(_fetch(proceed_with_large_dataset=True)["data"]) == index.GA4_LARGE_DATASET_ROWS + 1
+    assert fake.calls == 2
+
+
+def test_known_estimate_skips_the_estimate_call(client):
+    fake = client(100)
+    assert _fetch(estimate_only=True) == {"estimated_rows": 100}
+    _fetch()
+    assert fake.calls == 2
+    assert index._property_context(index._resolve_property(None)).estimates.stats()["estimation_calls_saved"] >= 1
+
+
+def test_small_limit_needs_no_size_check(client):
+    fake = client(index.GA4_LARGE_DATASET_ROWS * 4)
+    result = _fetch(limit="10")
+    assert len(result["data"]) == 10 and fake.calls == 1
+
+
+@pytest.mark.parametrize("limit", ["ten", -5, [10]])
+def test_invalid_limit_is_rejected(client, limit):
+    fake = client(100)
+    assert _fetch(limit=limit) == {"error": "limit must be a positive integer."}
+    assert fake.calls == 0
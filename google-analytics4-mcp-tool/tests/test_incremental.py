@@ -0,0 +1,55 @@
+"""Incremental time series: per-day splitting, the day store and the guards around them."""
+
+import index
+from conftest import tool
+
+get_ga4_data = tool(index.get_ga4_data)
+
+
+def _fetch(start, end, **kwargs):
+    return get_ga4_data(dimensions=["date", "country"], metrics=["sessions"],
+                        date_range_start=start, date_range_end=end, incremental=True, **kwargs)
+
+
+def test_parse_ga4_date_rejects_non_day_values():
+    assert index._parse_ga4_date("20240229").isoformat() == "2024-02-29"
+    assert index._parse_ga4_date("(other)") is None
+    assert index._parse_ga4_date("20230229") is None
+    assert index._parse_ga4_date("2024-01-01") is None
+
+
+def test_overlapping_range_only_fetches_missing_days(daily_client):
+    client = daily_client(2)
+    first = _fetch("2024-01-01", "2024-01-10")
+    assert first["metadata"]["incremental"] == {"days": 10, "days_from_store": 0, "api_calls": 1}
+
+    second = _fetch("2024-01-05", "2024-01-15")
+    assert second["metadata"]["incremental"] == {"days": 11, "days_from_store": 6, "api_calls": 1}
+    assert client.requests[-1][:2] == ("2024-01-11", "2024-01-15")
+    assert second["metadata"]["returned_rows"] == 22
+    dates = [row["date"] for row in second["data"]]
+    assert dates == sorted(dates, reverse=True) and set(dates) == {f"202401{d:02d}" for d in range(5, 16)}
+
+
+def test_incremental_is_opt_in_and_skipped_with_limit(daily_client):
+    client = daily_client(2)
+    get_ga4_data(dimensions=["date", "country"], metrics=["sessions"],
+                 date_range_start="2024-01-01", date_range_end="2024-01-10")
+    _fetch("2024-01-01", "2024-01-10", limit=5)
+    assert all(limit != index._MAX_PAGE_SIZE for _, _, limit, _ in client.requests)
+    assert index._property_context(index._resolve_property(None)).days.stats()["days_fetched"] == 0
+
+
+def test_large_range_is_estimated_before_fetching_days(daily_client):
+    client = daily_client(index.GA4_LARGE_DATASET_ROWS)
+    result = _fetch("2024-01-01", "2024-01-31")
+    assert "warning" in result
+    assert [limit for _, _, limit, _ in client.requests] == [1]
+
+
+def test_unsplittable_dates_fall_back_to_a_plain_request(daily_client):
+    client = daily_client(2, bad_dates=1)
+    result = _fetch("2024-01-01", "2024-01-10")
+    assert "error" not in result and "incremental" not in result["metadata"]
+    assert client.requests[-1][2] != index._MAX_PAGE_SIZE
+    assert index._property_context(index._resolve_property(None)).days.stats()["unsplittable_reports"] == 1
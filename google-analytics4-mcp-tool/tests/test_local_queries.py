@@ -0,0 +1,79 @@
+"""query_cached_data: rolling cached reports up locally without calling the API."""
+
+import pandas as pd
+import pytest
+
+import index
+from conftest import tool
+
+get_ga4_data = tool(index.get_ga4_data)
+query_cached_data = tool(index.query_cached_data)
+
+
+def _target(dimensions, metrics, start, end, dimension_filter=None):
+    request, error = index._build_report_request(dimensions, metrics, start, end, dimension_filter, None, False, None)
+    assert error is None
+    return index._result_shape(request)
+
+
+@pytest.mark.parametrize("day, week", [
+    ("2024-01-01", "01"),  # Monday: %U would say 00
+    ("2024-01-06", "01"),
+    ("2024-01-07", "02"),  # first Sunday starts week 02
+    ("2023-12-31", "53"),
+    ("2023-01-01", "01"),  # January 1 on a Sunday
+    ("2022-12-31", "53"),
+    ("2022-01-01", "01"),  # January 1 on a Saturday
+    ("2022-01-02", "02"),
+])
+def test_week_matches_ga4_across_year_boundaries(day, week):
+    assert index._ga4_week(pd.Series(pd.to_datetime([day]))).tolist() == [week]
+
+
+def test_find_local_source_needs_metrics_dimensions_and_range(daily_client):
+    daily_client(2)
+    get_ga4_data(dimensions=["date", "country"], metrics=["sessions"],
+                 date_range_start="2024-01-01", date_range_end="2024-01-10")
+    context = index._property_context(index._resolve_property(None))
+
+    found = index._find_local_source(context, _target(["week"], ["sessions"], "2024-01-02", "2024-01-09"), None)
+    assert found is not None and found[0]["dimensions"] == ["date", "country"]
+    assert index._find_local_source(context, _target(["country"], ["totalUsers"], "2024-01-01", "2024-01-10"), None) is None
+    assert index._find_local_source(context, _target(["deviceCategory"], ["sessions"], "2024-01-01", "2024-01-10"), None) is None
+    assert index._find_local_source(context, _target(["country"], ["sessions"], "2023-12-31", "2024-01-10"), None) is None
+
+    country_filter = {"filter": {"fieldName": "country", "stringFilter": {"value": "country-0"}}}
+    found = index._find_local_source(
+        context, _target(["date"], ["sessions"], "2024-01-01", "2024-01-10", country_filter), country_filter
+    )
+    assert found is not None and found[2] == country_filter
+
+
+def test_query_cached_data_rolls_up_without_api_calls(daily_client):
+    client = daily_client(3)
+    get_ga4_data(dimensions=["date", "country"], metrics=["sessions"],
+                 date_range_start="2023-12-31", date_range_end="2024-01-08")
+    calls = client.calls
+
+    by_week = query_cached_data(dimensions=["week"], metrics=["sessions"],
+                                date_range_start="2023-12-31", date_range_end="2024-01-08", order_by="week",
+                                descending=False)
+    # Sunday Dec 31 is 2023's week 53; Jan 1-6 are 2024's week 01 and Jan 7-8 its week 02
+    assert by_week["data"] == [{"week": "01", "sessions": 18}, {"week": "02", "sessions": 6},
+                               {"week": "53", "sessions": 3}]
+
+    by_country = query_cached_data(dimensions=["country"], metrics=["sessions"],
+                                   date_range_start="2024-01-01", date_range_end="2024-01-08",
+                                   dimension_filter={"filter": {"fieldName": "country",
+                                                                "stringFilter": {"value": "country-1"}}})
+    assert by_country["data"] == [{"country": "country-1", "sessions": 8}]
+    assert client.calls == calls
+
+
+def test_query_cached_data_never_sums_non_additive_metrics(daily_client):
+    daily_client(2)
+    get_ga4_data(dimensions=["date", "country"], metrics=["totalUsers"],
+                 date_range_start="2024-01-01", date_range_end="2024-01-03")
+    result = query_cached_data(dimensions=["country"], metrics=["totalUsers"],
+                               date_range_start="2024-01-01", date_range_end="2024-01-03")
+    assert "error" in result
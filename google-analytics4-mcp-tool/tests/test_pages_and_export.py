@@ -0,0 +1,109 @@
+"""Paged reads and file exports."""
+
+import json
+import os
+
+import pytest
+
+import index
+from conftest import tool
+from fake_data_api import FakeDataClient, install
+
+get_ga4_data_page = tool(index.get_ga4_data_page)
+export_ga4_data = tool(index.export_ga4_data)
+
+
+@pytest.fixture
+def client():
+    client = FakeDataClient(25)
+    install(index, client)
+    with index._prefetch_lock:
+        index._prefetched_pages.clear()
+    return client
+
+
+def _wait_for_prefetches():
+    with index._prefetch_lock:
+        futures = list(index._prefetched_pages.values())
+    for future in futures:
+        future.result()
+
+
+def test_pages_are_not_prefetched_by_default(client):
+    page = get_ga4_data_page(dimensions=["date", "country"], metrics=["sessions"], page_size=10)
+    assert page["metadata"] == {"total_rows": 25, "offset": 0, "returned_rows": 10}
+    _wait_for_prefetches()
+    assert client.calls == 1 and not index._prefetched_pages
+
+
+def test_prefetched_page_is_served_from_the_background_fetch(client):
+    first = get_ga4_data_page(dimensions=["date", "country"], metrics=["sessions"], page_size=10, prefetch=True)
+    _wait_for_prefetches()
+    assert client.calls == 2
+    second = get_ga4_data_page(cursor=first["next_cursor"])
+    assert second["metadata"]["offset"] == 10 and client.calls == 2
+
+
+def test_prefetched_page_is_ignored_without_cache(client):
+    first = get_ga4_data_page(dimensions=["date", "country"], metrics=["sessions"], page_size=10, prefetch=True)
+    _wait_for_prefetches()
+    last = get_ga4_data_page(cursor=first["next_cursor"], use_cache=False, prefetch=True)
+    assert last["metadata"]["returned_rows"] == 10 and client.calls == 3
+    assert not index._prefetched_pages
+
+
+def test_export_writes_every_row_inside_the_export_directory(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(index, "GA4_EXPORT_DIR", str(tmp_path))
+    result = export_ga4_data("reports/sessions.jsonl", dimensions=["date", "country"], metrics=["sessions"],
+                             page_size=10)
+    assert result["rows_written"] == 25
+    assert result["output_path"] == os.path.join(os.path.realpath(tmp_path), "reports", "sessions.jsonl")
+    with open(result["output_path"], encoding="utf-8") as fh:
+        rows = [json.loads(line) for line in fh]
+    assert len(rows) == 25 and set(rows[0]) == {"date", "country", "sessions"}
+
+
+@pytest.mark.parametrize("output_path", ["../escape.jsonl", "/tmp/escape.jsonl", "a/../../escape.jsonl", "."])
+def test_export_rejects_paths_outside_the_export_directory(client, tmp_path, monkeypatch, output_path):
+    monkeypatch.setattr(index, "GA4_EXPORT_DIR", str(tmp_path / "exports"))
+    result = export_ga4_data(output_path, dimensions=["date"], metrics=["sessions"])
+    assert "error" in result and client.calls == 0
+
+
+def test_export_rejects_symlinks_out_of_the_export_directory(client, tmp_path, monkeypatch):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    (exports / "link.jsonl").symlink_to(tmp_path / "outside.jsonl")
+    monkeypatch.setattr(index, "GA4_EXPORT_DIR", str(exports))
+    assert "error" in export_ga4_data("link.jsonl", dimensions=["date"], metrics=["sessions"])
+    assert not (tmp_path / "outside.jsonl").exists()
+
+
+def _cursor_for(property_id, page_size=10, offset=10):
+    request, _ = index._build_report_request(["date"], ["sessions"], "7daysAgo", "yesterday", None, None, False, None)
+    request.property = f"properties/{property_id}"
+    return index._encode_cursor(request, offset, page_size)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "e30=", index.base64.urlsafe_b64encode(b'{"request": "!!"}').decode()])
+def test_malformed_cursor_returns_an_error(client, cursor):
+    result = get_ga4_data_page(cursor=cursor)
+    assert result == {"error": "Invalid cursor; pass next_cursor back exactly as get_ga4_data_page returned it."}
+    assert client.calls == 0
+
+
+def test_cursor_property_is_checked_like_an_argument(client, monkeypatch):
+    monkeypatch.setattr(index, "GA4_RESTRICT_PROPERTIES", True)
+    assert "Unknown property" in get_ga4_data_page(cursor=_cursor_for("999"))["error"]
+    assert client.calls == 0
+    assert get_ga4_data_page(cursor=_cursor_for(index.GA4_PROPERTY_ID))["metadata"]["offset"] == 10
+
+
+def test_cursor_page_size_is_capped(client, monkeypatch):
+    sizes = []
+    fetch_page = index._fetch_page
+    monkeypatch.setattr(index, "_fetch_page", lambda request, offset, page_size, use_cache=True: (
+        sizes.append(page_size) or fetch_page(request, offset, page_size, use_cache)
+    ))
+    get_ga4_data_page(cursor=_cursor_for(index.GA4_PROPERTY_ID, page_size=10 ** 9))
+    assert sizes == [index._MAX_PAGE_SIZE]
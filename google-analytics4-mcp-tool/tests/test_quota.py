@@ -0,0 +1,85 @@
+"""Per-property token bucket and retries."""
+
+import pytest
+from google.api_core import exceptions as gapi_exceptions
+from google.analytics.data_v1beta.types import DateRange, Dimension, Metric, RunReportRequest
+
+import index
+from fake_data_api import FakeDataClient, install
+
+
+class FlakyClient(FakeDataClient):
+    """Raises the queued errors, one per call, before answering normally."""
+
+    def __init__(self, *errors):
+        super().__init__(10)
+        self.errors = list(errors)
+
+    def run_report(self, request=None, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self._respond(request)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = index._QuotaScheduler(3600)
+    scheduler._quota("properties/1").level = 100.0
+    monkeypatch.setattr(index, "_quota_scheduler", scheduler)
+    monkeypatch.setattr(index, "GA4_RETRY_BASE_DELAY", 0.0)
+    index._load_sdk()
+    return scheduler
+
+
+def _request():
+    return RunReportRequest(property="properties/1", dimensions=[Dimension(name="date")],
+                            metrics=[Metric(name="sessions")], date_ranges=[DateRange(start_date="2024-01-01",
+                                                                                      end_date="2024-01-31")])
+
+
+def _level(scheduler):
+    return scheduler._quota("properties/1").level
+
+
+def test_reserve_takes_the_estimated_cost(scheduler):
+    assert scheduler.reserve("properties/1") == (0.0, 10.0)
+    scheduler.refund("properties/1", 10.0)
+    assert _level(scheduler) == pytest.approx(100.0, abs=0.1)
+
+
+def test_successful_call_keeps_its_tokens(scheduler):
+    install(index, FlakyClient())
+    index._call_api("run_report", _request())
+    assert _level(scheduler) == pytest.approx(90.0, abs=0.1)
+
+
+def test_retried_errors_refund_each_failed_attempt(scheduler):
+    client = FlakyClient(gapi_exceptions.InternalServerError("oops"), gapi_exceptions.DeadlineExceeded("slow"))
+    install(index, client)
+    index._call_api("run_report", _request())
+    assert client.calls == 3
+    assert _level(scheduler) == pytest.approx(90.0, abs=0.1)
+    assert scheduler.status()["properties/1"]["refunded"] == 2
+
+
+def test_non_retryable_error_refunds_and_raises(scheduler):
+    install(index, FlakyClient(gapi_exceptions.InvalidArgument("bad dimension")))
+    with pytest.raises(gapi_exceptions.InvalidArgument):
+        index._call_api("run_report", _request())
+    assert _level(scheduler) == pytest.approx(100.0, abs=0.1)
+
+
+def test_resource_exhausted_still_holds_the_bucket_empty(scheduler, monkeypatch):
+    install(index, FlakyClient(gapi_exceptions.ResourceExhausted("quota")))
+    retry_delay = scheduler.retry_delay
+
+    def check_level(prop, error, attempt):
+        delay = retry_delay(prop, error, attempt)
+        assert _level(scheduler) <= 0.0  # the refund does not undo the hold-back
+        scheduler._quota(prop).level = 100.0
+        return delay
+
+    monkeypatch.setattr(scheduler, "retry_delay", check_level)
+    index._call_api("run_report", _request())
+    assert scheduler.status()["properties/1"]["refunded"] == 1